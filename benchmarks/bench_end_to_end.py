@@ -0,0 +1,183 @@
+"""
+End-to-end benchmark of cli commands run against the local mock Jarvis api:
+`list logs`, `list events`, `admin migrate` and `admin import`.
+
+The dataset is generated from a seed so runs are repeatable. Each scenario
+reports the best of `--repeat` runs along with the number of api requests made.
+
+To run:
+
+    python -m benchmarks.bench_end_to_end [--latency 0.005] [--tags 50]
+        [--events 200] [--log-entries 1000] [--repeat 3] [--json results.json]
+"""
+import argparse, configparser, json, os, tempfile, time
+from click.testing import CliRunner
+from jarvis_cli import config, resource_file as rf
+from jarvis_cli.commands import cli
+from jarvis_cli.file_helper import metadata_keys_tag_edit, metadata_keys_log_edit
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+
+
+def write_config(work_dir, environment_urls):
+    """Write a cli configuration with an environment per mock api
+
+    :param environment_urls: dict of environment name to api url
+    """
+    config_path = os.path.join(work_dir, "cli_config.ini")
+    config_parser = configparser.ConfigParser()
+
+    for environment, url in environment_urls.items():
+        config_parser.add_section(environment)
+        config_map = config_parser[environment]
+        config.set_api_url(config_map, url)
+        config.set_api_user(config_map, "bench")
+        config.set_api_password(config_map, "bench")
+        config.set_jarvis_data_directory(config_map, os.path.join(work_dir, "data"))
+        config.set_jarvis_snapshots_directory(config_map,
+                os.path.join(work_dir, "snapshots"))
+        config.set_author(config_map, "Bench Mark")
+
+    with open(config_path, 'w') as f:
+        config_parser.write(f)
+
+    return config_path
+
+def invoke(config_path, args, input=None):
+    result = CliRunner().invoke(cli, ["-e", "bench", "--config-path",
+        config_path, "--no-cache"] + args, input=input)
+
+    if result.exit_code != 0:
+        raise RuntimeError("Command failed: {0}\n{1}".format(args,
+            result.output)) from result.exception
+
+    return result
+
+
+def create_api(args):
+    return populate(MockJarvisApi(args.page_size), args.tags, args.events,
+            args.log_entries, seed=args.seed)
+
+def bench_list_logs(args, work_dir):
+    api = create_api(args)
+
+    with MockJarvisApiServer(api, latency=args.latency) as server:
+        config_path = write_config(work_dir, { "bench": server.url })
+        start = time.perf_counter()
+        invoke(config_path, ["list", "logs"])
+        return time.perf_counter() - start, len(api.log_entries), api.num_requests
+
+def bench_list_events(args, work_dir):
+    api = create_api(args)
+    # The command lists 20 events at a time and asks for more
+    more = "more\n" * (len(api.events)//20 + 1)
+
+    with MockJarvisApiServer(api, latency=args.latency) as server:
+        config_path = write_config(work_dir, { "bench": server.url })
+        start = time.perf_counter()
+        invoke(config_path, ["list", "events"], input=more + "done\n")
+        return time.perf_counter() - start, len(api.events), api.num_requests
+
+def bench_migrate(args, work_dir):
+    api_source = create_api(args)
+    api_target = MockJarvisApi(args.page_size)
+
+    with MockJarvisApiServer(api_source, latency=args.latency) as source, \
+            MockJarvisApiServer(api_target, latency=args.latency) as target:
+        config_path = write_config(work_dir, { "bench": target.url,
+            "source": source.url })
+        checkpoint_path = os.path.join(work_dir, "migrate.jsonl")
+
+        start = time.perf_counter()
+        result = invoke(config_path, ["admin", "migrate", "-s", "source",
+            "--restart", "--checkpoint-path", checkpoint_path])
+        elapsed = time.perf_counter() - start
+
+        if "Migration successful" not in result.output:
+            raise RuntimeError("Migration failed:\n{0}".format(result.output))
+
+        num_resources = len(api_source.tags) + len(api_source.events) \
+                + len(api_source.log_entries)
+        return elapsed, num_resources, api_source.num_requests \
+                + api_target.num_requests
+
+def bench_import(args, work_dir):
+    api_source = create_api(args)
+    import_dir = os.path.join(work_dir, "import")
+    os.makedirs(import_dir)
+
+    for tag in api_source.tags.values():
+        rf.write_file(os.path.join(import_dir, "tag_{0}.md".format(tag["name"])),
+                metadata_keys_tag_edit, dict(tag, tags=[ link["title"]
+                    for link in tag["tagLinks"] ]))
+
+    for log_entry in api_source.log_entries.values():
+        rf.write_file(os.path.join(import_dir, "log_{0}.md".format(
+            log_entry["id"])), metadata_keys_log_edit, dict(log_entry,
+                tags=[ link["title"] for link in log_entry["tagLinks"] ]))
+
+    api = MockJarvisApi(args.page_size)
+    _, event = api.create_event({ "category": "migrated",
+        "description": "import" })
+    num_files = len(os.listdir(import_dir))
+
+    with MockJarvisApiServer(api, latency=args.latency) as server:
+        config_path = write_config(work_dir, { "bench": server.url })
+        start = time.perf_counter()
+        result = invoke(config_path, ["admin", "import", import_dir, "-e",
+            event["eventId"], "--results-path",
+            os.path.join(work_dir, "import.jsonl")])
+        elapsed = time.perf_counter() - start
+
+        if "#failed: 0" not in result.output:
+            raise RuntimeError("Import failed:\n{0}".format(result.output))
+
+        return elapsed, num_files, api.num_requests
+
+
+SCENARIOS = [("list logs", bench_list_logs), ("list events", bench_list_events),
+        ("migrate", bench_migrate), ("import", bench_import)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--latency", type=float, default=0.005,
+            help="Seconds added to every api response")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--log-entries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenario", action="append", default=None,
+            choices=[ name for name, _ in SCENARIOS ])
+    parser.add_argument("--json", default=None,
+            help="Path to write the results as json to compare runs")
+    args = parser.parse_args()
+
+    results = []
+
+    for name, bench_func in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+
+        runs = []
+
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as work_dir:
+                runs.append(bench_func(args, work_dir))
+
+        elapsed, num_resources, num_requests = min(runs, key=lambda r: r[0])
+        num_requests = sum(num_requests.values())
+        results.append({ "scenario": name, "elapsed": elapsed,
+            "resources": num_resources, "requests": num_requests,
+            "throughput": num_resources/elapsed })
+        print("{0:>12}: {1:.3f}s, #resources: {2}, #requests: {3}, "
+                "throughput: {4:.1f}/s".format(name, elapsed, num_resources,
+                    num_requests, num_resources/elapsed))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({ "parameters": vars(args), "results": results }, f,
+                    indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of parsing resource files with `resource_file.parse_file` versus
+the previous `convert_file_to_json` implementation.
+
+To run:
+
+    python -m benchmarks.bench_resource_file [--files 2000] [--body-kb 4]
+"""
+import argparse, os, re, tempfile, time
+from jarvis_cli import resource_file as rf
+
+
+def legacy_convert_file_to_json(file_path):
+    with open(file_path, 'r') as f:
+        (metadata, body) = f.read().split('\n\n', maxsplit=1)
+
+        def parse_metadata(line):
+            m = re.search('^(\\w*): (.*)', line)
+            return m.group(1).lower(), m.group(2).strip()
+
+        response = dict([ parse_metadata(line) for line in metadata.split('\n') ])
+
+        if "tags" in response:
+            response['tags'] = [ tag.strip() for tag
+                    in response['tags'].split(', ') if tag ]
+        if body.strip():
+            response['body'] = body
+
+        return response
+
+def create_files(directory, num_files, body_kb):
+    keys = ["id", "author", "created", "modified", "version", "tags", "parent",
+            "todo"]
+    body = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+            * (body_kb * 1024 // 57 + 1))
+
+    for i in range(num_files):
+        log_entry = { "id": i, "author": "John Doe",
+                "created": "2016-01-01T00:00:00", "modified": "2016-01-01T00:00:00",
+                "version": "0.4.0", "tags": ["Weather", "HelloWorld", "Books"],
+                "body": body }
+        rf.write_file(os.path.join(directory, "{0}.md".format(i)), keys,
+                log_entry)
+
+def time_parse(parse_func, directory):
+    paths = [ os.path.join(directory, name) for name in os.listdir(directory) ]
+    start = time.perf_counter()
+
+    for path in paths:
+        parse_func(path)
+
+    return time.perf_counter() - start, len(paths)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--body-kb", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        create_files(directory, args.files, args.body_kb)
+
+        for name, parse_func in [("legacy", legacy_convert_file_to_json),
+                ("resource_file", rf.parse_file)]:
+            elapsed, count = time_parse(parse_func, directory)
+            print("{0:>15}: {1:.3f}s, {2:.1f}us/file".format(name, elapsed,
+                elapsed/count*1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Micro-benchmark of extracting search term snippets from long log entry bodies
+with `snippets.extract_snippets` versus the previous per-call regex.
+
+To run:
+
+    python -m benchmarks.bench_snippets [--body-kb 256] [--entries 50]
+"""
+import argparse, random, re, time
+from jarvis_cli import snippets
+
+
+WORDS = ["the", "jarvis", "log", "entry", "weather", "reading", "books", "war",
+        "peace", "sunny", "morning", "thought", "idea", "note", "today"]
+
+
+def legacy_find_search_term(search_term, body):
+    search_regex = re.compile('.{{0,30}}\\S*{0}\\S*.{{0,30}}'
+            .format(search_term), re.IGNORECASE)
+    return [ m.group(0) for m in search_regex.finditer(body) ]
+
+def create_body(body_kb, seed):
+    rng = random.Random(seed)
+    words = []
+    size = 0
+
+    while size < body_kb*1024:
+        word = rng.choice(WORDS)
+        words.append(word + ("\n" if rng.random() < 0.05 else " "))
+        size += len(words[-1])
+
+    return "".join(words)
+
+def time_extract(extract_func, search_term, bodies):
+    start = time.perf_counter()
+    num_matches = sum(len(extract_func(search_term, body)) for body in bodies)
+    return time.perf_counter() - start, num_matches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--body-kb", type=int, default=256)
+    parser.add_argument("--entries", type=int, default=50)
+    args = parser.parse_args()
+
+    bodies = [ create_body(args.body_kb, i) for i in range(args.entries) ]
+
+    for search_term in ["the", "peace", "zzz"]:
+        for name, extract_func in [("legacy", legacy_find_search_term),
+                ("snippets", snippets.extract_snippets)]:
+            elapsed, num_matches = time_extract(extract_func, search_term, bodies)
+            print("{0:>8} {1!r:>8}: {2:.3f}s, {3:.2f}ms/entry, #matches: {4}"
+                    .format(name, search_term, elapsed,
+                        elapsed/len(bodies)*1e3, num_matches))
+
+if __name__ == "__main__":
+    main()
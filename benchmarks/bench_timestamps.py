@@ -0,0 +1,37 @@
+"""
+Micro-benchmark of parsing api timestamps per log entry with
+`timestamps.parse_iso_datetime` versus `dateparser.parse`.
+
+To run:
+
+    python -m benchmarks.bench_timestamps [--entries 2000]
+"""
+import argparse, time
+from datetime import datetime, timedelta
+import dateparser
+from jarvis_cli import timestamps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = datetime(2015, 1, 1)
+    # Each log entry summary parses a created and an occurred timestamp
+    values = [ (start + timedelta(minutes=17*i, microseconds=i)).isoformat()
+            for i in range(2*args.entries) ]
+
+    for name, parse_func in [("dateparser", dateparser.parse),
+            ("timestamps", timestamps.parse_iso_datetime)]:
+        begin = time.perf_counter()
+
+        for value in values:
+            parse_func(value)
+
+        elapsed = time.perf_counter() - begin
+        print("{0:>10}: {1:.3f}s, {2:.1f}us/entry".format(name, elapsed,
+            elapsed/args.entries*1e6))
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,272 @@
-import subprocess, os, time, shutil
+import os, time, shutil, json, tarfile, threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from itertools import chain
 import jarvis_cli as jc
-from jarvis_cli import config, client
+from jarvis_cli import config, client, resource_file, snapshot
+from jarvis_cli import file_helper as fh
 from jarvis_cli.client import log_entry as cle
+from jarvis_cli.exceptions import JarvisParseError, JarvisSnapshotError
+from jarvis_cli.outbox import resource_version
 
 
-def create_snapshot(environment, config_map):
-    snapshot_filepath = "jarvis_snapshot_{0}_{1}.tar.gz".format(environment,
-            datetime.utcnow().strftime("%Y%m%d%H%M%S"))
-    snapshot_filepath =os.path.join(config.get_jarvis_snapshots_directory(config_map),
-            snapshot_filepath)
+def create_snapshot(environment, config_map, incremental=False):
+    """
+    :param incremental: Only archive the changes since the latest snapshot of
+        the environment. A full snapshot is made when there is none.
+    """
+    snapshots_dir = config.get_jarvis_snapshots_directory(config_map)
+    parent_filepath = snapshot.find_latest_snapshot(snapshots_dir, environment) \
+            if incremental else None
 
-    data_dir = config.get_jarvis_data_directory(config_map)
-    data_top_dirname = os.path.dirname(data_dir)
-    data_basename = os.path.basename(data_dir)
+    if incremental and not parent_filepath:
+        print("No previous snapshot found so creating a full snapshot")
 
-    cmd = ["tar", "-czf", snapshot_filepath, "-C", data_top_dirname, data_basename]
+    snapshot_filepath = snapshot.create_snapshot_filename(environment,
+            datetime.utcnow(), bool(parent_filepath))
+    snapshot_filepath =os.path.join(snapshots_dir, snapshot_filepath)
 
-    cp = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    data_dir = config.get_jarvis_data_directory(config_map)
+    progress = snapshot.Progress("Backing up")
 
-    if cp.returncode == 0:
-        return snapshot_filepath
-    else:
+    try:
+        manifest = snapshot.write_snapshot(snapshot_filepath, data_dir,
+                parent_filepath, progress=progress)
+    except (OSError, tarfile.TarError) as e:
         # Tarballing failed and there maybe a bad tarball so try to remove it
-        try:
-            os.remove(snapshot_filepath)
-        except:
-            pass
+        for filepath in [snapshot_filepath,
+                snapshot.get_manifest_path(snapshot_filepath)]:
+            try:
+                os.remove(filepath)
+            except:
+                pass
+
+        print("Snapshot failed: {0}".format(e))
+        return
+
+    if parent_filepath:
+        print("Based on: {0}, #deleted: {1}".format(parent_filepath,
+            len(manifest["deleted"])))
 
-        print(cp.stdout)
+    num_bytes = sum(manifest["files"][relpath]["size"]
+            for relpath in manifest["archived"])
+    print("#files: {0}, {1:.1f}MB compressed to {2:.1f}MB, elapsed: {3:.1f}s, "
+            "throughput: {4:.1f}MB/s".format(len(manifest["archived"]),
+                num_bytes/1e6, manifest["archiveSize"]/1e6, progress.elapsed(),
+                progress.throughput(num_bytes)))
+
+    return snapshot_filepath
 
 
 def restore_snapshot(config_map, snapshot_filepath):
+    """Restore the data directory from a snapshot
+
+    The snapshot gets verified and extracted into a staging directory next to
+    the data directory. Only then is the staged data directory swapped in so a
+    failed restore leaves the data directory untouched.
+    """
     if not os.path.isfile(snapshot_filepath):
         print("Snapshot file does not exist: {0}".format(snapshot_filepath))
+        return False
 
-    data_dir = config.get_jarvis_data_directory(config_map)
+    data_dir = os.path.normpath(config.get_jarvis_data_directory(config_map))
     data_top_dirname = os.path.dirname(data_dir)
+    data_basename = os.path.basename(data_dir)
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+
+    # Staging is next to the data directory so that the swap is a rename on the
+    # same filesystem.
+    staging_dir = os.path.join(data_top_dirname, ".{0}_restore_{1}".format(
+        data_basename, timestamp))
+    data_dir_prev = os.path.join(data_top_dirname, ".{0}_prev_{1}".format(
+        data_basename, timestamp))
+    progress = snapshot.Progress("Restoring")
+
+    try:
+        os.makedirs(staging_dir)
+        # Incremental snapshots get rebuilt from their full snapshot
+        staged_basename = snapshot.extract_snapshot_chain(snapshot_filepath,
+                staging_dir, progress=progress)
+    except (OSError, tarfile.TarError, ValueError, JarvisSnapshotError) as e:
+        print("Restore failed: {0}".format(e))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return False
 
-    # Move current data directory to a temp
-    data_dir_prev = os.path.join(data_top_dirname, "jarvis_prev")
-    os.rename(data_dir, data_dir_prev)
+    print("Extracted {0:.1f}MB, elapsed: {1:.1f}s, throughput: {2:.1f}MB/s".format(
+        progress.num_bytes/1e6, progress.elapsed(), progress.throughput()))
 
-    cmd = ["tar", "-xf", snapshot_filepath, "-C", data_top_dirname]
-    cp = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    has_data_dir = os.path.exists(data_dir)
 
-    if cp.returncode == 0:
-        if data_dir_prev:
-            shutil.rmtree(data_dir_prev)
-        return True
-    else:
-        print(cp.stdout)
+    if has_data_dir:
+        os.rename(data_dir, data_dir_prev)
+
+    try:
+        os.rename(os.path.join(staging_dir, staged_basename), data_dir)
+    except OSError as e:
+        # Put the data directory back where it was
+        if has_data_dir:
+            os.rename(data_dir_prev, data_dir)
 
-        # Something bad happened so go back to previous version
-        shutil.rmtree(data_dir)
-        os.rename(data_dir_prev, data_dir)
+        print("Restore failed: {0}".format(e))
+        shutil.rmtree(staging_dir, ignore_errors=True)
         return False
 
+    shutil.rmtree(data_dir_prev, ignore_errors=True)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return True
+
+
+class MigrationCheckpoint(object):
+    """Progress of a migration persisted to a local append-only journal
+
+    Each line of the journal is a json object that either records the ids of
+    resources successfully migrated, the ids of resources created on the way to
+    migrating another, or that a resource type has completed. An interrupted
+    migration replays the journal to resume where it stopped.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.migrated = defaultdict(set)
+        self.created = defaultdict(dict)
+        self.completed = set()
+        # Created resources get recorded from the migration's worker threads
+        self._lock = threading.Lock()
+
+        if os.path.isfile(filepath):
+            line = ""
+
+            with open(filepath, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partially written last line of an interrupted run
+                        continue
+
+                    self._apply(record)
+
+            if line and not line.endswith("\n"):
+                # Start the next record on a line of its own
+                with open(filepath, 'a') as f:
+                    f.write("\n")
+
+    def _apply(self, record):
+        resource_type = record["resourceType"]
+
+        if record.get("completed"):
+            self.completed.add(resource_type)
+        elif "created" in record:
+            self.created[resource_type].update(record["created"])
+        else:
+            self.migrated[resource_type].update(record["ids"])
+
+    def _append(self, record):
+        with self._lock:
+            with open(self.filepath, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._apply(record)
+
+    def is_migrated(self, resource_type, resource_id):
+        return str(resource_id) in self.migrated[resource_type]
+
+    def is_completed(self, resource_type):
+        return resource_type in self.completed
+
+    def mark_migrated(self, resource_type, resource_ids):
+        if resource_ids:
+            self._append({ "resourceType": resource_type,
+                "ids": [ str(rid) for rid in resource_ids ] })
+
+    def get_created(self, resource_type, resource_id):
+        """
+        :return: Id of the resource created for `resource_id` else None
+        """
+        return self.created[resource_type].get(str(resource_id))
+
+    def mark_created(self, resource_type, resource_id, created_id):
+        self._append({ "resourceType": resource_type,
+            "created": { str(resource_id): created_id } })
+
+    def mark_completed(self, resource_type):
+        self._append({ "resourceType": resource_type, "completed": True })
+
+
+def _migrate_resources(resource_type, conn_prev, id_func, transform_func,
+        post_to_new_func, checkpoint, max_workers):
+    """Stream pages of resources from the previous environment and post them to
+    the new one concurrently
+
+    Progress gets checkpointed after every page. The resource type is only
+    marked completed when every resource has migrated so that a rerun retries
+    the failures.
+    """
+    if checkpoint.is_completed(resource_type):
+        print("Migrate #{0}: already completed".format(resource_type))
+        return True
 
+    def migrate_one(resource):
+        resource_id = id_func(resource)
 
-# TODO: Must test. This code was lifted from jarvis_migrate.py and reworked to be
-# library calls.
-def _migrate_resources(resource_type, conn_prev, transform_func, post_to_new_func):
-    to_migrate = [ transform_func(r)
-            for r in client.query(resource_type, conn_prev, []) ]
+        try:
+            return resource_id, bool(post_to_new_func(transform_func(resource)))
+        except Exception as e:
+            # Treat like any other failed post and let a rerun retry it
+            print("Unexpected error migrating {0}: {1}, {2}".format(resource_type,
+                resource_id, e))
+            return resource_id, False
+
+    num_attempted = 0
+    num_succeeded = 0
+    num_skipped = 0
+    start_time = time.time()
 
-    print("Migrate #{0}: {1}".format(resource_type, len(to_migrate)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Read the next page ahead while the current one gets posted
+        for page in client.query_generator(resource_type, conn_prev, [],
+                prefetch=client.DEFAULT_PREFETCH):
+            to_migrate = [ r for r in page
+                    if not checkpoint.is_migrated(resource_type, id_func(r)) ]
+            num_skipped += len(page) - len(to_migrate)
+
+            results = list(executor.map(migrate_one, to_migrate))
+            succeeded = [ resource_id for resource_id, ok in results if ok ]
+            checkpoint.mark_migrated(resource_type, succeeded)
+
+            num_attempted += len(results)
+            num_succeeded += len(succeeded)
+            elapsed = time.time() - start_time
+            print("Migrate #{0}: attempted: {1}, succeeded: {2}, skipped: {3}, "
+                    "{4:.1f}/s".format(resource_type, num_attempted, num_succeeded,
+                        num_skipped, num_attempted/elapsed if elapsed else 0))
+
+    elapsed = time.time() - start_time
+    print("Migrate #{0} done: attempted: {1}, succeeded: {2}, skipped: {3}, "
+            "elapsed: {4:.1f}s, throughput: {5:.1f}/s".format(resource_type,
+                num_attempted, num_succeeded, num_skipped, elapsed,
+                num_succeeded/elapsed if elapsed else 0))
+
+    if num_attempted == num_succeeded:
+        checkpoint.mark_completed(resource_type)
+        return True
+    else:
+        return False
 
-    def migrate_reverse_result(r):
-        return None if post_to_new_func(r) else r
+def migrate(conn_prev, conn_next, checkpoint_path, max_workers=10):
+    """Migrate all resources from the previous environment to the next
 
-    start_time = time.time()
-    results = [ migrate_reverse_result(r) for r in to_migrate ]
+    :param checkpoint_path: Path to the checkpoint journal. Progress recorded in
+        an existing journal is skipped over.
 
-    num_attempted = len(to_migrate)
-    num_succeeded = len(list(filter(lambda x: not x, results)))
-    print("#attempted: {0}, #succeeded: {1}, elapsed: {2}s".format(
-        num_attempted, num_succeeded, time.time()-start_time))
+    :return: True if everything was migrated
+    """
+    checkpoint = MigrationCheckpoint(checkpoint_path)
 
-def migrate(conn_prev, conn_next):
     def migrate_tags():
         def transform(tag):
             """Transform to tag request"""
@@ -95,7 +283,8 @@ def migrate(conn_prev, conn_next):
         def post_to_new(tag_transformed):
             return client.post_tag(conn_next, tag_transformed, skip_tags_check=True)
 
-        _migrate_resources("tags", conn_prev, transform, post_to_new)
+        return _migrate_resources("tags", conn_prev, lambda tag: tag["name"],
+                transform, post_to_new, checkpoint, max_workers)
 
     def migrate_log_entries():
         def transform(log_entry):
@@ -124,11 +313,26 @@ def migrate(conn_prev, conn_next):
             del log_entry["event"]
 
             if event:
-                event_id = client.post_event(conn_next, event)["eventId"]
+                # Reuse the event created by a previous run whose log entry
+                # failed to post so that a rerun doesn't create a duplicate
+                event_id = checkpoint.get_created("logentries-events",
+                        log_entry["id"])
+
+            if event and not event_id:
+                event = client.post_event(conn_next, event)
+
+                if not event:
+                    return None
+
+                event_id = event["eventId"]
+                checkpoint.mark_created("logentries-events", log_entry["id"],
+                        event_id)
 
             return cle.post_log_entry(event_id, conn_next, log_entry)
 
-        _migrate_resources("logentries", conn_prev, transform, post_to_new)
+        return _migrate_resources("logentries", conn_prev,
+                lambda log_entry: log_entry["id"], transform, post_to_new,
+                checkpoint, max_workers)
 
     def migrate_events():
         def transform(event):
@@ -138,9 +342,276 @@ def migrate(conn_prev, conn_next):
         def post_to_new(event_transformed):
             return client.post_event(conn_next, event_transformed)
 
-        _migrate_resources("events", conn_prev, transform, post_to_new)
+        return _migrate_resources("events", conn_prev,
+                lambda event: event["eventId"], transform, post_to_new, checkpoint,
+                max_workers)
+
+    # Order matters in the migration so stop at the first resource type that
+    # did not fully migrate.
+    return migrate_tags() and migrate_events() and migrate_log_entries()
+
+
+def _parse_resource_file(filepath):
+    """Runs in a worker process so must be importable and return picklable"""
+    try:
+        return filepath, resource_file.parse_file(filepath), None
+    except (JarvisParseError, OSError, UnicodeDecodeError) as e:
+        return filepath, None, str(e)
+
+def _find_resource_files(directory):
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+            if filename.endswith(".md"):
+                yield os.path.join(dirpath, filename)
+
+def post_stub_tags(conn, author, tag_names, max_workers=10):
+    """Create bare tags non-interactively
+
+    :return: List of the tag names that failed to be created
+    """
+    def post_stub_tag(tag_name):
+        tag_request = { "name": tag_name, "author": author, "tags": [],
+                "body": "# {0}\n".format(tag_name) }
+        return client.post_tag(conn, tag_request, skip_tags_check=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(post_stub_tag, tag_names)
+        return [ tag_name for tag_name, tag in zip(tag_names, results) if not tag ]
+
+def import_resources(conn, directory, author, results_path, event_id=None,
+        max_workers=10, max_processes=None):
+    """Import a directory of resource files, tags and log entries, in bulk
+
+    Files are parsed in worker processes. Tags referenced by the files that
+    neither exist nor are being imported get created as stubs up front so that
+    the uploads can skip the tags check. Tags get uploaded before log entries.
+
+    :param event_id: Event for log entries whose file has no "Event" metadata
+    :param results_path: Path to write the json lines result of each file
+
+    :return: (#succeeded, #failed)
+    """
+    start_time = time.time()
+    filepaths = list(_find_resource_files(directory))
+
+    with ProcessPoolExecutor(max_workers=max_processes) as executor:
+        parsed = list(executor.map(_parse_resource_file, filepaths,
+            chunksize=max(1, len(filepaths)//64)))
+
+    print("Parsed #files: {0}, elapsed: {1:.1f}s".format(len(parsed),
+        time.time()-start_time))
+
+    results = []
+
+    def record(filepath, resource_type, resource_id=None, error=None):
+        results.append({ "path": filepath, "type": resource_type,
+            "status": "failed" if error else "created", "id": resource_id,
+            "error": error })
+
+    tags = []
+    log_entries = []
+
+    for filepath, resource, error in parsed:
+        if error:
+            record(filepath, None, error=error)
+        elif "name" in resource:
+            tags.append((filepath, resource))
+        else:
+            log_entries.append((filepath, resource))
+
+    importing = set(tag["name"].lower() for _, tag in tags)
+    referenced = {}
+
+    for _, resource in tags + log_entries:
+        for tag_name in resource.get("tags", []):
+            if tag_name.lower() not in importing:
+                referenced.setdefault(tag_name.lower(), tag_name)
+
+    missing = fh.find_missing_tags(conn, list(referenced.values()))
+    print("Creating #missing tags: {0}".format(len(missing)))
+    failed = post_stub_tags(conn, author, missing, max_workers)
+
+    if failed:
+        print("Failed to create tags: {0}".format(", ".join(failed)))
+
+    def upload_tag(tag):
+        # Exported tags may have read-only fields
+        for key in ["created", "modified", "version"]:
+            tag.pop(key, None)
+
+        tag = client.post_tag(conn, tag, skip_tags_check=True)
+        return (tag["name"], None) if tag else (None, "Jarvis-api rejected tag")
+
+    def upload_log_entry(log_entry):
+        log_entry_event_id = log_entry.pop("event", None) or event_id
+
+        if not log_entry_event_id:
+            return None, "No event for log entry"
+
+        for key in ["id", "created", "modified", "version"]:
+            log_entry.pop(key, None)
+
+        log_entry = cle.post_log_entry(log_entry_event_id, conn, log_entry,
+                skip_tags_check=True)
+        return (log_entry["id"], None) if log_entry \
+                else (None, "Jarvis-api rejected log entry")
+
+    def upload(resource_type, upload_func, to_upload):
+        def upload_one(resource):
+            try:
+                return upload_func(resource)
+            except Exception as e:
+                return None, str(e)
+
+        upload_start_time = time.time()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (filepath, _), (resource_id, error) in zip(to_upload,
+                    executor.map(upload_one, [ r for _, r in to_upload ])):
+                record(filepath, resource_type, resource_id, error)
+
+        elapsed = time.time() - upload_start_time
+        print("Uploaded #{0}: {1}, elapsed: {2:.1f}s, throughput: {3:.1f}/s"
+                .format(resource_type, len(to_upload), elapsed,
+                    len(to_upload)/elapsed if elapsed else 0))
+
+    upload("tags", upload_tag, tags)
+    upload("logentries", upload_log_entry, log_entries)
+
+    with open(results_path, 'w') as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    num_failed = len([ r for r in results if r["error"] ])
+    return len(results) - num_failed, num_failed
+
+
+def _replace_tag(tag_names, tag_from, tag_to, exclude=None):
+    """Replace a tag in a list of tag names, case insensitively, keeping the
+    order and without duplicating the replacement
+
+    :param exclude: Tag name to drop, used so that a tag doesn't link to itself
+    """
+    replaced = []
+    seen = set([exclude.lower()]) if exclude else set()
+
+    for tag_name in tag_names or []:
+        if tag_name.lower() == tag_from.lower():
+            tag_name = tag_to
+
+        if tag_name.lower() not in seen:
+            seen.add(tag_name.lower())
+            replaced.append(tag_name)
+
+    return replaced
+
+def find_tagged(conn, tag_name):
+    """Find the log entries and tags that are tagged with a tag through the
+    search endpoints
+
+    :return: (list of log entries, list of tags)
+    """
+    def tagged(resources):
+        # Only trust the search results as far as the tag actually being there
+        return [ r for r in resources
+                if tag_name.lower() in [ t.lower() for t in r["tags"] or [] ] ]
+
+    log_entries = tagged(chain.from_iterable(client.query_log_entries_generator(
+        conn, [("tags", tag_name)], prefetch=client.DEFAULT_PREFETCH)))
+    tags = tagged(chain.from_iterable(client.query_generator("tags", conn,
+        [("tags", tag_name)], prefetch=client.DEFAULT_PREFETCH)))
+    return log_entries, tags
+
+def retag(conn, author, tag_from, tag_to, dry_run=False, max_workers=10):
+    """Replace a tag with another one across all the log entries and tags that
+    are tagged with it, to rename or merge tags
+
+    Every affected resource is found before any gets written because the
+    rewritten ones drop out of the search results which would shift the pages
+    being read. The puts are concurrent. Each resource is read again right
+    before its put and is skipped as a conflict when its version changed since
+    it was found so that concurrent edits don't get overwritten. Rerunning
+    picks up the conflicts and the failures.
+
+    :param dry_run: Only report what would change
+    :return: (#updated, #conflicts, #failed)
+    """
+    log_entries, tags = find_tagged(conn, tag_from)
+    missing = fh.find_missing_tags(conn, [tag_to])
+
+    print("Log entries tagged {0}: {1}".format(tag_from, len(log_entries)))
+    print("Tags tagged {0}: {1}".format(tag_from, len(tags)))
+
+    if dry_run:
+        for log_entry in log_entries:
+            print("  log entry {0} of event {1}: {2} -> {3}".format(
+                log_entry["id"], log_entry["event"], ", ".join(log_entry["tags"]),
+                ", ".join(_replace_tag(log_entry["tags"], tag_from, tag_to))))
+        for tag in tags:
+            print("  tag {0}: {1} -> {2}".format(tag["name"],
+                ", ".join(tag["tags"]), ", ".join(_replace_tag(tag["tags"],
+                    tag_from, tag_to, tag["name"]))))
+        if missing:
+            print("Would create tag: {0}".format(tag_to))
+        return 0, 0, 0
+
+    if missing:
+        print("Creating tag: {0}".format(tag_to))
+
+        if post_stub_tags(conn, author, missing, max_workers):
+            print("Failed to create tag: {0}".format(tag_to))
+            return 0, 0, len(log_entries) + len(tags)
+
+    def retag_log_entry(found):
+        get_func = partial(cle.get_log_entry, found["event"])
+        put_func = partial(cle.put_log_entry, found["event"])
+
+        def to_request(log_entry):
+            return { "author": log_entry["author"], "parent": log_entry.get("parent"),
+                    "todo": log_entry.get("todo"), "body": log_entry["body"],
+                    "tags": _replace_tag(log_entry["tags"], tag_from, tag_to) }
+
+        return retag_one("log entry", get_func, put_func, to_request, found,
+                str(found["id"]))
+
+    def retag_tag(found):
+        def to_request(tag):
+            return { "name": tag["name"], "author": tag["author"],
+                    "body": tag["body"], "tags": _replace_tag(tag["tags"],
+                        tag_from, tag_to, tag["name"]) }
+
+        return retag_one("tag", client.get_tag, client.put_tag, to_request,
+                found, found["name"])
+
+    def retag_one(label, get_func, put_func, to_request, found, resource_id):
+        try:
+            current = get_func(conn, resource_id, revalidate=True)
+
+            if not current:
+                return "failed"
+            elif resource_version(current) != resource_version(found):
+                print("Conflict, {0} {1} changed since it was found, rerun to "
+                        "retag it".format(label, resource_id))
+                return "conflict"
+
+            return "updated" if put_func(conn, resource_id, to_request(current)) \
+                    else "failed"
+        except Exception as e:
+            print("Unexpected error retagging {0} {1}: {2}".format(label,
+                resource_id, e))
+            return "failed"
+
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        statuses = list(executor.map(retag_log_entry, log_entries)) \
+                + list(executor.map(retag_tag, tags))
+
+    elapsed = time.time() - start_time
+    print("Retagged elapsed: {0:.1f}s, throughput: {1:.1f}/s".format(elapsed,
+        len(statuses)/elapsed if elapsed else 0))
 
-    # Order matters in the migration
-    migrate_tags()
-    migrate_events()
-    migrate_log_entries()
+    return statuses.count("updated"), statuses.count("conflict"), \
+            statuses.count("failed")
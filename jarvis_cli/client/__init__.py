@@ -1,4 +1,7 @@
-from .common import get_tag, get_event, put_tag, put_event, post_tag, post_event, \
-    query, get_data_summary, query_generator
+from .common import get_tag, get_tags, get_event, get_events, put_tag, put_event, post_tag, post_event, \
+    query, get_data_summary, get_data_summaries, DATA_SUMMARY_TYPES, \
+    query_generator, limit_generator, prefetch_generator, \
+    DEFAULT_PREFETCH, RequestRecord, add_request_listener, remove_request_listener, \
+    UNREACHABLE_ERRORS
 from .log_entry import get_log_entry, post_log_entry, put_log_entry, \
-    query_log_entries
+    query_log_entries, query_log_entries_generator
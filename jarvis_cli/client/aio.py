@@ -0,0 +1,307 @@
+"""
+Asyncio client of the Jarvis api that mirrors the synchronous client.
+
+Requires aiohttp which is the optional `async` extra: `pip install jarvis-cli[async]`
+
+    conn = config.get_client_connection(config_map)
+
+    async with aio.open_connection(conn, max_concurrency=100) as aconn:
+        events = await aio.get_events(aconn, event_ids)
+
+All requests of an async connection share one aiohttp session i.e. connection
+pool, and a semaphore caps how many requests are in flight at once so that
+fanning out hundreds of calls doesn't overwhelm the api.
+"""
+import asyncio
+import base64
+import json
+import time
+import urllib
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from functools import partial
+from itertools import chain
+
+try:
+    import aiohttp
+except ImportError as e:
+    raise ImportError("The async client requires aiohttp: "
+            "pip install jarvis-cli[async]") from e
+
+from jarvis_cli.client.common import _build_url, _build_query_url, _convert, \
+    _parse_query_page, _notify_request_listeners, _write_through, DEFAULT_PREFETCH
+
+
+AsyncClientConnection = namedtuple("AsyncClientConnection", ["url", "session",
+    "semaphore", "retries", "backoff", "cache", "replica"])
+
+DEFAULT_MAX_CONCURRENCY = 50
+
+@asynccontextmanager
+async def open_connection(conn, pool_size=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY, retries=3, backoff=0.5):
+    """Open an async connection using the settings of a synchronous connection
+
+    :param conn: ClientConnection whose url, credentials, timeout, cache and
+        local replica are used. Writes are not queued in its outbox.
+    :param pool_size: Maximum number of open connections. Defaults to
+        `max_concurrency`.
+    :param max_concurrency: Maximum number of requests in flight
+    :param retries: Number of retries of idempotent requests on connection
+        errors and 502/503/504s
+    :param backoff: Backoff factor in seconds used between retries
+    """
+    connector = aiohttp.TCPConnector(limit=pool_size or max_concurrency)
+    headers = {}
+
+    if conn.user:
+        credentials = "{0}:{1}".format(conn.user, conn.password or "")
+        headers["Authorization"] = "Basic {0}".format(
+                base64.b64encode(credentials.encode("utf-8")).decode("ascii"))
+
+    timeout = aiohttp.ClientTimeout(total=conn.timeout)
+
+    async with aiohttp.ClientSession(connector=connector, headers=headers,
+            timeout=timeout) as session:
+        yield AsyncClientConnection(conn.url, session,
+                asyncio.Semaphore(max_concurrency), retries, backoff, conn.cache,
+                conn.replica)
+
+
+Response = namedtuple("Response", ["status_code", "headers", "body"])
+
+_IDEMPOTENT_METHODS = frozenset(["GET", "PUT", "DELETE", "HEAD"])
+_RETRY_STATUSES = frozenset([502, 503, 504])
+
+async def _request(method, conn, url, **kwargs):
+    """Make a request with the same retry behavior as the synchronous session
+
+    :return: Response whose body is already read and parsed json, None when the
+        body is not json
+    """
+    retries = conn.retries if method in _IDEMPOTENT_METHODS else 0
+    attempt = 0
+    start = time.perf_counter()
+
+    while True:
+        try:
+            async with conn.semaphore:
+                async with conn.session.request(method, url, **kwargs) as r:
+                    content = await r.read()
+
+            if r.status not in _RETRY_STATUSES or attempt >= retries:
+                _notify_request_listeners(method, conn, url, r.status,
+                        len(content), time.perf_counter() - start, attempt, None)
+
+                try:
+                    body = json.loads(content) if content else None
+                except ValueError:
+                    body = None
+
+                return Response(r.status, r.headers, body)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt >= retries:
+                _notify_request_listeners(method, conn, url, None, 0,
+                        time.perf_counter() - start, attempt, type(e).__name__)
+                raise
+
+        # Sleep outside of the semaphore so waiting doesn't hold up others
+        await asyncio.sleep(conn.backoff * (2 ** attempt))
+        attempt += 1
+
+
+async def _get_jarvis_resource_unconverted(endpoint, conn, resource_id,
+        revalidate=False):
+    cache = conn.cache
+    entry = cache.get(endpoint, resource_id) if cache else None
+
+    if entry and not revalidate and entry.is_fresh(cache.ttl):
+        return entry.resource
+
+    url = _build_url(conn.url, endpoint, urllib.parse.quote(resource_id))
+    headers = entry.validators() if entry else None
+    r = await _request("GET", conn, url, headers=headers)
+
+    if r.status_code == 304 and entry:
+        cache.revalidated(endpoint, resource_id, entry)
+        return entry.resource
+    elif r.status_code == 200:
+        if cache:
+            cache.put(endpoint, resource_id, r.body, r.headers.get("ETag"))
+
+        return r.body
+    elif r.status_code == 404:
+        if cache:
+            cache.remove(endpoint, resource_id)
+
+        print("Jarvis-api not found: {0}".format(resource_id))
+    else:
+        print("Jarvis-api error: {0}, {1}".format(r.status_code, r.body))
+
+async def _get_jarvis_resource(endpoint, conn, resource_id, revalidate=False):
+    return _convert(await _get_jarvis_resource_unconverted(endpoint, conn,
+        resource_id, revalidate))
+
+get_tag = partial(_get_jarvis_resource, 'tags')
+# WATCH! Events are unconverted.
+get_event = partial(_get_jarvis_resource_unconverted, 'events')
+
+
+async def _get_jarvis_resources(get_func, conn, resource_ids):
+    """Get many resources concurrently
+
+    :param resource_ids: Iterable of resource ids which may contain duplicates
+        and Nones which are both skipped
+
+    :return: dict of resource id to resource, None for resources not found
+    """
+    resource_ids = list(set(rid for rid in resource_ids if rid))
+    resources = await asyncio.gather(*[ get_func(conn, rid)
+        for rid in resource_ids ])
+    return dict(zip(resource_ids, resources))
+
+get_events = partial(_get_jarvis_resources, get_event)
+get_tags = partial(_get_jarvis_resources, get_tag)
+
+
+async def _put_jarvis_resource_unconverted(endpoint, conn, resource_id,
+        resource_updated):
+    url = _build_url(conn.url, endpoint, urllib.parse.quote(resource_id))
+    r = await _request("PUT", conn, url, json=resource_updated)
+
+    if conn.cache:
+        conn.cache.remove(endpoint, resource_id)
+
+    if r.status_code == 200:
+        if conn.cache:
+            conn.cache.put(endpoint, resource_id, r.body, r.headers.get("ETag"))
+
+        _write_through(conn, endpoint, r.body)
+        return r.body
+    elif r.status_code == 400:
+        print("Jarvis-api bad request: {0}".format(r.body))
+        print(json.dumps(resource_updated))
+    elif r.status_code == 404:
+        print("Jarvis-api not found: {0}".format(resource_id))
+
+async def _put_jarvis_resource(endpoint, conn, resource_id, resource_updated):
+    return _convert(await _put_jarvis_resource_unconverted(endpoint, conn,
+        resource_id, resource_updated))
+
+put_tag = partial(_put_jarvis_resource, 'tags')
+put_event = partial(_put_jarvis_resource, 'events')
+
+
+async def _post_jarvis_resource_unconverted(endpoint, conn, resource_request,
+        quiet, skip_tags_check):
+    url = _build_url(conn.url, endpoint)
+
+    if skip_tags_check:
+        url = "{0}?skipTagsCheck=true".format(url)
+
+    r = await _request("POST", conn, url, json=resource_request)
+
+    if r.status_code == 200 or r.status_code == 201:
+        _write_through(conn, endpoint, r.body)
+        return r.body
+    elif not quiet:
+        print("Jarvis-api error: {0}, {1}".format(r.status_code, r.body or {}))
+
+async def _post_jarvis_resource(endpoint, conn, resource_request, quiet=False,
+        skip_tags_check=False):
+    return _convert(await _post_jarvis_resource_unconverted(endpoint, conn,
+        resource_request, quiet, skip_tags_check))
+
+post_tag = partial(_post_jarvis_resource, 'tags')
+
+async def post_event(conn, event_request, quiet=False):
+    return await _post_jarvis_resource_unconverted('events', conn,
+            event_request, quiet=quiet, skip_tags_check=False)
+
+
+async def _query_page(conn, url):
+    r = await _request("GET", conn, url)
+
+    if r.status_code == 200:
+        return _parse_query_page(r.body)
+    else:
+        print("Jarvis-api error: {0}".format(r.status_code))
+        return [], None
+
+async def _query_pages(endpoint, conn, query_params):
+    next_link = _build_query_url(endpoint, conn, query_params)
+
+    while next_link:
+        items, next_link = await _query_page(conn, next_link)
+        yield items
+
+async def prefetch_generator(results_generator, depth=DEFAULT_PREFETCH):
+    """Consume an async results generator in a background task so that up to
+    `depth` batches are fetched ahead of the consumer
+
+    Errors raised by `results_generator` are reraised to the consumer.
+    """
+    batches = asyncio.Queue(maxsize=depth)
+    end = object()
+
+    async def produce():
+        try:
+            async for results in results_generator:
+                await batches.put((results, None))
+            await batches.put((end, None))
+        except Exception as e:
+            await batches.put((None, e))
+
+    producer = asyncio.ensure_future(produce())
+
+    try:
+        while True:
+            results, error = await batches.get()
+
+            if error:
+                raise error
+            elif results is end:
+                break
+
+            yield results
+    finally:
+        producer.cancel()
+
+async def query_generator(endpoint, conn, query_params, prefetch=0):
+    """Async generator of batches of resources which follows the paginated
+    results
+
+    :param prefetch: Number of batches to read ahead in the background while the
+        current batch is being consumed. Zero disables reading ahead.
+    """
+    results_generator = _query_pages(endpoint, conn, query_params)
+
+    if prefetch > 0:
+        results_generator = prefetch_generator(results_generator, prefetch)
+
+    async for items in results_generator:
+        yield [ _convert(item) for item in items ]
+
+async def query(endpoint, conn, query_params, prefetch=0):
+    return list(chain.from_iterable([ results async for results
+        in query_generator(endpoint, conn, query_params, prefetch) ]))
+
+
+def _construct_log_entry_endpoint(event_id):
+    return "events/{0}/logentries".format(event_id)
+
+async def get_log_entry(event_id, conn, log_entry_id, revalidate=False):
+    return await _get_jarvis_resource(_construct_log_entry_endpoint(event_id),
+            conn, log_entry_id, revalidate)
+
+async def post_log_entry(event_id, conn, log_entry_request, quiet=False,
+        skip_tags_check=False):
+    return await _post_jarvis_resource(_construct_log_entry_endpoint(event_id),
+            conn, log_entry_request, quiet, skip_tags_check)
+
+async def put_log_entry(event_id, conn, log_entry_id, log_entry_request):
+    return await _put_jarvis_resource(_construct_log_entry_endpoint(event_id),
+            conn, log_entry_id, log_entry_request)
+
+query_log_entries = partial(query, "search/logentries")
+query_log_entries_generator = partial(query_generator, "search/logentries")
@@ -0,0 +1,149 @@
+import os, json, time, threading
+import urllib.parse
+from datetime import timezone
+from email.utils import format_datetime
+from jarvis_cli import timestamps
+
+
+class CacheEntry(object):
+
+    def __init__(self, resource, fetched, etag=None):
+        self.resource = resource
+        self.fetched = fetched
+        self.etag = etag
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched < ttl
+
+    def validators(self):
+        """Headers used to make a conditional request to revalidate this entry"""
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        modified = self.resource.get("modified")
+        modified = timestamps.parse_iso_datetime(modified) if modified else None
+
+        if modified:
+            # HTTP dates are only to the second
+            headers["If-Modified-Since"] = format_datetime(modified.replace(
+                microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+        return headers
+
+
+class ResourceCache(object):
+    """Persistent cache of Jarvis resources keyed by endpoint and resource id
+
+    Each resource is stored as its own json file. Entries younger than `ttl`
+    seconds are served as is and older ones get revalidated with a conditional
+    request. When the files exceed `max_size` bytes, the least recently used
+    entries get evicted.
+    """
+
+    def __init__(self, cache_dir, ttl=300, max_size=50*1024*1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # Lazily calculated on the first write
+        self._size = None
+
+    def _path(self, endpoint, resource_id):
+        return os.path.join(self.cache_dir, urllib.parse.quote(endpoint, safe=""),
+                "{0}.json".format(urllib.parse.quote(str(resource_id), safe="")))
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+
+                yield path, st
+
+    def get(self, endpoint, resource_id):
+        path = self._path(endpoint, resource_id)
+
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            # Modified time tracks the last use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+
+        return CacheEntry(entry["resource"], entry["fetched"], entry.get("etag"))
+
+    def revalidated(self, endpoint, resource_id, entry):
+        """Restart the ttl of an entry that the api confirmed unchanged"""
+        self.put(endpoint, resource_id, entry.resource, entry.etag)
+
+    def put(self, endpoint, resource_id, resource, etag=None):
+        path = self._path(endpoint, resource_id)
+        content = json.dumps({ "fetched": time.time(), "etag": etag,
+            "resource": resource })
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(st.st_size for _, st in self._entries())
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            try:
+                self._size -= os.stat(path).st_size
+            except OSError:
+                pass
+
+            path_temp = "{0}.{1}.tmp".format(path, threading.get_ident())
+
+            with open(path_temp, 'w') as f:
+                f.write(content)
+
+            os.replace(path_temp, path)
+            self._size += len(content)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def remove(self, endpoint, resource_id):
+        path = self._path(endpoint, resource_id)
+
+        with self._lock:
+            try:
+                size = os.stat(path).st_size
+                os.remove(path)
+            except OSError:
+                return
+
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        # Evict down to 90% so that eviction doesn't happen on every write
+        target = self.max_size * 0.9
+
+        for path, st in sorted(self._entries(), key=lambda e: e[1].st_mtime):
+            if self._size <= target:
+                break
+
+            try:
+                os.remove(path)
+                self._size -= st.st_size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for path, _ in list(self._entries()):
+                os.remove(path)
+
+            self._size = 0
@@ -1,9 +1,98 @@
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 from functools import partial
 import json
+import queue
+import threading
+import time
 import urllib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from jarvis_cli.outbox import resource_version, new_idempotency_key
+
+
+def create_session(user, password, pool_size=10, retries=3, backoff=0.5):
+    """Create a pooled, keep-alive session to be shared by all client calls
+
+    Only idempotent requests get retried which is urllib3's default behavior so
+    posts will not be duplicated.
+
+    :param pool_size: Maximum number of connections kept alive per host
+    :param retries: Number of retries on connection errors and 502/503/504s
+    :param backoff: Backoff factor in seconds used between retries
+    """
+    session = requests.Session()
+    session.auth = (user, password)
+
+    retry = Retry(total=retries, backoff_factor=backoff,
+            status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+            max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+RequestRecord = namedtuple("RequestRecord", ["method", "endpoint", "url",
+    "status", "bytes", "latency", "retries", "error"])
+
+_request_listeners = []
+
+def add_request_listener(listener):
+    """Register a function that gets called with a RequestRecord after every
+    client request, including the failed ones
+
+    Listeners are called from whichever thread made the request.
+    """
+    _request_listeners.append(listener)
+
+def remove_request_listener(listener):
+    _request_listeners.remove(listener)
+
+def _endpoint_pattern(conn, url):
+    """Endpoint of a url with the resource ids replaced so that requests can be
+    grouped e.g. events/:id/logentries/:id"""
+    path = urllib.parse.urlsplit(url[len(conn.url):] if url.startswith(conn.url)
+            else url).path
+    parts = path.strip("/").split("/")
+
+    if parts[0] in ["tags", "events"]:
+        parts = [ ":id" if i % 2 == 1 else part for i, part in enumerate(parts) ]
+
+    return "/".join(parts)
+
+def _notify_request_listeners(method, conn, url, status, num_bytes, latency,
+        retries, error):
+    if _request_listeners:
+        record = RequestRecord(method, _endpoint_pattern(conn, url), url, status,
+                num_bytes, latency, retries, error)
+
+        for listener in list(_request_listeners):
+            listener(record)
+
+def _request(method, conn, url, **kwargs):
+    kwargs.setdefault("timeout", conn.timeout)
+
+    if not _request_listeners:
+        return conn.session.request(method, url, **kwargs)
+
+    start = time.perf_counter()
+
+    try:
+        r = conn.session.request(method, url, **kwargs)
+    except Exception as e:
+        _notify_request_listeners(method, conn, url, None, 0,
+                time.perf_counter() - start, None, type(e).__name__)
+        raise
+
+    retry = getattr(r.raw, "retries", None)
+    _notify_request_listeners(method, conn, url, r.status_code, len(r.content),
+            time.perf_counter() - start,
+            len(retry.history) if retry is not None else 0, None)
+
+    return r
 
 
 def _build_url(*args):
@@ -30,36 +119,151 @@ def _convert(json_object):
         return dict([ replace_links(k, v) for k,v in json_object.items() ])
 
 
-def _get_jarvis_resource_unconverted(endpoint, conn, resource_id):
+def _get_jarvis_resource_unconverted(endpoint, conn, resource_id,
+        revalidate=False):
+    """Get a resource going through the connection's cache if there is one
+
+    :param revalidate: Validate the cached resource with the api even if its
+        ttl has not expired
+    """
+    cache = conn.cache
+    entry = cache.get(endpoint, resource_id) if cache else None
+
+    if entry and not revalidate and entry.is_fresh(cache.ttl):
+        return entry.resource
+
     url = _build_url(conn.url, endpoint, urllib.parse.quote(resource_id))
-    r = requests.get(url, auth=(conn.user, conn.password))
+    headers = entry.validators() if entry else None
+    r = _request("GET", conn, url, headers=headers) if headers \
+            else _request("GET", conn, url)
 
-    if r.status_code == 200:
-        return r.json()
+    if r.status_code == 304 and entry:
+        cache.revalidated(endpoint, resource_id, entry)
+        return entry.resource
+    elif r.status_code == 200:
+        resource = r.json()
+
+        if cache:
+            cache.put(endpoint, resource_id, resource, r.headers.get("ETag"))
+
+        return resource
     elif r.status_code == 404:
+        if cache:
+            cache.remove(endpoint, resource_id)
+
         print("Jarvis-api not found: {0}".format(resource_id))
     else:
         print("Jarvis-api error: {0}, {1}".format(r.status_code, r.json()))
 
-def _get_jarvis_resource(endpoint, conn, resource_id):
-    return _convert(_get_jarvis_resource_unconverted(endpoint, conn, resource_id))
+def _get_jarvis_resource(endpoint, conn, resource_id, revalidate=False):
+    return _convert(_get_jarvis_resource_unconverted(endpoint, conn, resource_id,
+        revalidate))
 
 get_tag = partial(_get_jarvis_resource, 'tags')
 # WATCH! Events are unconverted.
 get_event = partial(_get_jarvis_resource_unconverted, 'events')
 
 
+DEFAULT_MAX_WORKERS = 10
+
+def _get_jarvis_resources(get_func, conn, resource_ids,
+        max_workers=DEFAULT_MAX_WORKERS):
+    """Get many resources concurrently over the connection's shared session
+
+    :param resource_ids: Iterable of resource ids which may contain duplicates
+        and Nones which are both skipped
+
+    :return: dict of resource id to resource, None for resources not found
+    """
+    resource_ids = list(set(rid for rid in resource_ids if rid))
+
+    if not resource_ids:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(resource_ids))) \
+            as executor:
+        resources = executor.map(partial(get_func, conn), resource_ids)
+        return dict(zip(resource_ids, resources))
+
+get_events = partial(_get_jarvis_resources, get_event)
+get_tags = partial(_get_jarvis_resources, get_tag)
+
+
+# Errors of an api that can't be reached at all
+UNREACHABLE_ERRORS = (requests.ConnectionError, requests.Timeout)
+_UNAVAILABLE_STATUSES = [502, 503, 504]
+
+def _send_or_queue(method, conn, url, endpoint, resource_request,
+        resource_id=None, skip_tags_check=False, idempotency_key=None, **kwargs):
+    """Make a write request or, when the api is unreachable, queue it in the
+    connection's outbox to be sent later
+
+    :param idempotency_key: Sent as the Idempotency-Key header and kept as the
+        key of the queued write. A timed out post may have been created so
+        sending it again with the same key lets the api drop it.
+    :return: The response or None when queued
+    """
+    if idempotency_key:
+        kwargs["headers"] = { "Idempotency-Key": idempotency_key }
+
+    # Writes queued earlier get sent first so that the writes stay in order.
+    # Doing it at the first write means commands that only read never wait on
+    # an unreachable api.
+    if conn.outbox and conn.outbox.has_pending():
+        print("Sent the writes queued in the outbox, #sent: {0}, #rejected: {1}, "
+                "#still queued: {2}".format(*conn.outbox.flush(conn)))
+
+    # Otherwise still unreachable so the write gets queued behind the others
+    if not conn.outbox or not conn.outbox.has_pending():
+        try:
+            r = _request(method, conn, url, json=resource_request, **kwargs)
+
+            if r.status_code not in _UNAVAILABLE_STATUSES or not conn.outbox:
+                return r
+        except UNREACHABLE_ERRORS:
+            if not conn.outbox:
+                raise
+
+    # The cached resource is the one that was read before being edited
+    entry = conn.cache.get(endpoint, resource_id) \
+            if conn.cache and resource_id else None
+    key = conn.outbox.enqueue(method, endpoint, resource_request, resource_id,
+            skip_tags_check, resource_version(entry.resource) if entry else None,
+            idempotency_key)
+    print("Jarvis-api unreachable, queued in the outbox to send later: {0}"
+            .format(key))
+
+def _write_through(conn, endpoint, resource):
+    """Keep the connection's local replica, if there is one, up to date with a
+    resource written to the api"""
+    if conn.replica:
+        conn.replica.upsert_written(endpoint, resource)
+
 def _put_jarvis_resource_unconverted(endpoint, conn, resource_id, resource_updated):
     url = _build_url(conn.url, endpoint, urllib.parse.quote(resource_id))
-    r = requests.put(url, auth=(conn.user, conn.password), json=resource_updated)
+    r = _send_or_queue("PUT", conn, url, endpoint, resource_updated, resource_id)
+
+    if r is None:
+        return
+
+    if conn.cache:
+        conn.cache.remove(endpoint, resource_id)
 
     if r.status_code == 200:
-        return r.json()
+        resource = r.json()
+
+        if conn.cache:
+            conn.cache.put(endpoint, resource_id, resource, r.headers.get("ETag"))
+
+        _write_through(conn, endpoint, resource)
+        return resource
     elif r.status_code == 400:
         print("Jarvis-api bad request: {0}".format(r.json()))
         print(json.dumps(resource_updated))
     elif r.status_code == 404:
         print("Jarvis-api not found: {0}".format(resource_id))
+    else:
+        print("Jarvis-api error: {0}".format(r.status_code))
 
 def _put_jarvis_resource(endpoint, conn, resource_id, resource_updated):
     return _convert(_put_jarvis_resource_unconverted(endpoint, conn, resource_id,
@@ -70,16 +274,26 @@ put_event = partial(_put_jarvis_resource, 'events')
 
 
 def _post_jarvis_resource_unconverted(endpoint, conn, resource_request, quiet,
-        skip_tags_check):
+        skip_tags_check, idempotency_key=None):
+    """
+    :param idempotency_key: Key of a queued post being sent again otherwise a
+        new one is made for the post
+    """
     url = _build_url(conn.url, endpoint)
 
     if skip_tags_check:
         url = "{0}?skipTagsCheck=true".format(url)
 
-    r = requests.post(url, auth=(conn.user, conn.password), json=resource_request)
+    r = _send_or_queue("POST", conn, url, endpoint, resource_request,
+            skip_tags_check=skip_tags_check,
+            idempotency_key=idempotency_key or new_idempotency_key())
 
-    if r.status_code == 200 or r.status_code == 201:
-        return r.json()
+    if r is None:
+        return
+    elif r.status_code == 200 or r.status_code == 201:
+        resource = r.json()
+        _write_through(conn, endpoint, resource)
+        return resource
     else:
         try:
             body = r.json()
@@ -102,26 +316,10 @@ def post_event(conn, event_request, quiet=False):
             quiet=quiet, skip_tags_check=False)
 
 
-def query_generator(endpoint, conn, query_params):
-    def query_jarvis_resources(url):
-        r = requests.get(url, auth=(conn.user, conn.password))
-
-        if r.status_code == 200:
-            result = r.json()
-
-            # Try to pull out next link
-            links = [link['href'] for link in result['links']
-                    if link['rel'] == "next"]
-            next_link = links.pop() if links else None
-
-            return result["items"], next_link
-        else:
-            print("Jarvis-api error: {0}".format(r.status_code))
-            return []
-
+def _build_query_url(endpoint, conn, query_params):
     # REVIEW: This whole query url construction needs to be revisited
 
-    next_link = _build_url(conn.url, endpoint)
+    url = _build_url(conn.url, endpoint)
 
     def query_param(field, value):
         return "{0}={1}".format(field, urllib.parse.quote(value)) \
@@ -132,7 +330,32 @@ def query_generator(endpoint, conn, query_params):
     if query_params:
         query = "&".join([query_param(field, value)
             for field, value in query_params])
-        next_link = "?".join([next_link, query])
+        url = "?".join([url, query])
+
+    return url
+
+def _parse_query_page(result):
+    """
+    :return: Tuple of the items of a page of query results and the link to the
+        next page, None for the last page
+    """
+    # Try to pull out next link
+    links = [link['href'] for link in result['links'] if link['rel'] == "next"]
+    next_link = links.pop() if links else None
+
+    return result["items"], next_link
+
+def _query_generator(endpoint, conn, query_params):
+    def query_jarvis_resources(url):
+        r = _request("GET", conn, url)
+
+        if r.status_code == 200:
+            return _parse_query_page(r.json())
+        else:
+            print("Jarvis-api error: {0}".format(r.status_code))
+            return [], None
+
+    next_link = _build_query_url(endpoint, conn, query_params)
 
     while True:
         items, next_link = query_jarvis_resources(next_link)
@@ -143,13 +366,126 @@ def query_generator(endpoint, conn, query_params):
 
     return []
 
-def query(endpoint, conn, query_params):
+DEFAULT_PREFETCH = 1
+
+def prefetch_generator(results_generator, depth=DEFAULT_PREFETCH):
+    """Consume a results generator in a background thread so that up to `depth`
+    batches are fetched ahead of the consumer
+
+    Errors raised by `results_generator` are reraised to the consumer.
+    """
+    batches = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        # Don't block forever on a consumer that has stopped consuming
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for results in results_generator:
+                if not put((results, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((None, e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            results, error = batches.get()
+
+            if error:
+                raise error
+            elif results is end:
+                break
+
+            yield results
+    finally:
+        stopped.set()
+
+def query_generator(endpoint, conn, query_params, prefetch=0):
+    """Generator of batches of resources which follows the paginated results
+
+    :param prefetch: Number of batches to read ahead in the background while the
+        current batch is being consumed. Zero disables reading ahead.
+    """
+    results_generator = _query_generator(endpoint, conn, query_params)
+
+    if prefetch > 0:
+        results_generator = prefetch_generator(results_generator, prefetch)
+
+    return results_generator
+
+def limit_generator(results_generator, limit):
+    """Pass through the batches of a results generator until `limit` results
+    have been produced
+
+    Further batches are not pulled from `results_generator` once the limit is
+    satisfied so no extra requests get made.
+    """
+    if limit is None:
+        for results in results_generator:
+            yield results
+        return
+
+    remaining = limit
+
+    if remaining <= 0:
+        return
+
+    for results in results_generator:
+        results = results[:remaining]
+        remaining -= len(results)
+        yield results
+
+        if remaining <= 0:
+            break
+
+def query(endpoint, conn, query_params, prefetch=0):
     return list(chain.from_iterable(
-        [ results for results in query_generator(endpoint, conn, query_params) ]))
+        [ results for results in query_generator(endpoint, conn, query_params,
+            prefetch) ]))
 
 
 def get_data_summary(resource_type, conn):
     url = _build_url(conn.url, "datasummary", resource_type)
-    r = requests.get(url, auth=(conn.user, conn.password))
+    r = _request("GET", conn, url)
     r.raise_for_status()
     return r.json()
+
+DATA_SUMMARY_TYPES = ["tags", "logentries", "events"]
+
+def get_data_summaries(conn, previous=None):
+    """Get the data summaries of all the resource types concurrently
+
+    :param previous: Result of a previous call whose summaries get requested
+        conditionally with their ETags and reused when not modified
+    :return: dict of resource type to (summary, ETag)
+    """
+    previous = previous or {}
+
+    def get_one(resource_type):
+        summary, etag = previous.get(resource_type, (None, None))
+        url = _build_url(conn.url, "datasummary", resource_type)
+        r = _request("GET", conn, url, headers={ "If-None-Match": etag }) \
+                if etag else _request("GET", conn, url)
+
+        if r.status_code == 304 and summary:
+            return summary, etag
+
+        r.raise_for_status()
+        return r.json(), r.headers.get("ETag")
+
+    with ThreadPoolExecutor(max_workers=len(DATA_SUMMARY_TYPES)) as executor:
+        return dict(zip(DATA_SUMMARY_TYPES, executor.map(get_one,
+            DATA_SUMMARY_TYPES)))
@@ -1,15 +1,15 @@
 # TODO: Yes need to fix this violation of visibility
 from functools import partial
 from jarvis_cli.client.common import _get_jarvis_resource, _post_jarvis_resource, \
-    _put_jarvis_resource, query
+    _put_jarvis_resource, query, query_generator
 
 
 def _construct_log_entry_endpoint(event_id):
     return "events/{0}/logentries".format(event_id)
 
-def get_log_entry(event_id, conn, log_entry_id):
+def get_log_entry(event_id, conn, log_entry_id, revalidate=False):
     return _get_jarvis_resource(_construct_log_entry_endpoint(event_id), conn,
-            log_entry_id)
+            log_entry_id, revalidate)
 
 def post_log_entry(event_id, conn, log_entry_request, quiet=False,
         skip_tags_check=False):
@@ -21,3 +21,4 @@ def put_log_entry(event_id, conn, log_entry_id, log_entry_request):
             log_entry_id, log_entry_request)
 
 query_log_entries = partial(query, "search/logentries")
+query_log_entries_generator = partial(query_generator, "search/logentries")
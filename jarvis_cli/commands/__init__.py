@@ -1,20 +1,98 @@
 import os
+from importlib import import_module
 import click
 from jarvis_cli import config
 from jarvis_cli.exceptions import JarvisCliConfigError
-from jarvis_cli.interactive import prompt_init_config
-from jarvis_cli.commands import action_new, action_edit, action_show, action_list, \
-    action_admin
 
-@click.group()
+
+class LazyGroup(click.Group):
+    """Group whose subcommands' modules only get imported when used
+
+    The command modules and the heavy libraries that they import are most of
+    the startup time of the cli.
+
+    :param lazy_commands: dict of command name to "module:attribute"
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lazy_commands = kwargs.pop("lazy_commands", {})
+        super(LazyGroup, self).__init__(*args, **kwargs)
+
+    def list_commands(self, ctx):
+        return sorted(set(super(LazyGroup, self).list_commands(ctx))
+                | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_commands[cmd_name].split(":")
+            self.add_command(getattr(import_module(module_name), attribute),
+                    cmd_name)
+
+        return super(LazyGroup, self).get_command(ctx, cmd_name)
+
+
+class CliGroup(LazyGroup):
+    """Root group which runs the whole command under the profiler when the
+    `--profile` option is given"""
+
+    def invoke(self, ctx):
+        profile_path = ctx.params.get("profile_path")
+
+        if not profile_path:
+            return super(CliGroup, self).invoke(ctx)
+
+        from jarvis_cli.profiling import CommandProfile
+        command_profile = CommandProfile(profile_path, " ".join(
+            [ctx.command_path] + ctx.protected_args + ctx.args)).start()
+
+        try:
+            return super(CliGroup, self).invoke(ctx)
+        finally:
+            command_profile.stop()
+            click.echo("Profile report: {0}".format(profile_path), err=True)
+
+
+@click.group(cls=CliGroup, lazy_commands={
+    "new": "jarvis_cli.commands.action_new:do_action_new",
+    "edit": "jarvis_cli.commands.action_edit:do_action_edit",
+    "show": "jarvis_cli.commands.action_show:do_action_show",
+    "list": "jarvis_cli.commands.action_list:do_action_list",
+    "admin": "jarvis_cli.commands.action_admin:do_action_admin",
+    "graph": "jarvis_cli.commands.action_graph:do_action_graph",
+    "sync": "jarvis_cli.commands.action_sync:do_action_sync" })
 @click.option('-e', '--environment', default="default",
         help="Path to Jarvis cli configuration file")
 @click.option('--config-path', default=config.JARVIS_CLI_CONFIG_PATH,
             help="Path to Jarvis cli configuration file")
+@click.option('--no-cache', is_flag=True, default=False,
+            help="Bypass the local cache of Jarvis resources")
+@click.option('--remote', is_flag=True, default=False,
+            help="Read from the api even when there is a synced local replica")
+@click.option('--trace', is_flag=True, default=False,
+            help="Print a summary of the api requests made by the command")
+@click.option('--trace-path', default=None,
+            help="Path to write each api request made to as json lines")
+@click.option('--profile', 'profile_path', default=None,
+            help="Profile the command and write the report to this path")
 # This is sweet
 @click.version_option()
 @click.pass_context
-def cli(ctx, environment, config_path):
+def cli(ctx, environment, config_path, no_cache, remote, trace, trace_path,
+        profile_path):
+    # Profiling is handled by CliGroup.invoke so that it covers resolving the
+    # subcommand as well
+    if trace or trace_path:
+        from jarvis_cli.tracing import RequestTrace
+        request_trace = RequestTrace(trace_path).start()
+
+        def finish_trace():
+            request_trace.stop()
+
+            if trace:
+                click.echo(request_trace.summary(), err=True)
+
+        ctx.call_on_close(finish_trace)
+
     # Decided to put the configuration initialization here rather than making it
     # potentially two steps: 1. Get error for lack of config 2. Run some explicit
     # init command that gets executed only once anyways.
@@ -22,10 +100,13 @@ def cli(ctx, environment, config_path):
         try:
             config_map = config.get_config_map(environment, config_path)
             ctx.obj = { "config_map": config_map, "config_path": config_path,
-                    "connection": config.get_client_connection(config_map),
-                    "environment": environment }
+                    "connection": config.get_client_connection(config_map,
+                        use_cache=not no_cache),
+                    "environment": environment, "remote": remote }
             break
         except JarvisCliConfigError as e:
+            from jarvis_cli.interactive import prompt_init_config
+
             click.echo("Jarvis-cli has not been initialized. Let's initialize now.")
             # Use the default snapshots dir because intermediaries created. If
             # not used, so what
@@ -33,8 +114,29 @@ def cli(ctx, environment, config_path):
                 os.makedirs(config.JARVIS_CLI_DEFAULT_SNAPSHOTS_DIR)
             prompt_init_config(environment, config_path)
 
-cli.add_command(action_new.do_action_new)
-cli.add_command(action_edit.do_action_edit)
-cli.add_command(action_show.do_action_show)
-cli.add_command(action_list.do_action_list)
-cli.add_command(action_admin.do_action_admin)
+
+
+def flush_outbox(conn):
+    click.echo("Sending the writes queued in the outbox", err=True)
+    num_sent, num_rejected, num_pending = conn.outbox.flush(conn)
+    click.echo("#sent: {0}, #rejected: {1}, #still queued: {2}".format(num_sent,
+        num_rejected, num_pending), err=True)
+
+def open_replica(ctx, resource_type):
+    """Open the local replica for reading a resource type unless `--remote` was
+    given or it has not been synced
+
+    :return: LocalStore or None to read from the api
+    """
+    if ctx.obj.get("remote"):
+        return None
+
+    from jarvis_cli import local_store
+    store = local_store.open_synced_store(config.JARVIS_CLI_LOCAL_DIR,
+            ctx.obj["environment"], resource_type)
+
+    if store:
+        click.echo("Reading the local replica, use --remote to read from the api",
+                err=True)
+
+    return store
@@ -1,6 +1,7 @@
+import os
+from datetime import datetime
 import click
-from tabulate import tabulate
-from jarvis_cli import client, admin, config
+from jarvis_cli import client, admin, config, local_store
 
 @click.group(name="admin")
 def do_action_admin():
@@ -8,22 +9,120 @@ def do_action_admin():
     pass
 
 @do_action_admin.command(name="status")
+@click.option('-w', '--watch', is_flag=True, default=False,
+        help='Keep refreshing the status from the api')
+@click.option('-i', '--interval', type=float, default=10, show_default=True,
+        help='Seconds between refreshes when watching')
+@click.option('-n', '--count', type=int, default=None,
+        help='Number of refreshes before stopping to watch')
+@click.option('--local', is_flag=True, default=False,
+        help='Show the status of the local replica instead')
 @click.pass_context
-def show_status(ctx):
+def show_status(ctx, watch, interval, count, local):
     """Show the Jarvis data api status"""
+    from tabulate import tabulate
+
+    if local:
+        store = local_store.open_synced_store(config.JARVIS_CLI_LOCAL_DIR,
+                ctx.obj["environment"], "tags")
+
+        if not store:
+            print("Local replica is empty. Run `jarvis sync` first.")
+            return
+
+        summaries = store.data_summary()
+        columns = list(summaries[0].keys())
+        print(tabulate([ list(summary.values()) for summary in summaries ],
+            columns, tablefmt="simple"))
+        return
+
     conn = ctx.obj["connection"]
-    columns = list(client.get_data_summary("tags", conn).keys())
-    summaries = [ list(client.get_data_summary(rt, conn).values())
-            for rt in ["tags", "logentries", "events"] ]
-    print(tabulate(summaries, columns, tablefmt="simple"))
+
+    if not watch:
+        summaries = [ summary for summary, _ in
+                client.get_data_summaries(conn).values() ]
+        columns = list(summaries[0].keys())
+        print(tabulate([ list(summary.values()) for summary in summaries ],
+            columns, tablefmt="simple"))
+        return
+
+    _watch_status(conn, interval, count)
+
+def _watch_status(conn, interval, count):
+    """Refresh the data summaries with conditional requests so that the
+    unchanged ones cost a 304 and show the changes since the previous refresh"""
+    import time
+    import requests
+    from tabulate import tabulate
+    from jarvis_cli.tracing import RequestTrace
+
+    previous = {}
+    previous_time = None
+    num_refreshes = 0
+
+    while True:
+        trace = RequestTrace().start()
+
+        try:
+            summaries = client.get_data_summaries(conn, previous)
+        except client.UNREACHABLE_ERRORS as e:
+            summaries = None
+            print("Jarvis-api unreachable, retrying in {0}s: {1}".format(interval,
+                e))
+        except requests.HTTPError as e:
+            # Server errors like a 503 while restarting are an outage too
+            if e.response is None or e.response.status_code < 500:
+                raise
+
+            summaries = None
+            print("Jarvis-api unavailable, retrying in {0}s: {1}".format(interval,
+                e))
+        finally:
+            trace.stop()
+
+        now = time.time()
+
+        if summaries:
+            # The columns are whatever the api's summaries have
+            columns = list(next(iter(summaries.values()))[0].keys())
+            rows = []
+
+            for resource_type, (summary, _) in summaries.items():
+                num = summary.get("count")
+                num_prev = previous[resource_type][0].get("count") \
+                        if resource_type in previous else None
+                delta = num - num_prev \
+                        if num is not None and num_prev is not None else None
+                rows.append([ summary.get(column) for column in columns ]
+                        + [delta, "{0:.1f}".format(delta/(now - previous_time)*60)
+                            if delta is not None else None])
+
+            print(datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"))
+            print(tabulate(rows, columns + ["delta", "per minute"],
+                tablefmt="simple"))
+            print("#requests: {0}, #not modified: {1}, elapsed: {2:.3f}s\n"
+                    .format(len(trace.records), len([ r for r in trace.records
+                        if r.status == 304 ]), trace.elapsed()))
+
+            previous = summaries
+            previous_time = now
+
+        num_refreshes += 1
+
+        if count and num_refreshes >= count:
+            break
+
+        time.sleep(interval)
 
 @do_action_admin.command(name="backup")
+@click.option('-i', '--incremental', is_flag=True, default=False,
+        help='Only archive the changes since the latest snapshot')
 @click.pass_context
-def backup(ctx):
+def backup(ctx, incremental):
     """Create a new snapshot"""
     environment = ctx.obj["environment"]
     config_map = ctx.obj["config_map"]
-    filepath = admin.create_snapshot(environment, config_map)
+    filepath = admin.create_snapshot(environment, config_map, incremental)
 
     if filepath:
         print("Backing up successful: {0}".format(filepath))
@@ -44,11 +143,98 @@ def restore(ctx, snapshot_path):
 @do_action_admin.command(name="migrate")
 @click.option('-s', '--environment-source', required=True,
         help='Jarvis environment name found in the cli_config.ini')
+@click.option('-w', '--workers', default=10, show_default=True,
+        help='Number of concurrent posts to the target environment')
+@click.option('--checkpoint-path', default=None,
+        help='Path to the migration checkpoint used to resume interrupted runs')
+@click.option('--restart', is_flag=True, default=False,
+        help='Discard the existing checkpoint and migrate from the beginning')
 @click.pass_context
-def migrate(ctx, environment_source):
+def migrate(ctx, environment_source, workers, checkpoint_path, restart):
     """Perform a data migration"""
-    conn = ctx.obj["connection"]
+    # Failed posts get retried by resuming the migration and not by the outbox
+    conn = ctx.obj["connection"]._replace(outbox=None)
     config_path = ctx.obj["config_path"]
     config_map_prev = config.get_config_map(environment_source, config_path)
     conn_prev = config.get_client_connection(config_map_prev)
-    admin.migrate(conn_prev, conn)
+
+    if not checkpoint_path:
+        if not os.path.exists(config.JARVIS_CLI_MIGRATIONS_DIR):
+            os.makedirs(config.JARVIS_CLI_MIGRATIONS_DIR)
+
+        checkpoint_path = os.path.join(config.JARVIS_CLI_MIGRATIONS_DIR,
+                "{0}_to_{1}.jsonl".format(environment_source,
+                    ctx.obj["environment"]))
+
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print("Migration checkpoint: {0}".format(checkpoint_path))
+
+    if admin.migrate(conn_prev, conn, checkpoint_path, workers):
+        print("Migration successful")
+    else:
+        print("Migration incomplete, rerun to resume")
+
+@do_action_admin.command(name="import")
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('-e', '--event-id', default=None,
+        help='Event to associate log entries that have no "Event" metadata')
+@click.option('-w', '--workers', default=10, show_default=True,
+        help='Number of concurrent uploads')
+@click.option('-p', '--processes', type=int, default=None,
+        help='Number of processes parsing files [default: number of cpus]')
+@click.option('--results-path', default=None,
+        help='Path to write the result of each file as json lines')
+@click.pass_context
+def import_files(ctx, directory, event_id, workers, processes, results_path):
+    """Import a directory of tag and log entry files"""
+    # Failed uploads are recorded in the results rather than queued
+    conn = ctx.obj["connection"]._replace(outbox=None)
+    author = config.get_author(ctx.obj["config_map"])
+
+    if not results_path:
+        results_path = "jarvis_import_{0}.jsonl".format(
+                datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+
+    num_succeeded, num_failed = admin.import_resources(conn, directory, author,
+            results_path, event_id, workers, processes)
+
+    print("#succeeded: {0}, #failed: {1}, results: {2}".format(num_succeeded,
+        num_failed, results_path))
+
+@do_action_admin.command(name="retag")
+@click.option('--from', 'tag_from', required=True, help='Tag to replace')
+@click.option('--to', 'tag_to', required=True,
+        help='Tag to replace it with which gets created if it does not exist')
+@click.option('-w', '--workers', default=10, show_default=True,
+        help='Number of concurrent updates')
+@click.option('--dry-run', is_flag=True, default=False,
+        help='Only report the log entries and tags that would change')
+@click.pass_context
+def retag(ctx, tag_from, tag_to, workers, dry_run):
+    """Rename or merge a tag across log entries and tags
+
+    The replaced tag itself is left as is.
+    """
+    # Conflicts and failures get retried by rerunning and not by the outbox
+    conn = ctx.obj["connection"]._replace(outbox=None)
+    author = config.get_author(ctx.obj["config_map"])
+
+    num_updated, num_conflicts, num_failed = admin.retag(conn, author, tag_from,
+            tag_to, dry_run, workers)
+
+    if not dry_run:
+        print("#updated: {0}, #conflicts: {1}, #failed: {2}".format(num_updated,
+            num_conflicts, num_failed))
+
+@do_action_admin.command(name="index")
+@click.pass_context
+def index(ctx):
+    """Update the local search index of log entries only, see `jarvis sync`"""
+    conn = ctx.obj["connection"]
+    store = local_store.open_local_store(config.JARVIS_CLI_LOCAL_DIR,
+            ctx.obj["environment"])
+    print("Updating local index: {0}".format(store.db_path))
+    num_updated = store.update_log_entries(conn)
+    print("#log entries updated: {0}".format(num_updated))
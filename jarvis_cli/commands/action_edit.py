@@ -6,6 +6,7 @@ from jarvis_cli import client, config, formatting
 from jarvis_cli import file_helper as fh
 from jarvis_cli import interactive as jci
 from jarvis_cli.client import log_entry as cle
+from jarvis_cli.exceptions import JarvisParseError
 
 
 @click.group(name="edit")
@@ -15,13 +16,20 @@ def do_action_edit():
 
 def _edit_resource(conn, get_func, put_func, edit_file_func, show_file_func,
         post_edit_func, resource_id):
-    resource = get_func(conn, resource_id)
+    # Always edit the latest version of the resource and not a cached one
+    resource = get_func(conn, resource_id, revalidate=True)
 
     if resource:
         filepath = edit_file_func(resource, resource_id)
 
         if filepath:
-            json_object = fh.convert_file_to_json(filepath)
+            try:
+                json_object = fh.convert_file_to_json(filepath)
+            except JarvisParseError as e:
+                print("Could not parse, your changes are kept in {0}: {1}".format(
+                    filepath, e))
+                return
+
             json_object = post_edit_func(json_object)
 
             resource = put_func(conn, resource_id, json_object)
@@ -85,7 +93,7 @@ def edit_event(ctx, event_id):
     """Edit an existing event"""
     conn = ctx.obj["connection"]
 
-    event = client.get_event(conn, event_id)
+    event = client.get_event(conn, event_id, revalidate=True)
 
     occurred = jci.prompt_event_occurred(event["occurred"])
     category = jci.prompt_event_category(event["category"])
@@ -0,0 +1,73 @@
+import click
+from jarvis_cli import client
+from jarvis_cli.commands import open_replica
+from jarvis_cli.tag_graph import TagGraph
+
+
+@click.group(name="graph")
+def do_action_graph():
+    """Explore the graph of tags tagged with other tags"""
+    pass
+
+def _load_tag_graph(ctx):
+    """Build the tag graph from the local replica if synced otherwise from a
+    single query of all the tags"""
+    store = open_replica(ctx, "tags")
+    tags = store.search_tags() if store else client.query("tags",
+            ctx.obj["connection"], [], prefetch=client.DEFAULT_PREFETCH)
+    return TagGraph(tags)
+
+def _print_traversal(tag_name, visited, relation):
+    from tabulate import tabulate
+
+    if visited is None:
+        print("Tag not found: {0}".format(tag_name))
+    elif visited:
+        print(tabulate(visited, ["tag name", "depth"], tablefmt="simple"))
+    else:
+        print("No {0} found".format(relation))
+
+@do_action_graph.command(name="ancestors")
+@click.argument('tag-name')
+@click.pass_context
+def ancestors(ctx, tag_name):
+    """List the tags that a tag is tagged with transitively"""
+    _print_traversal(tag_name, _load_tag_graph(ctx).ancestors(tag_name),
+            "ancestors")
+
+@do_action_graph.command(name="descendants")
+@click.argument('tag-name')
+@click.pass_context
+def descendants(ctx, tag_name):
+    """List the tags tagged with a tag transitively"""
+    _print_traversal(tag_name, _load_tag_graph(ctx).descendants(tag_name),
+            "descendants")
+
+@do_action_graph.command(name="cycles")
+@click.pass_context
+def cycles(ctx):
+    """List the groups of tags that are tagged with each other"""
+    tag_cycles = _load_tag_graph(ctx).cycles()
+
+    for cycle in tag_cycles:
+        print(", ".join(cycle))
+
+    print("Cycles found: {0}".format(len(tag_cycles)))
+
+@do_action_graph.command(name="orphans")
+@click.pass_context
+def orphans(ctx):
+    """List the tags not linked to any other tag and the tags linked to that
+    don't exist"""
+    tag_graph = _load_tag_graph(ctx)
+    tag_orphans = tag_graph.orphans()
+
+    for tag_name in tag_orphans:
+        print(tag_name)
+
+    print("Orphans found: {0} of {1} tags".format(len(tag_orphans),
+        len(tag_graph)))
+
+    for tag_name, linking in sorted(tag_graph.missing().items()):
+        print("Missing tag: {0}, linked by: {1}".format(tag_name,
+            ", ".join(linking)))
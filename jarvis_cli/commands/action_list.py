@@ -1,11 +1,10 @@
-import re, pprint
+import pprint
 from itertools import chain
 import click
-import dateparser
-from tabulate import tabulate
 import jarvis_cli as jc
 import jarvis_cli.file_helper as fh
-from jarvis_cli import client, formatting, config
+from jarvis_cli import client, formatting, config, snippets, timestamps
+from jarvis_cli.commands import open_replica
 
 
 @click.group(name="list")
@@ -13,33 +12,24 @@ def do_action_list():
     """Query and list Jarvis resources"""
     pass
 
-def _create_summary_of_log_entry(conn, log_entry):
+def _create_summary_of_log_entry(events, log_entry):
     """
     Form a summary representation of the log file.
+
+    :param events: dict of event id to event, see `client.get_events`. The
+        event is None when not found.
     """
-    try:
-        event_id = log_entry["event"]
-        event = client.get_event(conn, event_id)
-    except Exception as e:
-        pprint.pprint(log_entry)
-        raise e
+    event = events.get(log_entry["event"])
 
     def format_ids():
         return "{0} -e {1}".format(log_entry["id"], log_entry["event"])
 
     def format_timestamps():
-        def iso_to_datetime(str_datetime):
-            # dateparser cannot handle microseconds apparently
-            dt = dateparser.parse(str_datetime)
-            if dt:
-                return dt
-            elif "." in str_datetime:
-                stripped_ms = str_datetime[:str_datetime.index(".")]
-                return iso_to_datetime(stripped_ms)
-
-
-        created = iso_to_datetime(log_entry['created'])
-        occurred = iso_to_datetime(event['occurred'])
+        if not event:
+            return "Occurred: unknown, Created: {0}".format(log_entry["created"])
+
+        created = timestamps.parse_iso_datetime(log_entry['created'])
+        occurred = timestamps.parse_iso_datetime(event['occurred'])
         delta = (created - occurred).total_seconds()
         dates = { "created": log_entry["created"],
                 "occurred": event["occurred"],
@@ -57,46 +47,96 @@ def _create_summary_of_log_entry(conn, log_entry):
     return "\n".join([func() for func in [format_ids, format_timestamps,
         format_tags, format_blurb]])
 
-def format_log_entry(conn, log_entry, search_term=None):
-    if search_term:
-        # This regex will look for a search term and grab 60 characters
-        # around the matched term.
-        search_regex = re.compile('.{{0,30}}\S*{0}\S*.{{0,30}}'
-                .format(search_term), re.IGNORECASE)
-
-        def find_search_term(log_entry):
-            """
-            :return: List of the matched strings
-            """
-            return [ m.group(0) for m in
-                    search_regex.finditer(log_entry['body']) ]
-
-        def format_matches(matches):
-            if matches:
-                return "\n".join([ "[{0}]: \"{1}\"".format(i, matches[i])
-                    for i in range(0, len(matches)) ])
-            else:
-                return "No matches"
+def _format_search_matches(matches):
+    if matches:
+        return "\n".join([ "[{0}]: \"{1}\"".format(i, matches[i])
+            for i in range(0, len(matches)) ])
+    else:
+        return "No matches"
 
+def format_log_entry(events, log_entry, search_term=None, matches=None):
+    """
+    :param matches: Already found snippets of the search term which otherwise
+        get searched for in the log entry's body
+    """
+    if search_term and matches is None:
+        # Grabs 30 characters on each side of the matched terms
+        matches = snippets.extract_snippets(search_term, log_entry['body'])
+
+    if search_term:
         return "\n\nSearch matches:\n".join([
-            _create_summary_of_log_entry(conn, log_entry),
-            format_matches(find_search_term(log_entry)) ])
+            _create_summary_of_log_entry(events, log_entry),
+            _format_search_matches(matches) ])
     else:
-        return _create_summary_of_log_entry(conn, log_entry)
+        return _create_summary_of_log_entry(events, log_entry)
+
+def _list_log_entries_local(store, tag_name, search_term, limit):
+    results = store.search_log_entries(tag_name, search_term, limit)
+
+    if results:
+        events = store.get_events([ log["event"] for log, _ in results ])
+        # Most relevant ends up last, closest to the prompt
+        logs = [ format_log_entry(events, log, search_term, matches)
+                for log, matches in reversed(results) ]
+        print("\n\n".join(logs))
+        print("\n\nLog entries found: {0}".format(len(logs)))
+    else:
+        print("No log entries found")
 
 @do_action_list.command(name="logs")
 @click.option('-t', '--tag-name', help='Search by tag name')
 @click.option('-s', '--search-term', help='Search term')
+@click.option('-n', '--limit', type=int, default=None,
+        help='Maximum number of log entries to list')
+@click.option('--stream', is_flag=True, default=False,
+        help='Print each page of results as it arrives')
+@click.option('--local', is_flag=True, default=False,
+        help='Query the local index instead of the api')
 @click.pass_context
-def list_log_entries(ctx, tag_name, search_term):
+def list_log_entries(ctx, tag_name, search_term, limit, stream, local):
     """Query and list log entries"""
+    store = open_replica(ctx, "logentries")
+
+    if local and not store:
+        print("Local index is empty. Run `jarvis sync` first.")
+        return
+    elif store:
+        _list_log_entries_local(store, tag_name, search_term, limit)
+        return
+
     conn = ctx.obj["connection"]
-    logs = client.query_log_entries(conn, [("tags", tag_name),
-        ("searchterm", search_term)])
+    # Reading ahead with a limit could fetch a page that never gets used
+    prefetch = 0 if limit else client.DEFAULT_PREFETCH
+    logs_generator = client.limit_generator(client.query_log_entries_generator(
+        conn, [("tags", tag_name), ("searchterm", search_term)], prefetch), limit)
+
+    def format_log_entries(logs):
+        # Fetch each distinct event once rather than once per log entry
+        events = client.get_events(conn, [ log["event"] for log in logs ])
+        return [ format_log_entry(events, log, search_term) for log in logs ]
+
+    if stream:
+        # Streaming prints in the order the api returns rather than reversed
+        # because reversing requires every page up front.
+        num_logs = 0
+
+        for logs in logs_generator:
+            for log in format_log_entries(logs):
+                if num_logs:
+                    print()
+                print(log)
+                num_logs += 1
+
+        if num_logs:
+            print("\n\nLog entries found: {0}".format(num_logs))
+        else:
+            print("No log entries found")
+        return
+
+    logs = list(chain.from_iterable(logs_generator))
 
     if logs:
-        logs = [ format_log_entry(conn, log, search_term)
-                for log in reversed(logs) ]
+        logs = format_log_entries(list(reversed(logs)))
         print("\n\n".join(logs))
         print("\n\nLog entries found: {0}".format(len(logs)))
     else:
@@ -105,16 +145,43 @@ def list_log_entries(ctx, tag_name, search_term):
 @do_action_list.command(name="tags")
 @click.option('-t', '--tag-name', help='Search by tag name')
 @click.option('-a', '--associated-tag-names', help='Search by associated tags')
+@click.option('-n', '--limit', type=int, default=None,
+        help='Maximum number of tags to list')
+@click.option('--stream', is_flag=True, default=False,
+        help='Print each page of results as it arrives')
 @click.pass_context
-def list_tags(ctx, tag_name, associated_tag_names):
+def list_tags(ctx, tag_name, associated_tag_names, limit, stream):
     """Query and list tags"""
     conn = ctx.obj["connection"]
-    tags = client.query("tags", conn, [("name", tag_name),
-        ("tags", associated_tag_names)])
+    store = open_replica(ctx, "tags")
+    prefetch = 0 if limit else client.DEFAULT_PREFETCH
+    tags_generator = iter([ store.search_tags(tag_name, associated_tag_names,
+        limit) ]) if store else client.limit_generator(client.query_generator(
+            "tags", conn, [("name", tag_name), ("tags", associated_tag_names)],
+            prefetch), limit)
+
+    def format_tags(tags):
+        from tabulate import tabulate
 
-    if tags:
         tags = [ [tag['name'], ",".join(tag['tags'])] for tag in tags ]
-        print(tabulate(tags, ["tag name", "tags"], tablefmt="simple"))
+        return tabulate(tags, ["tag name", "tags"], tablefmt="simple")
+
+    if stream:
+        num_tags = 0
+
+        for tags in tags_generator:
+            if tags:
+                print(format_tags(tags))
+                num_tags += len(tags)
+
+        if not num_tags:
+            print("No tags found")
+        return
+
+    tags = list(chain.from_iterable(tags_generator))
+
+    if tags:
+        print(format_tags(tags))
     else:
         print("No tags found")
 
@@ -122,16 +189,28 @@ def list_tags(ctx, tag_name, associated_tag_names):
 @click.option('-c', '--category', type=click.Choice(jc.EVENT_CATEGORIES), help='Event category')
 @click.option('-s', '--search-term', default=None, help='Search term to search in event descriptions')
 @click.option('--only-important', is_flag=True, default=False, help='Show only important events')
+@click.option('--prefetch', type=int, default=client.DEFAULT_PREFETCH, show_default=True,
+        help='Number of pages to fetch ahead in the background')
 @click.pass_context
-def list_events(ctx, category, search_term, only_important):
+def list_events(ctx, category, search_term, only_important, prefetch):
     """Query and list events"""
+    from tabulate import tabulate
+
     weight = None
     query_params = [('category', category), ('searchterm', search_term),
             ('weight', weight)]
     query_params = [ qp for qp in query_params if qp[1] != None ]
 
     conn = ctx.obj["connection"]
-    events_generator = client.query_generator('events', conn, query_params)
+    store = open_replica(ctx, "events")
+
+    if store:
+        events = store.search_events(category, search_term)
+        events_generator = iter([ events[i:i+20]
+            for i in range(0, len(events), 20) ])
+    else:
+        events_generator = client.query_generator('events', conn, query_params,
+                prefetch)
 
     def slice_and_display_events(events_generator, batch_size=20):
         """Slice events by using a the `query_generator` call with a specified
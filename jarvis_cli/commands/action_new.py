@@ -28,7 +28,17 @@ def create_tag(ctx, tag_name):
 
     conn = ctx.obj["connection"]
 
-    if client.get_tag(conn, tag_name.lower()):
+    try:
+        missing = fh.find_missing_tags(conn, [tag_name])
+    except client.UNREACHABLE_ERRORS:
+        if not conn.outbox:
+            raise
+
+        # An existing tag gets rejected when the queued post is sent
+        print("Jarvis-api unreachable, not checking the tag")
+        missing = [tag_name]
+
+    if not missing:
         print("Tag already exists: {0}".format(tag_name))
     else:
         author = config.get_author(ctx.obj["config_map"])
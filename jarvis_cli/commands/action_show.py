@@ -4,14 +4,21 @@ import click
 from jarvis_cli import file_helper as fh
 from jarvis_cli import client, formatting
 from jarvis_cli.client import log_entry as cle
+from jarvis_cli.commands import open_replica
 
 @click.group(name="show")
 def do_action_show():
     """Display a Jarvis resource"""
     pass
 
-def _get_and_show_resource(conn, get_func, show_file_func, resource_id):
-    resource = get_func(conn, resource_id)
+def _get_and_show_resource(conn, get_func, show_file_func, resource_id,
+        store_get_func=None):
+    """
+    :param store_get_func: Gets the resource from the local replica. Resources
+        not in the replica yet get read from the api.
+    """
+    resource = store_get_func(resource_id) if store_get_func else None
+    resource = resource or get_func(conn, resource_id)
     show_file_func(resource, resource_id)
 
 @do_action_show.command(name="log")
@@ -23,7 +30,9 @@ def show_log_entry(ctx, log_entry_id, event_id):
     conn = ctx.obj["connection"]
     # TODO: There must be a easier way to get event id.
     get_func = partial(cle.get_log_entry, event_id)
-    _get_and_show_resource(conn, get_func, fh.show_file_log, log_entry_id)
+    store = open_replica(ctx, "logentries")
+    _get_and_show_resource(conn, get_func, fh.show_file_log, log_entry_id,
+            partial(store.get_log_entry, event_id) if store else None)
 
 @do_action_show.command(name="tag")
 @click.argument('tag-name')
@@ -31,7 +40,9 @@ def show_log_entry(ctx, log_entry_id, event_id):
 def show_tag(ctx, tag_name):
     """Display a tag"""
     conn = ctx.obj["connection"]
-    _get_and_show_resource(conn, client.get_tag, fh.show_file_tag, tag_name)
+    store = open_replica(ctx, "tags")
+    _get_and_show_resource(conn, client.get_tag, fh.show_file_tag, tag_name,
+            store.get_tag if store else None)
 
 @do_action_show.command(name="event")
 @click.argument('event-id')
@@ -39,7 +50,9 @@ def show_tag(ctx, tag_name):
 def show_event(ctx, event_id):
     """Display an event"""
     conn = ctx.obj["connection"]
-    event = client.get_event(conn, event_id)
+    store = open_replica(ctx, "events")
+    event = (store.get_event(event_id) if store else None) \
+            or client.get_event(conn, event_id)
 
     pprint.pprint(formatting.format_event(event), width=120)
     print("\n")
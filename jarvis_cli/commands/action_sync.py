@@ -0,0 +1,38 @@
+import time
+import click
+from jarvis_cli import config, local_store
+from jarvis_cli.commands import flush_outbox
+
+@click.group(name="sync", invoke_without_command=True)
+@click.pass_context
+def do_action_sync(ctx):
+    """Sync with the api, pushes then pulls by default"""
+    if ctx.invoked_subcommand is None:
+        ctx.invoke(push)
+        ctx.invoke(pull)
+
+@do_action_sync.command(name="push")
+@click.pass_context
+def push(ctx):
+    """Send the writes queued in the outbox while the api was unreachable"""
+    conn = ctx.obj["connection"]
+
+    if conn.outbox.has_pending():
+        flush_outbox(conn)
+    else:
+        print("Outbox is empty")
+
+@do_action_sync.command(name="pull")
+@click.pass_context
+def pull(ctx):
+    """Pull the resources modified since the last sync"""
+    conn = ctx.obj["connection"]
+    store = local_store.open_local_store(config.JARVIS_CLI_LOCAL_DIR,
+            ctx.obj["environment"])
+    print("Syncing local replica: {0}".format(store.db_path))
+    start_time = time.time()
+
+    for resource_type, num_updated in store.sync(conn):
+        print("#{0} updated: {1}".format(resource_type, num_updated))
+
+    print("Elapsed: {0:.1f}s".format(time.time() - start_time))
@@ -8,6 +8,10 @@ from jarvis_cli.exceptions import JarvisCliConfigError
 JARVIS_CLI_CONFIG_DIR = os.path.join(os.environ["HOME"], ".jarvis")
 JARVIS_CLI_CONFIG_PATH = os.path.join(JARVIS_CLI_CONFIG_DIR, "cli_config.ini")
 JARVIS_CLI_DEFAULT_SNAPSHOTS_DIR = os.path.join(JARVIS_CLI_CONFIG_DIR, "snapshots")
+JARVIS_CLI_MIGRATIONS_DIR = os.path.join(JARVIS_CLI_CONFIG_DIR, "migrations")
+JARVIS_CLI_CACHE_DIR = os.path.join(JARVIS_CLI_CONFIG_DIR, "cache")
+JARVIS_CLI_LOCAL_DIR = os.path.join(JARVIS_CLI_CONFIG_DIR, "local")
+JARVIS_CLI_OUTBOX_DIR = os.path.join(JARVIS_CLI_CONFIG_DIR, "outbox")
 
 
 @contextmanager
@@ -31,18 +35,72 @@ def get_config_map(environment, config_path):
 def _get_config_param(key, config_map, expected_type=str):
     return expected_type(config_map[key])
 
+def _get_config_param_or_default(key, default, config_map, expected_type=str):
+    # Optional parameters were added after configurations were already out in
+    # the wild so fallback to a default when missing.
+    return expected_type(config_map.get(key, default))
+
 get_api_url = partial(_get_config_param, "api_url")
 get_api_user = partial(_get_config_param, "api_user")
 get_api_password = partial(_get_config_param, "api_password")
 get_jarvis_data_directory = partial(_get_config_param, "data_directory")
 get_jarvis_snapshots_directory = partial(_get_config_param, "snapshots_directory")
 get_author = partial(_get_config_param, "author")
+get_api_pool_size = partial(_get_config_param_or_default, "api_pool_size", 10,
+        expected_type=int)
+get_api_timeout = partial(_get_config_param_or_default, "api_timeout", 30,
+        expected_type=int)
+get_api_retries = partial(_get_config_param_or_default, "api_retries", 3,
+        expected_type=int)
+get_api_backoff = partial(_get_config_param_or_default, "api_backoff", 0.5,
+        expected_type=float)
+get_cache_ttl = partial(_get_config_param_or_default, "cache_ttl", 300,
+        expected_type=int)
+get_cache_max_size = partial(_get_config_param_or_default, "cache_max_size",
+        50*1024*1024, expected_type=int)
+
+ClientConnection = namedtuple("ClientConnection", ["url", "user", "password",
+    "session", "timeout", "cache", "outbox", "replica", "existing_tag_names"],
+    defaults=[None, None, None])
+
+def get_client_connection(config_map, use_cache=True):
+    """
+    :param config_map: Configuration of an environment. The environment name is
+        used to separate the resource caches of environments.
+    :param use_cache: Use the local on-disk resource cache
+    """
+    # The session is shared by every client call made through this connection
+    # so that TCP/TLS connections get reused across requests.
+    from jarvis_cli.client.common import create_session
+    from jarvis_cli.client.cache import ResourceCache
+    from jarvis_cli.outbox import Outbox
+
+    user = get_api_user(config_map)
+    password = get_api_password(config_map)
+    session = create_session(user, password, get_api_pool_size(config_map),
+            get_api_retries(config_map), get_api_backoff(config_map))
+    cache = ResourceCache(os.path.join(JARVIS_CLI_CACHE_DIR, config_map.name),
+            get_cache_ttl(config_map), get_cache_max_size(config_map)) \
+                    if use_cache else None
+
+    # Writes made while the api is unreachable get queued in the outbox
+    outbox = Outbox(os.path.join(JARVIS_CLI_OUTBOX_DIR,
+        "{0}.jsonl".format(config_map.name)))
+
+    # Writes also go to the local replica once there is one so that reading it
+    # shows them before the next sync
+    replica = None
 
-ClientConnection = namedtuple("ClientConnection", ["url", "user", "password"])
+    if os.path.exists(os.path.join(JARVIS_CLI_LOCAL_DIR, "{0}.sqlite".format(
+        config_map.name))):
+        from jarvis_cli import local_store
+        replica = local_store.open_local_store(JARVIS_CLI_LOCAL_DIR,
+                config_map.name)
 
-def get_client_connection(config_map):
-    return ClientConnection(get_api_url(config_map).strip("/"),
-            get_api_user(config_map), get_api_password(config_map))
+    return ClientConnection(get_api_url(config_map).strip("/"), user, password,
+            session, get_api_timeout(config_map), cache, outbox, replica,
+            # Names of the tags found to exist through this connection
+            set())
 
 def _set_config_param(key, config_map, value, expected_type=str):
     if expected_type != type(value):
@@ -57,3 +115,9 @@ set_api_password = partial(_set_config_param, "api_password")
 set_jarvis_data_directory = partial(_set_config_param, "data_directory")
 set_jarvis_snapshots_directory = partial(_set_config_param, "snapshots_directory")
 set_author = partial(_set_config_param, "author")
+set_api_pool_size = partial(_set_config_param, "api_pool_size", expected_type=int)
+set_api_timeout = partial(_set_config_param, "api_timeout", expected_type=int)
+set_api_retries = partial(_set_config_param, "api_retries", expected_type=int)
+set_api_backoff = partial(_set_config_param, "api_backoff", expected_type=float)
+set_cache_ttl = partial(_set_config_param, "cache_ttl", expected_type=int)
+set_cache_max_size = partial(_set_config_param, "cache_max_size", expected_type=int)
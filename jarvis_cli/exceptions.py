@@ -4,3 +4,9 @@ class JarvisCliConfigError(RuntimeError):
 
 class JarvisPromptError(RuntimeError):
     pass
+
+class JarvisParseError(RuntimeError):
+    pass
+
+class JarvisSnapshotError(RuntimeError):
+    pass
@@ -1,9 +1,10 @@
-import os, subprocess, re
+import os, subprocess
 from functools import partial
-import webbrowser
 from datetime import datetime
 from jarvis_cli import client
+from jarvis_cli import resource_file as rf
 from jarvis_cli.client import log_entry as cle
+from jarvis_cli.exceptions import JarvisParseError
 
 
 def convert_file_to_json(file_path):
@@ -30,34 +31,7 @@ def convert_file_to_json(file_path):
 
     :return: json
     """
-    with open(file_path, 'r') as f:
-        (metadata, body) = f.read().split('\n\n', maxsplit=1)
-
-        def parse_metadata(line):
-            """
-            :param line: line for metadata e.g. "Author: John Doe"
-            :type line: string
-
-            :return: (key string, value string)
-            """
-            m = re.search('^(\w*): (.*)', line)
-            # Watch! Stripping trailing whitespace because for some reason
-            # certain field values are showing whitespace.
-            return m.group(1).lower(), m.group(2).strip()
-
-        t = [ parse_metadata(line) for line in metadata.split('\n') ]
-
-        response = dict(t)
-
-        if "tags" in response:
-            response['tags'] = response['tags'].split(', ')
-            # Handle scenario when there are no tags which will return an empty
-            # string. Also strip the unnecessary whitespaces.
-            response['tags'] = [ tag.strip() for tag in response['tags'] if tag ]
-        if body.strip():
-            response['body'] = body
-
-        return response
+    return rf.parse_file(file_path)
 
 def create_filepath(file_dir, file_name):
     """
@@ -95,32 +69,7 @@ def handle_jarvis_resource(metadata_keys, json_object, resource_id):
         return
 
     temp = "/tmp/{0}.md".format(resource_id)
-
-    def convert_json_to_file(metadata_keys, json_object):
-        def stringify(metadata_key):
-            if metadata_key == "tags":
-                return ", ".join(json_object.get(metadata_key))
-            else:
-                # Don't want to display literally "None" so check for None
-                # and convert to empty string.
-                v = json_object.get(metadata_key)
-                return v if v else ""
-
-        metadata = [ "{0}: {1}".format(k.capitalize(), stringify(k))
-                for k in metadata_keys ]
-        metadata = "\n".join(metadata)
-
-        # Events don't have bodies
-        if "body" in json_object:
-            return "\n\n".join([ metadata, json_object.get("body") ])
-        else:
-            # HACK: The hardcoded "\n\n" is necessary bc
-            # convert_file_to_json expects it.
-            return metadata + "\n\n"
-
-    with open(temp, 'w') as f:
-        f.write(convert_json_to_file(metadata_keys, json_object))
-
+    rf.write_file(temp, metadata_keys, json_object)
     return temp
 
 def edit_file(metadata_keys, json_object, resource_id):
@@ -138,6 +87,7 @@ def just_show_file(file_path):
         # Previews the markdown. This will require you to change the
         # mimeapps.list setting file in order to chose your markdown preview
         # tool.
+        import webbrowser
         webbrowser.open("file://{0}".format(file_path))
 
 def show_file(metadata_keys, json_object, resource_id):
@@ -147,16 +97,62 @@ def show_file(metadata_keys, json_object, resource_id):
 show_file_tag = partial(show_file, metadata_keys_tag_show)
 show_file_log = partial(show_file, metadata_keys_log_show)
 
+def find_missing_tags(conn, tag_names):
+    """Find the tags that don't exist by checking all of them in one round of
+    concurrent requests
+
+    Tags found get remembered in the connection's existing tag names, when it
+    has them, so that they are not checked again by the same connection.
+
+    :return: List of missing tag names in the order given
+    """
+    existing = conn.existing_tag_names if conn.existing_tag_names is not None \
+            else set()
+    to_check = [ tag_name.lower() for tag_name in tag_names
+            if tag_name.lower() not in existing ]
+    existing.update(tag_name for tag_name, tag
+            in client.get_tags(conn, to_check).items() if tag)
+
+    missing = []
+
+    for tag_name in tag_names:
+        if tag_name.lower() not in existing and tag_name not in missing:
+            missing.append(tag_name)
+
+    return missing
+
 def check_and_create_missing_tags(conn, author, resource_request):
-    for tag_name in resource_request['tags']:
-        print("Checking if tag already exists: {0}".format(tag_name))
-        if not client.get_tag(conn, tag_name.lower()):
-            try:
-                create_file_tag(conn, author, tag_name)
-            except Exception as e:
-                # TODO: Need to handle case when not all the tags gets created.
-                print("Unexpected error creating tag: {0}, {1}".format(
-                    tag_name, e))
+    """
+    :return: False when the api is unreachable so the tags could not be checked
+        and the write is going to be queued in the outbox, else True
+    """
+    tag_names = resource_request['tags']
+
+    if not tag_names:
+        return True
+
+    print("Checking if tags already exist: {0}".format(", ".join(tag_names)))
+
+    try:
+        missing = find_missing_tags(conn, tag_names)
+    except client.UNREACHABLE_ERRORS:
+        if not conn.outbox:
+            raise
+
+        print("Jarvis-api unreachable, not checking the tags")
+        return False
+
+    for tag_name in missing:
+        try:
+            if create_file_tag(conn, author, tag_name) \
+                    and conn.existing_tag_names is not None:
+                conn.existing_tag_names.add(tag_name.lower())
+        except Exception as e:
+            # TODO: Need to handle case when not all the tags gets created.
+            print("Unexpected error creating tag: {0}, {1}".format(
+                tag_name, e))
+
+    return True
 
 def _create_file(conn, post_func, show_file_func, resource_id_key, local_path,
         author, stub_content):
@@ -164,15 +160,25 @@ def _create_file(conn, post_func, show_file_func, resource_id_key, local_path,
         f.write(stub_content)
 
     open_file_in_editor(local_path)
-    resource_request = convert_file_to_json(local_path)
-    check_and_create_missing_tags(conn, author, resource_request)
-    resource = post_func(resource_request)
+
+    try:
+        resource_request = convert_file_to_json(local_path)
+    except JarvisParseError as e:
+        print("Could not parse, your changes are kept in {0}: {1}".format(
+            local_path, e))
+        return
+
+    # Unchecked tags can't be required to exist when the queued write gets sent
+    tags_checked = check_and_create_missing_tags(conn, author, resource_request)
+    resource = post_func(resource_request, skip_tags_check=not tags_checked)
 
     if resource:
         resource_id = resource[resource_id_key]
         show_file_func(resource, resource_id)
         print("Created: {0}".format(resource_id))
 
+    return resource
+
 def create_file_log(conn, author, event_id):
     created = datetime.utcnow().replace(microsecond=0)
 
@@ -189,8 +195,8 @@ def create_file_log(conn, author, event_id):
 
     log_path = create_filepath("/tmp", log_id_temp)
 
-    _create_file(conn, partial(cle.post_log_entry, event_id, conn), show_file_log,
-            "id", log_path, author, stub_content)
+    return _create_file(conn, partial(cle.post_log_entry, event_id, conn),
+            show_file_log, "id", log_path, author, stub_content)
 
 def create_file_tag(conn, author, tag_name):
     metadata = [ "Name: {0}".format(tag_name), "Author: {0}".format(author),
@@ -199,5 +205,5 @@ def create_file_tag(conn, author, tag_name):
     stub_content = "\n\n".join(["\n".join(metadata), "# {0}\n".format(tag_name)])
     tag_path = create_filepath("/tmp", tag_name)
 
-    _create_file(conn, partial(client.post_tag, conn), show_file_tag, "name",
-            tag_path, author, stub_content)
+    return _create_file(conn, partial(client.post_tag, conn), show_file_tag,
+            "name", tag_path, author, stub_content)
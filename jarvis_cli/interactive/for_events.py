@@ -1,9 +1,7 @@
 from datetime import datetime
 import time
-# REVIEW: dateparser vs dateutil
-import dateparser
-import validators
 import jarvis_cli as jc
+from jarvis_cli import timestamps
 from jarvis_cli import file_helper as fh
 from jarvis_cli.exceptions import JarvisPromptError
 from jarvis_cli.formatting import truncate_long_text
@@ -27,7 +25,7 @@ def _display_usage(usage_lines):
 
 
 def prompt_event_occurred(current=None):
-    default = dateparser.parse(current) \
+    default = timestamps.parse_iso_datetime(current) \
             if current else datetime.utcnow().replace(microsecond=0)
     message = "When the event occurred [{0}]?: ".format(default.isoformat())
 
@@ -41,7 +39,7 @@ def prompt_event_occurred(current=None):
                 "Default value is {0}".format(default.isoformat())
                 ])
         else:
-            occurred = dateparser.parse(answer) if answer else default
+            occurred = timestamps.parse_datetime(answer) if answer else default
             _print_answer(occurred)
             return occurred
 
@@ -114,6 +112,8 @@ def edit_event_description(occurred, current=None):
         return description
 
 def _prompt_event_add_artifact(current):
+    import validators
+
     count = len(current)+1
 
     def get_parameter(param, validator_func):
@@ -0,0 +1,334 @@
+"""
+Local SQLite replica of the Jarvis resources of an environment.
+
+Log entries are indexed for full-text search with FTS5 so that they can be
+queried offline. The store gets updated incrementally from the api using the
+`modified` timestamps of the resources.
+"""
+import os, json, sqlite3, threading
+from jarvis_cli import client
+# TODO: Yes need to fix this violation of visibility
+from jarvis_cli.client.common import _convert
+from jarvis_cli.snippets import split_search_term
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource_type TEXT PRIMARY KEY,
+    watermark TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    name TEXT PRIMARY KEY,
+    resource TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    resource TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logentries (
+    id TEXT PRIMARY KEY,
+    event TEXT,
+    created TEXT,
+    modified TEXT,
+    resource TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logentry_tags (
+    logentry_id TEXT NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logentry_tags_tag ON logentry_tags (tag);
+CREATE INDEX IF NOT EXISTS logentry_tags_logentry_id ON logentry_tags (logentry_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS logentries_fts USING fts5(
+    id UNINDEXED, body, tags
+);
+"""
+
+
+def to_fts_query(search_term):
+    """Convert a search term into an FTS5 query that matches all of the words
+    and "quoted phrases" of the search term
+
+    Every word gets quoted so that FTS5 syntax in the search term is searched
+    for literally.
+    """
+    return " ".join('"{0}"'.format(term)
+            for term in split_search_term(search_term))
+
+
+class LocalStore(object):
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def get_watermark(self, resource_type):
+        row = self._db.execute("SELECT watermark FROM sync_state "
+                "WHERE resource_type = ?", (resource_type,)).fetchone()
+        return row["watermark"] if row else None
+
+    def _set_watermark(self, resource_type, watermark):
+        self._db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                (resource_type, watermark))
+
+    def has_synced(self, resource_type):
+        return self.get_watermark(resource_type) is not None
+
+    def upsert_tags(self, tags):
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO tags VALUES (?, ?)",
+                    [ (tag["name"].lower(), json.dumps(tag)) for tag in tags ])
+
+    def get_tag(self, tag_name):
+        row = self._db.execute("SELECT resource FROM tags WHERE name = ?",
+                (tag_name.lower(),)).fetchone()
+        return json.loads(row["resource"]) if row else None
+
+    def search_tags(self, tag_name=None, associated_tag_names=None, limit=None):
+        """Query tags like the api's tags query
+
+        :param tag_name: Case-insensitive substring of the tag names
+        :param associated_tag_names: Comma separated tag names that the tags
+            must all be tagged with
+        :return: List of tags ordered by name
+        """
+        associated = [ t.strip().lower()
+                for t in (associated_tag_names or "").split(",") if t.strip() ]
+        tags = []
+
+        for row in self._db.execute("SELECT resource FROM tags WHERE name LIKE ? "
+                "ORDER BY name", ("%{0}%".format((tag_name or "").lower()),)):
+            tag = json.loads(row["resource"])
+            linked = [ t.lower() for t in tag.get("tags") or [] ]
+
+            if all(t in linked for t in associated):
+                tags.append(tag)
+
+                if limit and len(tags) >= limit:
+                    break
+
+        return tags
+
+    def upsert_events(self, events):
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?)",
+                    [ (event["eventId"], json.dumps(event)) for event in events ])
+
+    def get_event(self, event_id):
+        row = self._db.execute("SELECT resource FROM events WHERE id = ?",
+                (event_id,)).fetchone()
+        return json.loads(row["resource"]) if row else None
+
+    def get_events(self, event_ids):
+        return dict((event_id, self.get_event(event_id))
+                for event_id in set(event_ids) if event_id)
+
+    def search_events(self, category=None, search_term=None):
+        """Query events like the api's events query
+
+        :param search_term: Case-insensitive substring of the descriptions
+        :return: List of events ordered by newest occurred
+        """
+        search_term = (search_term or "").lower()
+        events = [ json.loads(row["resource"]) for row
+                in self._db.execute("SELECT resource FROM events") ]
+
+        return sorted([ event for event in events
+            if (not category or event.get("category") == category)
+            and search_term in (event.get("description") or "").lower() ],
+            key=lambda e: e.get("occurred") or "", reverse=True)
+
+    def upsert_log_entries(self, log_entries):
+        rows = [ (str(le["id"]), le.get("event"), le.get("created"),
+            le.get("modified"), json.dumps(le)) for le in log_entries ]
+        ids = [ (row[0],) for row in rows ]
+
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM logentry_tags WHERE logentry_id = ?",
+                    ids)
+            self._db.executemany("DELETE FROM logentries_fts WHERE id = ?", ids)
+            self._db.executemany("INSERT OR REPLACE INTO logentries "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT INTO logentry_tags VALUES (?, ?)",
+                    [ (str(le["id"]), tag.lower()) for le in log_entries
+                        for tag in le.get("tags") or [] ])
+            self._db.executemany("INSERT INTO logentries_fts VALUES (?, ?, ?)",
+                    [ (str(le["id"]), le.get("body") or "",
+                        " ".join(le.get("tags") or [])) for le in log_entries ])
+
+    def get_log_entry(self, event_id, log_entry_id):
+        row = self._db.execute("SELECT resource FROM logentries "
+                "WHERE id = ? AND event = ?", (str(log_entry_id), event_id)).fetchone()
+        return json.loads(row["resource"]) if row else None
+
+    def search_log_entries(self, tag_name=None, search_term=None, limit=None):
+        """Query log entries by tag and full-text search term
+
+        :return: List of (log entry, list of snippets) ranked by relevance when
+            searching, otherwise ordered by newest created
+        """
+        select = ["SELECT l.resource"]
+        joins = ["FROM logentries l"]
+        wheres = []
+        params = []
+        # Empty for a search term of only spaces or quotes which FTS5 can't
+        # match on so it gets treated as no search term
+        fts_query = to_fts_query(search_term) if search_term else ""
+
+        if fts_query:
+            select.append(", snippet(logentries_fts, 1, '', '', '..', 12) "
+                    "AS snippet")
+            joins.append("JOIN logentries_fts f ON f.id = l.id")
+            wheres.append("logentries_fts MATCH ?")
+            params.append("body : ({0})".format(fts_query))
+            order = "ORDER BY bm25(logentries_fts)"
+        else:
+            order = "ORDER BY l.created DESC"
+
+        if tag_name:
+            wheres.append("l.id IN (SELECT logentry_id FROM logentry_tags "
+                    "WHERE tag = ?)")
+            params.append(tag_name.lower())
+
+        sql = " ".join([ "".join(select) ] + joins
+                + ([ "WHERE " + " AND ".join(wheres) ] if wheres else [])
+                + [ order ] + ([ "LIMIT ?" ] if limit else []))
+
+        if limit:
+            params.append(limit)
+
+        return [ (json.loads(row["resource"]),
+            [ row["snippet"] ] if fts_query else [])
+            for row in self._db.execute(sql, params) ]
+
+    def _update(self, resource_type, results_generator, upsert_func):
+        """Write the resources that were modified since the last update
+
+        The api can't filter by modified so all pages are scanned but only the
+        newer resources get written. Resources without a modified timestamp
+        use their created timestamp.
+
+        :return: Number of resources written
+        """
+        watermark = self.get_watermark(resource_type)
+        latest = watermark
+        num_updated = 0
+
+        def get_modified(resource):
+            return resource.get("modified") or resource.get("created") or ""
+
+        for resources in results_generator:
+            updated = [ r for r in resources
+                    if not watermark or get_modified(r) > watermark ]
+
+            if not updated:
+                continue
+
+            upsert_func(updated)
+            num_updated += len(updated)
+            latest = max([ latest or "" ] + [ get_modified(r) for r in updated ])
+
+        with self._lock, self._db:
+            self._set_watermark(resource_type, latest or "")
+
+        return num_updated
+
+    def update_tags(self, conn, prefetch=client.DEFAULT_PREFETCH):
+        return self._update("tags", client.query_generator("tags", conn, [],
+            prefetch), self.upsert_tags)
+
+    def update_events(self, conn, prefetch=client.DEFAULT_PREFETCH):
+        return self._update("events", client.query_generator("events", conn, [],
+            prefetch), self.upsert_events)
+
+    def update_log_entries(self, conn, prefetch=client.DEFAULT_PREFETCH):
+        """Pull log entries from the api that were modified since the last
+        update along with their events
+
+        :return: Number of log entries written
+        """
+        def upsert(log_entries):
+            missing_event_ids = [ le["event"] for le in log_entries
+                    if le.get("event") and not self.get_event(le["event"]) ]
+            # Converted to match the events from the events query
+            self.upsert_events([ _convert(event) for event in client.get_events(
+                conn, missing_event_ids).values() if event ])
+            self.upsert_log_entries(log_entries)
+
+        return self._update("logentries", client.query_log_entries_generator(
+            conn, [], prefetch), upsert)
+
+    def upsert_written(self, endpoint, resource):
+        """Write a resource that was just written to the api, converted like
+        the synced ones. Resource types that have not been synced are skipped
+        as they get read from the api anyway.
+
+        :param endpoint: Api endpoint that the resource was written to
+        """
+        parts = endpoint.split("/")
+        resource_type = "logentries" if parts[-1] == "logentries" else parts[0]
+        upsert_func = { "tags": self.upsert_tags, "events": self.upsert_events,
+                "logentries": self.upsert_log_entries }.get(resource_type)
+
+        if upsert_func and self.has_synced(resource_type):
+            upsert_func([ _convert(resource) ])
+
+    def sync(self, conn, prefetch=client.DEFAULT_PREFETCH):
+        """Update every resource type. Events go before log entries so that
+        their events don't need to be fetched one by one.
+
+        :return: List of (resource type, number of resources written)
+        """
+        return [ (resource_type, update_func(conn, prefetch))
+                for resource_type, update_func in [("tags", self.update_tags),
+                    ("events", self.update_events),
+                    ("logentries", self.update_log_entries)] ]
+
+    def data_summary(self):
+        """
+        :return: List of dicts of the count of resources and the watermark of
+            each resource type
+        """
+        summaries = []
+
+        for resource_type in ["tags", "events", "logentries"]:
+            count = self._db.execute("SELECT COUNT(*) FROM {0}".format(
+                resource_type)).fetchone()[0]
+            summaries.append({ "resourceType": resource_type, "count": count,
+                "synced": self.get_watermark(resource_type) })
+
+        return summaries
+
+
+def get_local_store_path(local_dir, environment):
+    return os.path.join(local_dir, "{0}.sqlite".format(environment))
+
+def open_local_store(local_dir, environment):
+    if not os.path.exists(local_dir):
+        os.makedirs(local_dir)
+
+    return LocalStore(get_local_store_path(local_dir, environment))
+
+def open_synced_store(local_dir, environment, resource_type):
+    """Open the local store only if it has been synced for the resource type
+
+    :return: LocalStore or None when the resources need to come from the api
+    """
+    db_path = get_local_store_path(local_dir, environment)
+
+    if not os.path.exists(db_path):
+        return None
+
+    store = LocalStore(db_path)
+
+    if store.has_synced(resource_type):
+        return store
+
+    store.close()
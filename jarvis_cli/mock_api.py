@@ -0,0 +1,468 @@
+"""
+Local stand-in for the Jarvis api used for testing and benchmarking the cli
+without a live api.
+
+Resources are kept in memory. The server implements tags, events, log entries
+of events, the paginated `logentries` and `search/logentries` queries and
+`datasummary`. A fixed latency can be added to every response to approximate
+a remote api.
+
+To run:
+
+    python -m jarvis_cli.mock_api [--port 8080] [--latency 0.02] [--tags 100]
+        [--events 1000] [--log-entries 5000]
+"""
+import json, random, threading, time, zlib
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_PAGE_SIZE = 20
+
+_EPOCH = datetime(2016, 1, 1)
+
+_WORDS = ["the", "jarvis", "log", "entry", "weather", "reading", "books",
+        "war", "peace", "sunny", "morning", "thought", "idea", "note", "today",
+        "walked", "cat", "orange", "sunset", "coffee"]
+
+_CATEGORIES = ["consumed", "produced", "experienced", "interacted",
+        "formulated", "completed", "detected", "measured"]
+
+
+def _format_timestamp(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+def _now():
+    return _format_timestamp(datetime.utcnow())
+
+def _links(titles, href_func):
+    return [ { "title": title, "href": href_func(title), "rel": "item" }
+            for title in titles ]
+
+def _titles(links):
+    return [ link["title"] for link in links or [] ]
+
+
+class MockJarvisApi(object):
+    """In-memory Jarvis api resources and the request handling on them
+
+    Handlers return (status, body) where body is json serializable or None.
+    """
+
+    def __init__(self, page_size=DEFAULT_PAGE_SIZE):
+        self.page_size = page_size
+        self.tags = {}
+        self.events = {}
+        self.log_entries = {}
+        self.num_requests = Counter()
+        self._lock = threading.RLock()
+        self._next_event_id = 1
+        self._next_log_entry_id = 1
+
+    # Resources
+
+    def _tag_links(self, tag_names):
+        return _links(tag_names, lambda name: "/tags/{0}".format(
+            urllib.parse.quote(name)))
+
+    def _missing_tags(self, tag_names):
+        return [ name for name in tag_names or []
+                if name.lower() not in self.tags ]
+
+    def create_tag(self, tag_request, skip_tags_check=False, created=None):
+        name = tag_request.get("name")
+
+        if not name:
+            return 400, { "message": "Missing name" }
+        elif name.lower() in self.tags:
+            return 409, { "message": "Tag already exists: {0}".format(name) }
+
+        missing = [] if skip_tags_check \
+                else self._missing_tags(tag_request.get("tags"))
+
+        if missing:
+            return 400, { "message": "Unknown tags: {0}".format(missing) }
+
+        created = created or _now()
+        tag = { "name": name, "author": tag_request.get("author"),
+                "created": created, "modified": created, "version": "0.2.0",
+                "tagLinks": self._tag_links(tag_request.get("tags") or []),
+                "body": tag_request.get("body") or "" }
+        self.tags[name.lower()] = tag
+        return 201, tag
+
+    def update_tag(self, name, tag_request):
+        tag = self.tags.get(name.lower())
+
+        if not tag:
+            return 404, None
+
+        tag.update({ "author": tag_request.get("author", tag["author"]),
+            "body": tag_request.get("body", tag["body"]), "modified": _now(),
+            "tagLinks": self._tag_links(tag_request.get("tags",
+                _titles(tag["tagLinks"]))) })
+        return 200, tag
+
+    def create_event(self, event_request, created=None):
+        if event_request.get("category") is None:
+            return 400, { "message": "Missing category" }
+
+        # Like jarvis-api, keep the event id of a request that has one which is
+        # what migrations rely on
+        event_id = event_request.get("eventId")
+
+        if event_id in self.events:
+            return 409, { "message": "Event already exists: {0}".format(event_id) }
+
+        while not event_id or event_id in self.events:
+            event_id = "{0:08x}".format(self._next_event_id)
+            self._next_event_id += 1
+
+        created = created or _now()
+        event = { "eventId": event_id, "category": event_request["category"],
+                "source": event_request.get("source"),
+                "weight": event_request.get("weight", 50),
+                "occurred": event_request.get("occurred") or created,
+                "created": created,
+                "description": event_request.get("description") or "",
+                "location": None,
+                "artifactLinks": event_request.get("artifacts") or [],
+                "logEntryLinks": [] }
+        self.events[event_id] = event
+        return 201, event
+
+    def update_event(self, event_id, event_request):
+        event = self.events.get(event_id)
+
+        if not event:
+            return 404, None
+
+        for key in ["category", "source", "weight", "occurred", "description"]:
+            if key in event_request:
+                event[key] = event_request[key]
+
+        if "artifacts" in event_request:
+            event["artifactLinks"] = event_request["artifacts"]
+
+        return 200, event
+
+    def create_log_entry(self, event_id, log_entry_request,
+            skip_tags_check=False, created=None):
+        event = self.events.get(event_id)
+
+        if not event:
+            return 404, None
+
+        missing = [] if skip_tags_check \
+                else self._missing_tags(log_entry_request.get("tags"))
+
+        if missing:
+            return 400, { "message": "Unknown tags: {0}".format(missing) }
+
+        log_entry_id = self._next_log_entry_id
+        self._next_log_entry_id += 1
+        created = created or _now()
+        log_entry = { "id": log_entry_id,
+                "author": log_entry_request.get("author"), "created": created,
+                "modified": created, "version": "0.6.0",
+                "occurred": event["occurred"], "setting": event["description"],
+                "event": event_id,
+                "tagLinks": self._tag_links(log_entry_request.get("tags") or []),
+                "parent": log_entry_request.get("parent"),
+                "todo": log_entry_request.get("todo"),
+                "body": log_entry_request.get("body") or "" }
+        self.log_entries[log_entry_id] = log_entry
+        event["logEntryLinks"].append({ "title": str(log_entry_id),
+            "href": "/events/{0}/logentries/{1}".format(event_id, log_entry_id),
+            "rel": "item" })
+        return 201, log_entry
+
+    def _get_log_entry(self, event_id, log_entry_id):
+        try:
+            log_entry = self.log_entries.get(int(log_entry_id))
+        except ValueError:
+            return None
+
+        return log_entry if log_entry and log_entry["event"] == event_id \
+                else None
+
+    def update_log_entry(self, event_id, log_entry_id, log_entry_request):
+        log_entry = self._get_log_entry(event_id, log_entry_id)
+
+        if not log_entry:
+            return 404, None
+
+        for key in ["author", "parent", "todo", "body"]:
+            if key in log_entry_request:
+                log_entry[key] = log_entry_request[key]
+
+        if "tags" in log_entry_request:
+            log_entry["tagLinks"] = self._tag_links(log_entry_request["tags"])
+
+        log_entry["modified"] = _now()
+        return 200, log_entry
+
+    # Queries
+
+    def _query_tags(self, params):
+        name = params.get("name", "").lower()
+        tag_names = [ t.lower() for t in params.get("tags", "").split(",") if t ]
+
+        def matches(tag):
+            linked = [ t.lower() for t in _titles(tag["tagLinks"]) ]
+            return name in tag["name"].lower() \
+                    and all(t in linked for t in tag_names)
+
+        return [ tag for _, tag in sorted(self.tags.items()) if matches(tag) ]
+
+    def _query_events(self, params):
+        category = params.get("category")
+        search_term = params.get("searchterm", "").lower()
+
+        return [ event for event in sorted(self.events.values(),
+            key=lambda e: e["occurred"], reverse=True)
+            if (not category or event["category"] == category)
+            and search_term in event["description"].lower() ]
+
+    def _query_log_entries(self, params):
+        tag_name = params.get("tags", "").lower()
+        search_term = params.get("searchterm", "").lower()
+
+        def matches(log_entry):
+            return (not tag_name or tag_name in [ t.lower()
+                for t in _titles(log_entry["tagLinks"]) ]) \
+                        and search_term in log_entry["body"].lower()
+
+        return [ log_entry for log_entry in sorted(self.log_entries.values(),
+            key=lambda le: le["created"], reverse=True) if matches(log_entry) ]
+
+    def _page(self, items, params, url):
+        page = int(params.get("page", 1))
+        start = (page-1)*self.page_size
+        links = []
+
+        if start + self.page_size < len(items):
+            next_params = dict(params, page=str(page+1))
+            links.append({ "rel": "next", "href": "{0}?{1}".format(url,
+                urllib.parse.urlencode(next_params)) })
+
+        return { "items": items[start:start+self.page_size], "links": links,
+                "total": len(items) }
+
+    def _data_summary(self, resource_type):
+        resources = { "tags": self.tags, "events": self.events,
+                "logentries": self.log_entries }.get(resource_type)
+
+        if resources is None:
+            return 404, None
+
+        modified = [ r.get("modified") or r.get("created")
+                for r in resources.values() ]
+        return 200, { "resourceType": resource_type, "count": len(resources),
+                "latestModified": max(modified) if modified else None }
+
+    # Routing
+
+    def handle(self, method, path, params, body, base_url=""):
+        parts = [ urllib.parse.unquote(part) for part in path.strip("/").split("/") ]
+        skip_tags_check = params.get("skipTagsCheck") == "true"
+        url = base_url + path
+        self.num_requests[(method, parts[0])] += 1
+
+        with self._lock:
+            if parts == ["tags"]:
+                if method == "GET":
+                    return 200, self._page(self._query_tags(params), params, url)
+                elif method == "POST":
+                    return self.create_tag(body, skip_tags_check)
+            elif len(parts) == 2 and parts[0] == "tags":
+                if method == "GET":
+                    tag = self.tags.get(parts[1].lower())
+                    return (200, tag) if tag else (404, None)
+                elif method == "PUT":
+                    return self.update_tag(parts[1], body)
+            elif parts == ["events"]:
+                if method == "GET":
+                    return 200, self._page(self._query_events(params), params,
+                            url)
+                elif method == "POST":
+                    return self.create_event(body)
+            elif len(parts) == 2 and parts[0] == "events":
+                if method == "GET":
+                    event = self.events.get(parts[1])
+                    return (200, event) if event else (404, None)
+                elif method == "PUT":
+                    return self.update_event(parts[1], body)
+            elif len(parts) == 3 and parts[0] == "events" \
+                    and parts[2] == "logentries" and method == "POST":
+                return self.create_log_entry(parts[1], body, skip_tags_check)
+            elif len(parts) == 4 and parts[0] == "events" \
+                    and parts[2] == "logentries":
+                if method == "GET":
+                    log_entry = self._get_log_entry(parts[1], parts[3])
+                    return (200, log_entry) if log_entry else (404, None)
+                elif method == "PUT":
+                    return self.update_log_entry(parts[1], parts[3], body)
+            elif parts in (["logentries"], ["search", "logentries"]) \
+                    and method == "GET":
+                return 200, self._page(self._query_log_entries(params), params,
+                        url)
+            elif len(parts) == 2 and parts[0] == "datasummary" \
+                    and method == "GET":
+                return self._data_summary(parts[1])
+
+        return 404, None
+
+
+def populate(api, num_tags=50, num_events=200, num_log_entries=1000,
+        body_words=120, seed=0):
+    """Fill an api with a generated dataset that is the same for a given seed"""
+    rng = random.Random(seed)
+    created = _EPOCH
+
+    def next_created():
+        nonlocal created
+        created += timedelta(minutes=rng.randint(1, 600))
+        return _format_timestamp(created)
+
+    def words(n):
+        return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+    tag_names = [ "Tag{0}".format(i) for i in range(num_tags) ]
+
+    for i, name in enumerate(tag_names):
+        linked = rng.sample(tag_names[:i], min(i, rng.randint(0, 3)))
+        api.create_tag({ "name": name, "author": "John Doe", "tags": linked,
+            "body": "# {0}\n\n{1}".format(name, words(20)) }, created=next_created())
+
+    event_ids = []
+
+    for _ in range(num_events):
+        _, event = api.create_event({ "category": rng.choice(_CATEGORIES),
+            "source": "mock", "weight": rng.randint(1, 100),
+            "occurred": next_created(), "description": words(12) },
+            created=next_created())
+        event_ids.append(event["eventId"])
+
+    for _ in range(num_log_entries if event_ids else 0):
+        tags = rng.sample(tag_names, min(num_tags, rng.randint(1, 3)))
+        api.create_log_entry(rng.choice(event_ids), { "author": "John Doe",
+            "tags": tags, "body": words(body_words) }, skip_tags_check=True,
+            created=next_created())
+
+    return api
+
+
+class _MockJarvisApiHandler(BaseHTTPRequestHandler):
+    # Keep-alive so that pooled client sessions reuse connections
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length).decode("utf-8")) \
+                if length else None
+        base_url = "http://{0}".format(self.headers.get("Host"))
+
+        status, response = self.server.api.handle(self.command, url.path,
+                params, body, base_url)
+        content = json.dumps(response).encode("utf-8") \
+                if response is not None else b""
+
+        if status == 200 and self.command == "GET" and response is not None:
+            etag = '"{0:08x}"'.format(zlib.crc32(content))
+
+            if self.headers.get("If-None-Match") == etag:
+                status, content = 304, b""
+
+            self.send_response(status)
+            self.send_header("ETag", etag)
+        else:
+            self.send_response(status)
+
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = _handle
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super(_MockJarvisApiHandler, self).log_message(format, *args)
+
+
+class MockJarvisApiServer(ThreadingHTTPServer):
+    """Serves a MockJarvisApi over http in a background thread
+
+    :param latency: Seconds added to every response
+    """
+    daemon_threads = True
+
+    def __init__(self, api=None, host="127.0.0.1", port=0, latency=0,
+            verbose=False):
+        super(MockJarvisApiServer, self).__init__((host, port),
+                _MockJarvisApiHandler)
+        self.api = api or MockJarvisApi()
+        self.latency = latency
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return "http://{0}:{1}".format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0,
+            help="Seconds added to every response")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--tags", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--log-entries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    api = populate(MockJarvisApi(args.page_size), args.tags, args.events,
+            args.log_entries, seed=args.seed)
+    server = MockJarvisApiServer(api, args.host, args.port, args.latency,
+            verbose=True)
+    print("Mock Jarvis api at {0} with #tags: {1}, #events: {2}, "
+            "#log entries: {3}".format(server.url, len(api.tags),
+                len(api.events), len(api.log_entries)))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
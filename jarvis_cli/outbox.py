@@ -0,0 +1,197 @@
+"""
+Durable outbox of the writes that could not reach the api.
+
+Posts and puts that fail because the api is unreachable get appended to a
+json lines journal per environment and are sent later, in the order they were
+made, by `jarvis sync push` or ahead of the next write.
+"""
+import os, json, hashlib, threading, uuid
+import urllib.parse
+from collections import OrderedDict
+from datetime import datetime
+
+
+def resource_version(resource):
+    """Version of a resource used to detect conflicting writes, its modified
+    timestamp or a hash of its content for resources without one"""
+    if not resource:
+        return None
+
+    return resource.get("modified") or hashlib.sha1(json.dumps(resource,
+        sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+class _StillUnreachable(Exception):
+    pass
+
+class _NoRequeue(object):
+    """Stands in for the outbox while flushing so that a write that can't reach
+    the api stops the flush instead of being queued again"""
+
+    def has_pending(self):
+        return False
+
+    def enqueue(self, *args, **kwargs):
+        raise _StillUnreachable()
+
+
+class Outbox(object):
+    """Append-only journal of queued writes
+
+    A write gets a "queued" record with a unique key which is also the
+    Idempotency-Key header of posts, the same one sent by the first attempt. It is done once a "sent" or "rejected"
+    record with the same key follows. Rejected writes, conflicts and api
+    errors, are copied to the rejected journal so that nothing gets lost.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.rejected_filepath = "{0}.rejected.jsonl".format(
+                os.path.splitext(filepath)[0])
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _append(self, filepath, record):
+        dirpath = os.path.dirname(filepath)
+
+        if dirpath and not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def has_pending(self):
+        # Cheap check done at the start of every command
+        return os.path.exists(self.filepath) and os.path.getsize(self.filepath) > 0
+
+    def pending(self):
+        """
+        :return: List of queued records that are not done in the order queued
+        """
+        if not os.path.exists(self.filepath):
+            return []
+
+        records = OrderedDict()
+
+        with open(self.filepath, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Partially written last line of an interrupted run
+                    continue
+
+                if record["op"] == "queued":
+                    records[record["key"]] = record
+                else:
+                    records.pop(record["key"], None)
+
+        return list(records.values())
+
+    def enqueue(self, method, endpoint, request, resource_id=None,
+            skip_tags_check=False, base_version=None, key=None):
+        """
+        :param base_version: Version of the resource that a put was made
+            against. None skips the conflict check.
+        :param key: Idempotency key already sent with the write that failed,
+            a new one is made when None
+        :return: Key of the queued write
+        """
+        record = { "op": "queued", "key": key or new_idempotency_key(),
+                "method": method,
+                "endpoint": endpoint, "resourceId": resource_id,
+                "request": request, "skipTagsCheck": skip_tags_check,
+                "baseVersion": base_version,
+                "queued": datetime.utcnow().isoformat() }
+
+        with self._lock:
+            self._append(self.filepath, record)
+
+        return record["key"]
+
+    def _done(self, record, op, reason=None):
+        with self._lock:
+            if op == "rejected":
+                self._append(self.rejected_filepath, dict(record, op=op,
+                    reason=reason))
+
+            self._append(self.filepath, { "op": op, "key": record["key"] })
+
+    def _send(self, conn, record):
+        """
+        :return: None if sent otherwise the reason it was rejected
+        """
+        # Imported here because the client imports this module
+        from jarvis_cli.client import common
+
+        endpoint = record["endpoint"]
+        resource_id = record["resourceId"]
+
+        if record["method"] == "POST":
+            resource = common._post_jarvis_resource_unconverted(endpoint, conn,
+                    record["request"], False, record["skipTagsCheck"],
+                    idempotency_key=record["key"])
+            return None if resource else "Jarvis-api rejected the post"
+
+        if record["baseVersion"]:
+            r = common._request("GET", conn, common._build_url(conn.url,
+                endpoint, urllib.parse.quote(resource_id)))
+
+            if r.status_code in common._UNAVAILABLE_STATUSES:
+                raise _StillUnreachable()
+            elif r.status_code != 200:
+                return "Could not get the current resource: {0}".format(
+                        r.status_code)
+            elif resource_version(r.json()) != record["baseVersion"]:
+                return "Conflict, the resource changed since it was edited: " \
+                        "{0} != {1}".format(resource_version(r.json()),
+                                record["baseVersion"])
+
+        resource = common._put_jarvis_resource_unconverted(endpoint, conn,
+                resource_id, record["request"])
+        return None if resource else "Jarvis-api rejected the put"
+
+    def flush(self, conn):
+        """Send the pending writes in order. Stops at the first one that can't
+        reach the api which stays pending along with the rest.
+
+        :return: (#sent, #rejected, #pending)
+        """
+        with self._flush_lock:
+            return self._flush(conn)
+
+    def _flush(self, conn):
+        from jarvis_cli.client import common
+
+        conn = conn._replace(outbox=_NoRequeue())
+        pending = self.pending()
+        num_sent = num_rejected = 0
+
+        for i, record in enumerate(pending):
+            try:
+                reason = self._send(conn, record)
+            except (_StillUnreachable,) + common.UNREACHABLE_ERRORS:
+                return num_sent, num_rejected, len(pending) - i
+
+            if reason:
+                print("Rejected queued {0} {1}: {2}. Saved to {3}".format(
+                    record["method"], record["endpoint"], reason,
+                    self.rejected_filepath))
+                self._done(record, "rejected", reason)
+                num_rejected += 1
+            else:
+                self._done(record, "sent")
+                num_sent += 1
+
+        with self._lock:
+            # Compact the journal once everything is done
+            if not self.pending() and os.path.exists(self.filepath):
+                os.remove(self.filepath)
+
+        return num_sent, num_rejected, 0
@@ -0,0 +1,72 @@
+"""
+Profiling of a cli command with cProfile to a text report.
+"""
+import cProfile, io, os, pstats, time
+
+
+class CommandProfile(object):
+    """Profiles from `start` to `stop` and then writes a report of wall vs cpu
+    time, the modules imported in between and the top functions by cumulative
+    time
+
+    Only the thread that started profiling gets profiled. The work of thread
+    pools shows up as time waiting on them.
+    """
+
+    def __init__(self, report_path, command_name=None, num_top=40):
+        self.report_path = report_path
+        self.command_name = command_name
+        self.num_top = num_top
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._profile.enable()
+        return self
+
+    def stop(self):
+        self._profile.disable()
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+
+        with open(self.report_path, 'w') as f:
+            f.write(self.report(wall, cpu))
+
+    def _import_times(self, stats):
+        """
+        :return: (total import time, list of (cumulative time, module path))
+        """
+        total = 0
+        modules = []
+
+        for (filename, _, funcname), (_, _, _, ct, _) in stats.stats.items():
+            if funcname == "_find_and_load":
+                total += ct
+            elif funcname == "<module>":
+                modules.append((ct, filename))
+
+        return total, sorted(modules, reverse=True)
+
+    def report(self, wall, cpu):
+        out = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=out)
+        import_total, modules = self._import_times(stats)
+
+        lines = ["Profile of: {0}".format(self.command_name or "command"),
+                "Wall: {0:.3f}s, CPU (all threads): {1:.3f}s, waiting: {2:.3f}s"
+                .format(wall, cpu, max(wall - cpu, 0)),
+                "", "Imports: {0:.3f}s, #modules: {1}".format(import_total,
+                    len(modules))]
+        cwd = os.getcwd()
+
+        for ct, filename in modules[:self.num_top]:
+            lines.append("  {0:8.3f}s  {1}".format(ct,
+                os.path.relpath(filename, cwd) if filename.startswith(cwd)
+                else filename))
+
+        lines += ["", "Top functions by cumulative time:"]
+        stats.sort_stats("cumulative").print_stats(self.num_top)
+        lines.append(out.getvalue())
+
+        return "\n".join(lines)
@@ -0,0 +1,89 @@
+"""
+Parser and serializer of the markdown file format used to view and edit Jarvis
+resources. A file is made up of metadata lines followed by a blank line and the
+markdown body:
+
+    Author: John Doe
+    Tags: Weather, HelloWorld
+
+    Today was a bright and sunny day!
+"""
+import re
+from jarvis_cli.exceptions import JarvisParseError
+
+
+_METADATA_LINE = re.compile(r'(\w+):[ \t]?(.*)')
+_TAGS_SEPARATOR = re.compile(r'\s*,\s*')
+
+
+def parse(f, source="<file>"):
+    """Parse a resource file
+
+    Only the metadata lines are read line by line. The body is read in one go
+    after the blank line and never gets split or scanned.
+
+    :param f: Readable text file object
+    :param source: Name of the file used in error messages
+
+    :return: dict with the lowercased metadata keys and "body" if there is one
+    """
+    response = {}
+
+    for lineno, line in enumerate(iter(f.readline, ""), start=1):
+        if not line.strip():
+            break
+
+        m = _METADATA_LINE.match(line)
+
+        if not m:
+            raise JarvisParseError("{0}:{1}: Malformed metadata line, expected "
+                "\"Key: value\": {2!r}".format(source, lineno, line.rstrip("\n")))
+
+        # Watch! Stripping trailing whitespace because for some reason
+        # certain field values are showing whitespace.
+        response[m.group(1).lower()] = m.group(2).strip()
+
+    if "tags" in response:
+        # Handle scenario when there are no tags which will return an empty
+        # string.
+        response["tags"] = [ tag for tag in _TAGS_SEPARATOR.split(response["tags"])
+                if tag ]
+
+    body = f.read()
+
+    if body.strip():
+        response["body"] = body
+
+    return response
+
+def parse_file(file_path):
+    with open(file_path, 'r') as f:
+        return parse(f, file_path)
+
+
+def serialize(metadata_keys, json_object):
+    """Serialize a Jarvis resource into a resource file
+
+    :param metadata_keys: The resource fields to write as metadata lines in order
+
+    :return: string
+    """
+    def stringify(metadata_key):
+        if metadata_key == "tags":
+            return ", ".join(json_object.get(metadata_key) or [])
+        else:
+            # Don't want to display literally "None" so check for None
+            # and convert to empty string.
+            v = json_object.get(metadata_key)
+            return v if v else ""
+
+    metadata = "\n".join([ "{0}: {1}".format(k.capitalize(), stringify(k))
+        for k in metadata_keys ])
+
+    # Events don't have bodies but the blank line is still needed to end the
+    # metadata.
+    return "\n\n".join([ metadata, json_object.get("body") or "" ])
+
+def write_file(file_path, metadata_keys, json_object):
+    with open(file_path, 'w') as f:
+        f.write(serialize(metadata_keys, json_object))
@@ -0,0 +1,541 @@
+"""
+Snapshot archives of the Jarvis data directory.
+
+Snapshots are tarballs compressed as a sequence of independently compressed
+gzip members. Any gzip reader (and `tar -xzf`) treats them as one stream but
+the members can be compressed, and decompressed, in parallel. Each snapshot has
+a json manifest next to it that records the checksum of the archive, the
+offsets of the gzip members and the size, modified time and checksum of every
+file.
+
+Incremental snapshots only archive the files that changed since the snapshot
+they are based on, their parent, and record the files that were deleted. The
+manifest of every snapshot lists the complete state of the data directory.
+"""
+import os, re, json, time, tarfile, hashlib, zlib, stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from jarvis_cli.exceptions import JarvisSnapshotError
+
+
+MANIFEST_VERSION = 1
+DEFAULT_CHUNK_SIZE = 4*1024*1024
+
+
+SNAPSHOT_FULL = "full"
+SNAPSHOT_INCREMENTAL = "incremental"
+
+
+def create_snapshot_filename(environment, timestamp, incremental=False):
+    return "jarvis_snapshot_{0}_{1}{2}.tar.gz".format(environment,
+            timestamp.strftime("%Y%m%d%H%M%S"), "_incremental" if incremental else "")
+
+def find_latest_snapshot(snapshots_dir, environment):
+    """Find the most recent snapshot of an environment that has a manifest
+
+    :return: Snapshot filepath or None
+    """
+    pattern = re.compile(r"^jarvis_snapshot_{0}_(\d{{14}})(_incremental)?\.tar\.gz$"
+            .format(re.escape(environment)))
+    snapshots = []
+
+    for filename in os.listdir(snapshots_dir):
+        m = pattern.match(filename)
+        filepath = os.path.join(snapshots_dir, filename)
+
+        if m and os.path.isfile(get_manifest_path(filepath)):
+            snapshots.append((m.group(1), filepath))
+
+    return max(snapshots)[1] if snapshots else None
+
+def get_manifest_path(snapshot_filepath):
+    return "{0}.manifest.json".format(snapshot_filepath)
+
+def read_manifest(snapshot_filepath):
+    with open(get_manifest_path(snapshot_filepath), 'r') as f:
+        return json.load(f)
+
+def _write_manifest(snapshot_filepath, manifest):
+    manifest_path = get_manifest_path(snapshot_filepath)
+    manifest_path_temp = "{0}.tmp".format(manifest_path)
+
+    with open(manifest_path_temp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(manifest_path_temp, manifest_path)
+
+
+def _compress(data, level):
+    # zlib releases the GIL while compressing so threads use multiple cores.
+    # wbits 31 produces a complete gzip member.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+class ParallelGzipWriter(object):
+    """Write-only file object that compresses fixed size chunks concurrently
+    into consecutive gzip members
+
+    The number of chunks in flight is bounded so memory stays bounded.
+    """
+
+    def __init__(self, fileobj, level=6, chunk_size=DEFAULT_CHUNK_SIZE,
+            max_workers=None):
+        self.fileobj = fileobj
+        self.level = level
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sha256 = hashlib.sha256()
+        # [offset, length] of each gzip member
+        self.members = []
+        self.size = 0
+
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def writable(self):
+        return True
+
+    def _write_member(self, compressed):
+        self.fileobj.write(compressed)
+        self.sha256.update(compressed)
+        self.members.append([self.size, len(compressed)])
+        self.size += len(compressed)
+
+    def _submit(self, data):
+        self._pending.append(self._executor.submit(_compress, bytes(data),
+            self.level))
+
+        while len(self._pending) > 2*self.max_workers:
+            self._write_member(self._pending.popleft().result())
+
+    def write(self, data):
+        self._buffer += data
+
+        while len(self._buffer) >= self.chunk_size:
+            self._submit(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+
+        return len(data)
+
+    def close(self):
+        if self._executor is None:
+            return
+
+        if self._buffer:
+            self._submit(self._buffer)
+            self._buffer = bytearray()
+
+        while self._pending:
+            self._write_member(self._pending.popleft().result())
+
+        self._executor.shutdown()
+        self._executor = None
+
+
+class _HashingReader(object):
+    """Wraps a file object to checksum and count what gets read through it"""
+
+    def __init__(self, fileobj, on_read=None):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.on_read = on_read
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+
+        if self.on_read:
+            self.on_read(len(data))
+
+        return data
+
+
+class ParallelGzipReader(object):
+    """Read-only file object that decompresses the gzip members of a snapshot
+    concurrently and returns the data in order
+
+    :param members: [offset, length] of each gzip member from the manifest
+    """
+
+    def __init__(self, fileobj, members, max_workers=None, on_read=None):
+        self.fileobj = fileobj
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.on_read = on_read
+
+        self._members = iter(members)
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while len(self._pending) < 2*self.max_workers:
+            member = next(self._members, None)
+
+            if not member:
+                break
+
+            offset, length = member
+            self.fileobj.seek(offset)
+            compressed = self.fileobj.read(length)
+            # Like compressing, zlib releases the GIL while decompressing
+            self._pending.append(self._executor.submit(zlib.decompress,
+                compressed, 31))
+
+    def read(self, size=-1):
+        self._fill()
+
+        while self._pending and (size < 0 or len(self._buffer) < size):
+            self._buffer += self._pending.popleft().result()
+            self._fill()
+
+        size = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+
+        if self.on_read:
+            self.on_read(len(data))
+
+        return data
+
+    def close(self):
+        if self._executor:
+            for future in self._pending:
+                future.cancel()
+
+            self._executor.shutdown()
+            self._executor = None
+
+
+def scan_directory(data_dir):
+    """
+    :return: List of (relative path, os.stat_result) sorted by path. Directories
+        come before their contents.
+    """
+    entries = []
+
+    for dirpath, dirnames, filenames in os.walk(data_dir):
+        dirnames.sort()
+
+        for name in dirnames + sorted(filenames):
+            path = os.path.join(dirpath, name)
+            entries.append((os.path.relpath(path, data_dir), os.lstat(path)))
+
+    return entries
+
+def _sha256_file(path):
+    sha256 = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(1024*1024), b""):
+            sha256.update(data)
+
+    return sha256.hexdigest()
+
+def diff_entries(data_dir, entries, parent_files):
+    """Compare the data directory against the files of the parent snapshot
+
+    Files are unchanged when size and modified time match. Files that were only
+    touched, same size but different modified time, get checksummed to be sure.
+
+    :return: (entries that changed, dict of the unchanged files' manifest
+        records, list of deleted relative paths)
+    """
+    changed = []
+    unchanged = {}
+    current = set()
+
+    for relpath, st in entries:
+        if not stat.S_ISREG(st.st_mode):
+            # Directories and links are cheap so always archive
+            changed.append((relpath, st))
+            continue
+
+        current.add(relpath)
+        parent_file = parent_files.get(relpath)
+
+        if parent_file and parent_file["size"] == st.st_size:
+            if parent_file["mtime"] == st.st_mtime:
+                unchanged[relpath] = parent_file
+                continue
+            elif parent_file["sha256"] == _sha256_file(
+                    os.path.join(data_dir, relpath)):
+                unchanged[relpath] = dict(parent_file, mtime=st.st_mtime)
+                continue
+
+        changed.append((relpath, st))
+
+    deleted = sorted(relpath for relpath in parent_files if relpath not in current)
+    return changed, unchanged, deleted
+
+def write_snapshot(snapshot_filepath, data_dir, parent_filepath=None, level=6,
+        chunk_size=DEFAULT_CHUNK_SIZE, max_workers=None, progress=None):
+    """Archive the data directory into a snapshot and write its manifest
+
+    The archive is streamed straight to the snapshot file. Every file is read
+    once, both to be archived and checksummed.
+
+    :param parent_filepath: Make an incremental snapshot of the changes since
+        this snapshot. Full snapshot when None.
+    :param progress: Called with (bytes read, total bytes) as files get read
+
+    :return: The manifest
+    """
+    data_basename = os.path.basename(os.path.normpath(data_dir))
+    entries = scan_directory(data_dir)
+
+    if parent_filepath:
+        parent_manifest = read_manifest(parent_filepath)
+        entries, files, deleted = diff_entries(data_dir, entries,
+                parent_manifest["files"])
+    else:
+        files, deleted = {}, []
+
+    archived = []
+
+    total_bytes = sum(st.st_size for _, st in entries
+            if stat.S_ISREG(st.st_mode))
+    bytes_read = [0]
+
+    def on_read(num_bytes):
+        bytes_read[0] += num_bytes
+
+        if progress:
+            progress(bytes_read[0], total_bytes)
+
+    with open(snapshot_filepath, 'wb') as f:
+        writer = ParallelGzipWriter(f, level, chunk_size, max_workers)
+
+        try:
+            with tarfile.open(fileobj=writer, mode="w|",
+                    format=tarfile.PAX_FORMAT) as tar:
+                for relpath, st in entries:
+                    path = os.path.join(data_dir, relpath)
+                    tarinfo = tar.gettarinfo(path,
+                            arcname=os.path.join(data_basename, relpath))
+
+                    if tarinfo.isreg():
+                        with open(path, 'rb') as src:
+                            reader = _HashingReader(src, on_read)
+                            tar.addfile(tarinfo, reader)
+
+                        files[relpath] = { "size": tarinfo.size,
+                                "mtime": st.st_mtime,
+                                "sha256": reader.sha256.hexdigest() }
+                        archived.append(relpath)
+                    else:
+                        tar.addfile(tarinfo)
+        finally:
+            writer.close()
+
+    manifest = { "version": MANIFEST_VERSION,
+            "snapshot": os.path.basename(snapshot_filepath),
+            "type": SNAPSHOT_INCREMENTAL if parent_filepath else SNAPSHOT_FULL,
+            "parent": os.path.basename(parent_filepath) if parent_filepath else None,
+            "archived": archived,
+            "deleted": deleted,
+            "created": datetime.utcnow().replace(microsecond=0).isoformat(),
+            "root": data_basename,
+            "archiveSha256": writer.sha256.hexdigest(),
+            "archiveSize": writer.size,
+            "members": writer.members,
+            "files": files }
+    _write_manifest(snapshot_filepath, manifest)
+
+    return manifest
+
+
+def get_snapshot_chain(snapshot_filepath):
+    """Follow the parents of a snapshot back to the full snapshot
+
+    Parents are expected to be in the same directory. Snapshots without a
+    manifest, made before manifests existed, are full snapshots.
+
+    :return: List of snapshot filepaths starting with the full snapshot
+    """
+    chain = [snapshot_filepath]
+
+    while os.path.isfile(get_manifest_path(chain[0])):
+        parent = read_manifest(chain[0]).get("parent")
+
+        if not parent:
+            break
+
+        parent_filepath = os.path.join(os.path.dirname(snapshot_filepath), parent)
+
+        if not os.path.isfile(parent_filepath):
+            raise FileNotFoundError("Parent snapshot missing: {0}".format(
+                parent_filepath))
+
+        chain.insert(0, parent_filepath)
+
+    return chain
+
+def _safe_members(tar, dest_dir):
+    dest_dir = os.path.realpath(dest_dir)
+
+    for tarinfo in tar:
+        path = os.path.realpath(os.path.join(dest_dir, tarinfo.name))
+
+        if os.path.commonpath([dest_dir, path]) != dest_dir or tarinfo.isdev():
+            raise tarfile.TarError("Unsafe member in snapshot: {0}".format(
+                tarinfo.name))
+
+        yield tarinfo
+
+def verify_snapshot(snapshot_filepath):
+    """Check the archive against the checksum and size in its manifest
+
+    Snapshots made before manifests existed can't be verified.
+
+    :return: The manifest or None when there is none
+    """
+    if not os.path.isfile(get_manifest_path(snapshot_filepath)):
+        return None
+
+    manifest = read_manifest(snapshot_filepath)
+    sha256 = hashlib.sha256()
+    size = 0
+
+    with open(snapshot_filepath, 'rb') as f:
+        for data in iter(lambda: f.read(1024*1024), b""):
+            sha256.update(data)
+            size += len(data)
+
+    if size != manifest["archiveSize"] \
+            or sha256.hexdigest() != manifest["archiveSha256"]:
+        raise JarvisSnapshotError("Snapshot does not match its manifest: {0}"
+                .format(snapshot_filepath))
+
+    if sum(length for _, length in manifest["members"]) != size:
+        raise JarvisSnapshotError("Snapshot members do not cover the archive: {0}"
+                .format(snapshot_filepath))
+
+    return manifest
+
+def extract_snapshot(snapshot_filepath, dest_dir, max_workers=None,
+        on_read=None):
+    """Extract a single snapshot applying its deletions
+
+    Snapshots with a manifest get their gzip members decompressed in parallel.
+
+    :param dest_dir: Directory that will contain the data directory
+    :param on_read: Called with the number of decompressed bytes as they're read
+    """
+    kwargs = {}
+
+    if hasattr(tarfile, "data_filter"):
+        # Newer pythons warn unless extraction filtering is explicit
+        kwargs["filter"] = "data"
+
+    manifest = read_manifest(snapshot_filepath) \
+            if os.path.isfile(get_manifest_path(snapshot_filepath)) else None
+
+    with open(snapshot_filepath, 'rb') as f:
+        if manifest:
+            reader = ParallelGzipReader(f, manifest["members"], max_workers,
+                    on_read)
+            tar = tarfile.open(fileobj=reader, mode="r|")
+        else:
+            reader = None
+            tar = tarfile.open(fileobj=f, mode="r|gz")
+
+        try:
+            tar.extractall(dest_dir, members=_safe_members(tar, dest_dir),
+                    **kwargs)
+        finally:
+            tar.close()
+
+            if reader:
+                reader.close()
+
+    for relpath in (manifest or {}).get("deleted", []):
+        try:
+            os.remove(os.path.join(dest_dir, manifest["root"], relpath))
+        except FileNotFoundError:
+            pass
+
+    return manifest
+
+def extract_snapshot_chain(snapshot_filepath, dest_dir, max_workers=None,
+        progress=None):
+    """Rebuild the point in time of a snapshot from its full snapshot and the
+    chain of incremental snapshots
+
+    Every snapshot of the chain gets verified before anything is extracted and
+    the extracted files are checked against the final manifest.
+
+    :param progress: Called with (bytes decompressed, total bytes archived)
+
+    :return: Name of the extracted data directory in `dest_dir`
+    """
+    chain = get_snapshot_chain(snapshot_filepath)
+    manifests = [ verify_snapshot(filepath) for filepath in chain ]
+
+    total_bytes = sum(manifest["files"][relpath]["size"]
+            for manifest in manifests if manifest
+            for relpath in manifest["archived"])
+    bytes_read = [0]
+
+    def on_read(num_bytes):
+        bytes_read[0] += num_bytes
+
+        if progress:
+            progress(bytes_read[0], total_bytes)
+
+    for filepath in chain:
+        extract_snapshot(filepath, dest_dir, max_workers, on_read)
+
+    manifest = manifests[-1]
+
+    if not manifest:
+        roots = os.listdir(dest_dir)
+
+        if len(roots) != 1:
+            raise JarvisSnapshotError("Expected a single data directory in the "
+                    "snapshot: {0}".format(roots))
+
+        return roots[0]
+
+    data_dir = os.path.join(dest_dir, manifest["root"])
+
+    for relpath, f in manifest["files"].items():
+        path = os.path.join(data_dir, relpath)
+
+        if not os.path.isfile(path) or os.path.getsize(path) != f["size"]:
+            raise JarvisSnapshotError("Restored file does not match the "
+                    "manifest: {0}".format(relpath))
+
+    return manifest["root"]
+
+
+class Progress(object):
+    """Prints throughput at most once per `interval` seconds"""
+
+    def __init__(self, label, interval=1):
+        self.label = label
+        self.interval = interval
+        self.start_time = time.time()
+        self.num_bytes = 0
+        self._last_time = self.start_time
+
+    def __call__(self, num_bytes, total_bytes):
+        self.num_bytes = num_bytes
+        now = time.time()
+
+        if now - self._last_time >= self.interval:
+            self._last_time = now
+            print("{0}: {1:.1f}MB of {2:.1f}MB, {3:.1f}MB/s".format(self.label,
+                num_bytes/1e6, total_bytes/1e6, self.throughput(num_bytes)))
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def throughput(self, num_bytes=None):
+        num_bytes = self.num_bytes if num_bytes is None else num_bytes
+        elapsed = self.elapsed()
+        return num_bytes/1e6/elapsed if elapsed else 0
@@ -0,0 +1,90 @@
+"""
+Extraction of snippets of text around the matches of a search term.
+"""
+import re
+from functools import lru_cache
+
+
+def split_search_term(search_term):
+    """Split a search term into its words and "quoted phrases"
+
+    :return: List of the terms
+    """
+    parts = search_term.split('"')
+    # Odd parts were inside quotes
+    terms = [ part.strip() for i, part in enumerate(parts) if i % 2 == 1 ]
+
+    for part in parts[::2]:
+        terms += part.split()
+
+    return [ term for term in terms if term ]
+
+
+class SnippetExtractor(object):
+    """Finds the terms of a search term in text and grabs `context` characters
+    on each side of a match, extended to whole words, without crossing lines
+
+    The text is scanned once, left to right, and snippets don't overlap.
+    """
+
+    def __init__(self, search_term, context=30, max_word_length=100):
+        self.context = context
+        self.max_word_length = max_word_length
+        terms = split_search_term(search_term)
+        # Longest first so that the longest term wins at the same position.
+        # Whitespace in phrases matches any whitespace.
+        patterns = [ r"\s+".join(re.escape(word) for word in term.split())
+                for term in sorted(terms, key=len, reverse=True) ]
+        self.regex = re.compile("|".join(patterns), re.IGNORECASE) \
+                if patterns else None
+
+    def _extend_word(self, text, start, end):
+        """Extend a match to the whitespace around it like `\\S*term\\S*`"""
+        limit = max(0, start - self.max_word_length)
+
+        while start > limit and not text[start-1].isspace():
+            start -= 1
+
+        limit = min(len(text), end + self.max_word_length)
+
+        while end < limit and not text[end].isspace():
+            end += 1
+
+        return start, end
+
+    def extract(self, text):
+        """
+        :return: List of the snippets in the order found
+        """
+        if not self.regex:
+            return []
+
+        snippets = []
+        pos = 0
+
+        while True:
+            m = self.regex.search(text, pos)
+
+            if not m:
+                break
+
+            start, end = self._extend_word(text, m.start(), m.end())
+            lo = max(0, start - self.context)
+            start = max(lo, pos, text.rfind("\n", lo, start) + 1)
+            line_end = text.find("\n", end, end + self.context)
+            end = min(end + self.context,
+                    line_end if line_end >= 0 else len(text))
+
+            snippets.append(text[start:end])
+            # Always move forward even on an empty match
+            pos = max(end, m.end(), pos + 1)
+
+        return snippets
+
+@lru_cache(maxsize=32)
+def compile_snippet_extractor(search_term, context=30):
+    """Compiled once per search term and then reused for every text"""
+    return SnippetExtractor(search_term, context)
+
+def extract_snippets(search_term, text, context=30):
+    return compile_snippet_extractor(search_term, context).extract(text)
@@ -0,0 +1,157 @@
+"""
+Index of the graph made by tags being tagged with other tags.
+
+The graph gets built from all the tags at once, read in a single paginated
+query or from the local replica, so that traversals don't need a request per
+tag.
+"""
+from collections import deque
+
+
+class TagGraph(object):
+    """Adjacency index of the tags
+
+    The tags that a tag is tagged with are its parents. Ancestors follow the
+    parents and descendants follow them in reverse. Tag names are matched
+    case-insensitively.
+
+    :param tags: Iterable of converted tags
+    """
+
+    def __init__(self, tags):
+        self.names = {}
+        self.parents = {}
+        self.children = {}
+        # Names of the tags that get linked to but don't exist
+        self._linked_names = {}
+
+        for tag in tags:
+            key = tag["name"].lower()
+            self.names[key] = tag["name"]
+            parents = self.parents.setdefault(key, [])
+
+            for parent_name in tag.get("tags") or []:
+                parent = parent_name.lower()
+
+                if parent not in parents:
+                    parents.append(parent)
+                    self.children.setdefault(parent, []).append(key)
+                    self._linked_names.setdefault(parent, parent_name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, tag_name):
+        return tag_name.lower() in self.names
+
+    def name(self, key):
+        return self.names.get(key) or self._linked_names.get(key, key)
+
+    def _traverse(self, tag_name, adjacency):
+        """Breadth first traversal which visits each tag once even with cycles
+
+        :return: List of (tag name, depth) in the order visited without the
+            starting tag, None when the tag does not exist
+        """
+        start = tag_name.lower()
+
+        if start not in self.names:
+            return None
+
+        depths = { start: 0 }
+        to_visit = deque([start])
+        visited = []
+
+        while to_visit:
+            key = to_visit.popleft()
+
+            for other in adjacency.get(key, []):
+                if other not in depths:
+                    depths[other] = depths[key] + 1
+                    to_visit.append(other)
+                    visited.append((self.name(other), depths[other]))
+
+        return visited
+
+    def ancestors(self, tag_name):
+        return self._traverse(tag_name, self.parents)
+
+    def descendants(self, tag_name):
+        return self._traverse(tag_name, self.children)
+
+    def cycles(self):
+        """Find the groups of tags that are tagged with each other, directly or
+        through other tags, with Tarjan's strongly connected components
+
+        The traversal is iterative so that deep graphs don't hit the recursion
+        limit.
+
+        :return: List of the sorted tag names of each cycle
+        """
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        cycles = []
+
+        def visit(key):
+            index[key] = lowlink[key] = len(index)
+            stack.append(key)
+            on_stack.add(key)
+            return key, iter(self.parents.get(key, []))
+
+        for root in sorted(self.names):
+            if root in index:
+                continue
+
+            work = [visit(root)]
+
+            while work:
+                key, parents = work[-1]
+
+                for parent in parents:
+                    if parent not in index:
+                        work.append(visit(parent))
+                        break
+                    elif parent in on_stack:
+                        lowlink[key] = min(lowlink[key], index[parent])
+                else:
+                    work.pop()
+
+                    if work:
+                        caller = work[-1][0]
+                        lowlink[caller] = min(lowlink[caller], lowlink[key])
+
+                    if lowlink[key] == index[key]:
+                        component = []
+
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+
+                            if member == key:
+                                break
+
+                        if len(component) > 1 or key in self.parents.get(key, []):
+                            cycles.append(sorted(self.name(member)
+                                for member in component))
+
+        return sorted(cycles)
+
+    def orphans(self):
+        """
+        :return: Sorted names of the tags neither tagged with nor tagging any
+            other tag
+        """
+        return sorted(self.names[key] for key in self.names
+                if not self.parents.get(key) and not self.children.get(key))
+
+    def missing(self):
+        """
+        :return: dict of the name of a tag that is linked to but doesn't exist
+            to the sorted names of the tags linking to it
+        """
+        return dict((self._linked_names[key], sorted(self.name(child)
+            for child in self.children[key]))
+            for key in self._linked_names if key not in self.names)
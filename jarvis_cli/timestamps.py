@@ -0,0 +1,69 @@
+"""
+Parsing of timestamps. Timestamps from the api are ISO-8601 and get parsed
+without the cost of `dateparser` which is only used for free-form user input.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+
+_ISO_DATETIME = re.compile(r"(\d{4})-(\d\d)-(\d\d)"
+        r"(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:[.,](\d+))?)?)?"
+        r"(Z|[+-]\d\d:?\d\d)?$")
+
+
+def _to_naive_utc(dt):
+    if dt.tzinfo:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _parse_iso_datetime_regex(str_datetime):
+    m = _ISO_DATETIME.match(str_datetime)
+
+    if not m:
+        return None
+
+    year, month, day, hour, minute, second, fraction, offset = m.groups()
+    # Truncate or pad any number of fractional digits to microseconds
+    microsecond = int((fraction or "0")[:6].ljust(6, "0"))
+    tzinfo = None
+
+    if offset == "Z":
+        tzinfo = timezone.utc
+    elif offset:
+        offset = offset.replace(":", "")
+        delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+        tzinfo = timezone(-delta if offset[0] == "-" else delta)
+
+    return datetime(int(year), int(month), int(day), int(hour or 0),
+            int(minute or 0), int(second or 0), microsecond, tzinfo)
+
+def parse_iso_datetime(str_datetime):
+    """Parse an ISO-8601 timestamp like the ones from the api
+
+    :return: Naive datetime in UTC or None if not ISO-8601
+    """
+    try:
+        dt = datetime.fromisoformat(str_datetime)
+    except ValueError:
+        # Older pythons don't handle "Z" or fractions that aren't 3 or 6 digits
+        try:
+            dt = _parse_iso_datetime_regex(str_datetime.strip())
+        except ValueError:
+            dt = None
+
+    return _to_naive_utc(dt) if dt else None
+
+def parse_datetime(str_datetime):
+    """Parse free-form user input like "yesterday 5pm" falling back to
+    `dateparser` only when the input isn't ISO-8601
+
+    :return: Naive datetime or None if it can't be parsed
+    """
+    dt = parse_iso_datetime(str_datetime)
+
+    if dt:
+        return dt
+
+    # Heavy import so only import when actually needed
+    import dateparser
+    return dateparser.parse(str_datetime)
@@ -0,0 +1,91 @@
+"""
+Tracing of the api requests made by the client to see where the time of a
+command goes.
+"""
+import json, math, threading, time
+from collections import defaultdict
+from jarvis_cli import client
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0
+
+    rank = int(math.ceil(p/100.0 * len(sorted_values))) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+class RequestTrace(object):
+    """Request listener that collects the records of the requests made while
+    it is started
+
+    :param jsonl_path: Path to also write each record to as json lines as the
+        records come in
+    """
+
+    def __init__(self, jsonl_path=None):
+        self.records = []
+        self._lock = threading.Lock()
+        self._file = open(jsonl_path, 'w') if jsonl_path else None
+        self._start = None
+        self._end = None
+
+    def __call__(self, record):
+        with self._lock:
+            self.records.append(record)
+
+            if self._file:
+                self._file.write(json.dumps(record._asdict()) + "\n")
+
+    def start(self):
+        self._start = time.perf_counter()
+        client.add_request_listener(self)
+        return self
+
+    def stop(self):
+        client.remove_request_listener(self)
+        self._end = time.perf_counter()
+
+        if self._file:
+            self._file.close()
+
+    def elapsed(self):
+        return (self._end or time.perf_counter()) - self._start
+
+    def summary(self, num_slowest=5):
+        with self._lock:
+            records = list(self.records)
+
+        latencies = sorted(r.latency for r in records)
+        request_time = sum(latencies)
+        lines = ["Trace: #requests: {0}, wall: {1:.3f}s, request time: {2:.3f}s, "
+                "bytes: {3}, #retries: {4}, #errors: {5}".format(len(records),
+                    self.elapsed(), request_time, sum(r.bytes for r in records),
+                    sum(r.retries or 0 for r in records),
+                    len([ r for r in records if r.error or (r.status or 0) >= 400 ]))]
+
+        if not records:
+            return lines[0]
+
+        lines.append("Latency: p50: {0:.1f}ms, p90: {1:.1f}ms, p99: {2:.1f}ms, "
+                "max: {3:.1f}ms".format(*[ percentile(latencies, p)*1e3
+                    for p in [50, 90, 99, 100] ]))
+
+        by_endpoint = defaultdict(list)
+
+        for r in records:
+            by_endpoint[(r.method, r.endpoint)].append(r.latency)
+
+        slowest = sorted(by_endpoint.items(), key=lambda e: sum(e[1]),
+                reverse=True)[:num_slowest]
+        lines.append("Slowest endpoints:")
+
+        for (method, endpoint), endpoint_latencies in slowest:
+            lines.append("  {0} {1}: #requests: {2}, total: {3:.3f}s, "
+                    "mean: {4:.1f}ms, max: {5:.1f}ms".format(method, endpoint,
+                        len(endpoint_latencies), sum(endpoint_latencies),
+                        sum(endpoint_latencies)/len(endpoint_latencies)*1e3,
+                        max(endpoint_latencies)*1e3))
+
+        return "\n".join(lines)
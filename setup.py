@@ -17,7 +17,8 @@ setup(
         [console_scripts]
         jarvis=jarvis_cli.commands:cli
         """,
-        install_requires=['requests', 'tabulate', 'dateparser<1.0.0', 'click<7.0',
-            'validators<1.0.0'],
+        install_requires=['requests>=2.16', 'urllib3>=1.21.1', 'tabulate',
+            'dateparser<1.0.0', 'click<7.0', 'validators<1.0.0'],
+        extras_require={ 'async': ['aiohttp>=3.8'] },
         zip_safe = False
         )
@@ -0,0 +1,37 @@
+import pytest
+from jarvis_cli import config
+from jarvis_cli.client import common as cc
+
+
+@pytest.fixture
+def mock_connection():
+    """Function to make a client connection to a MockJarvisApiServer"""
+    def connect(server):
+        return config.ClientConnection(server.url, "joe", "secret",
+                cc.create_session("joe", "secret"), 5, None)
+
+    return connect
+
+@pytest.fixture
+def write_config(tmpdir, monkeypatch):
+    """Function to write the cli configuration of a "mock" environment for an
+    api url. The cli's local directories get kept in tmpdir too."""
+    for name, dirname in [("JARVIS_CLI_CACHE_DIR", "cache"),
+            ("JARVIS_CLI_LOCAL_DIR", "local"), ("JARVIS_CLI_OUTBOX_DIR", "outbox")]:
+        monkeypatch.setattr(config, name, str(tmpdir.join(dirname)))
+
+    def write(url):
+        config_path = str(tmpdir.join("cli_config.ini"))
+
+        with config.create_config("mock", config_path) as config_map:
+            config.set_api_url(config_map, url)
+            config.set_api_user(config_map, "joe")
+            config.set_api_password(config_map, "secret")
+            config.set_jarvis_data_directory(config_map, str(tmpdir.join("data")))
+            config.set_jarvis_snapshots_directory(config_map,
+                    str(tmpdir.join("snapshots")))
+            config.set_author(config_map, "Joe Schmo")
+
+        return config_path
+
+    return write
@@ -0,0 +1,132 @@
+from jarvis_cli import admin
+
+
+def test_migrate_resources_resumes_from_checkpoint(tmpdir, monkeypatch):
+    checkpoint_path = str(tmpdir.join("checkpoint.jsonl"))
+    pages = [[{ "name": "a" }, { "name": "b" }], [{ "name": "c" }]]
+    monkeypatch.setattr(admin.client, "query_generator",
+            lambda resource_type, conn, query_params, prefetch=0: iter(pages))
+
+    posted = []
+    failing = set(["c"])
+
+    def post_to_new(tag):
+        if tag["name"] in failing:
+            return None
+        posted.append(tag["name"])
+        return tag
+
+    def migrate_tags():
+        return admin._migrate_resources("tags", None, lambda tag: tag["name"],
+                lambda tag: tag, post_to_new, admin.MigrationCheckpoint(
+                    checkpoint_path), 2)
+
+    assert not migrate_tags()
+    assert sorted(posted) == ["a", "b"]
+
+    # Simulate rerunning after the failure got resolved
+    failing.clear()
+    assert migrate_tags()
+    assert sorted(posted) == ["a", "b", "c"]
+
+    # Completed so nothing else gets posted
+    assert migrate_tags()
+    assert sorted(posted) == ["a", "b", "c"]
+
+def test_checkpoint_skips_partially_written_line(tmpdir):
+    checkpoint_path = str(tmpdir.join("checkpoint.jsonl"))
+    admin.MigrationCheckpoint(checkpoint_path).mark_migrated("tags", ["a"])
+
+    # Interrupted in the middle of writing the next record
+    with open(checkpoint_path, 'a') as f:
+        f.write('{"resourceType": "tags", "ids": ["b"')
+
+    checkpoint = admin.MigrationCheckpoint(checkpoint_path)
+    assert checkpoint.is_migrated("tags", "a")
+    assert not checkpoint.is_migrated("tags", "b")
+
+    checkpoint.mark_migrated("tags", ["c"])
+    assert admin.MigrationCheckpoint(checkpoint_path).is_migrated("tags", "c")
+
+def test_migrate_reuses_event_created_for_failed_log_entry(tmpdir, monkeypatch):
+    checkpoint_path = str(tmpdir.join("checkpoint.jsonl"))
+    log_entry = { "id": 7, "event": None, "created": "2017-01-01T00:00:00",
+            "occurred": "2017-01-01T00:00:00", "setting": "Home",
+            "modified": "2017-01-01T00:00:00", "version": 1, "body": "Hi" }
+    monkeypatch.setattr(admin.client, "query_generator",
+            lambda resource_type, conn, query_params, prefetch=0: iter(
+                [[dict(log_entry)]] if resource_type == "logentries" else []))
+
+    posted_events = []
+    posted_log_entries = []
+
+    def post_event(conn, event):
+        posted_events.append(event)
+        return { "eventId": "event-{0}".format(len(posted_events)) }
+
+    def post_log_entry(event_id, conn, log_entry):
+        posted_log_entries.append(event_id)
+        return log_entry if len(posted_log_entries) > 1 else None
+
+    monkeypatch.setattr(admin.client, "post_event", post_event)
+    monkeypatch.setattr(admin.cle, "post_log_entry", post_log_entry)
+
+    assert not admin.migrate(None, None, checkpoint_path)
+    # Rerun after the log entry failed to post
+    assert admin.migrate(None, None, checkpoint_path)
+
+    assert len(posted_events) == 1
+    assert posted_log_entries == ["event-1", "event-1"]
+
+def test_import_resources(tmpdir, monkeypatch):
+    import json
+    files_dir = tmpdir.mkdir("files")
+    files_dir.join("tag.md").write("Name: Books\nTags: Reading\n\n# Books\n")
+    files_dir.mkdir("logs").join("log.md").write(
+            "Author: Joe\nTags: Books, Weather\n\nRead a book")
+    files_dir.join("orphan.md").write("Author: Joe\nTags:\n\nNo event")
+    files_dir.join("broken.md").write("Not metadata\n\nbody")
+    files_dir.join("notes.txt").write("Ignored")
+
+    monkeypatch.setattr(admin.fh, "find_missing_tags",
+            lambda conn, tag_names: [ t for t in tag_names if t != "Weather" ])
+
+    posted_tags = []
+    posted_log_entries = []
+
+    def post_tag(conn, tag, skip_tags_check=False):
+        posted_tags.append(tag["name"])
+        return tag
+
+    def post_log_entry(event_id, conn, log_entry, skip_tags_check=False):
+        posted_log_entries.append((event_id, log_entry["body"]))
+        return dict(log_entry, id=len(posted_log_entries))
+
+    monkeypatch.setattr(admin.client, "post_tag", post_tag)
+    monkeypatch.setattr(admin.cle, "post_log_entry", post_log_entry)
+
+    results_path = str(tmpdir.join("results.jsonl"))
+    assert admin.import_resources(None, str(files_dir), "Joe", results_path,
+            max_processes=2) == (1, 3)
+
+    # Reading is the stub and Books is imported from its file
+    assert sorted(posted_tags) == ["Books", "Reading"]
+    assert posted_log_entries == []
+
+    assert admin.import_resources(None, str(files_dir), "Joe", results_path,
+            event_id="123", max_processes=2) == (3, 1)
+    # Posted concurrently so in any order
+    assert sorted(posted_log_entries) == [("123", "No event"),
+            ("123", "Read a book")]
+
+    with open(results_path) as f:
+        results = [ json.loads(line) for line in f ]
+
+    assert [ r["path"].endswith("broken.md") for r in results
+            if r["status"] == "failed" ] == [True]
+
+def test_replace_tag():
+    assert admin._replace_tag(["a", "Old", "b"], "old", "New") == ["a", "New", "b"]
+    # Merging into a tag that is already there
+    assert admin._replace_tag(["new", "old"], "old", "New") == ["new"]
+    assert admin._replace_tag(["old", "x"], "old", "x", exclude="x") == []
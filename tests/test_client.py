@@ -0,0 +1,163 @@
+import os
+import time
+from collections import namedtuple
+import pytest
+from jarvis_cli.client import common as cc
+from jarvis_cli.client.cache import ResourceCache
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, body, headers={}):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+
+    def json(self):
+        return self.body
+
+class FakeSession(object):
+    """Records requests and replies with canned responses keyed by url"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return self.responses[url]
+
+FakeConnection = namedtuple("FakeConnection", ["url", "user", "password",
+    "session", "timeout", "cache", "outbox", "replica", "existing_tag_names"],
+    defaults=[None, None, None])
+
+
+def test_get_uses_connection_session():
+    session = FakeSession({ "http://jarvis/tags/some%20tag":
+        FakeResponse(200, { "name": "some tag", "tagLinks": [] }) })
+    conn = FakeConnection("http://jarvis", "joe", "secret", session, 5, None)
+
+    tag = cc.get_tag(conn, "some tag")
+
+    assert tag == { "name": "some tag", "tags": [] }
+    assert session.requests == [("GET", "http://jarvis/tags/some%20tag",
+        { "timeout": 5 })]
+
+def test_query_generator_follows_next_links():
+    session = FakeSession({
+        "http://jarvis/tags?name=a": FakeResponse(200, { "items": [{ "name": "a" }],
+            "links": [{ "rel": "next", "href": "http://jarvis/tags?page=2" }] }),
+        "http://jarvis/tags?page=2": FakeResponse(200, { "items": [{ "name": "b" }],
+            "links": [] }) })
+    conn = FakeConnection("http://jarvis", "joe", "secret", session, 5, None)
+
+    assert cc.query("tags", conn, [("name", "a")]) == [{ "name": "a" },
+            { "name": "b" }]
+
+def test_get_events_fetches_each_event_once():
+    session = FakeSession({
+        "http://jarvis/events/1": FakeResponse(200, { "eventId": "1" }),
+        "http://jarvis/events/2": FakeResponse(404, None) })
+    conn = FakeConnection("http://jarvis", "joe", "secret", session, 5, None)
+
+    events = cc.get_events(conn, ["1", "2", "1", None, "1"])
+
+    assert events == { "1": { "eventId": "1" }, "2": None }
+    assert sorted(url for _, url, _ in session.requests) == [
+            "http://jarvis/events/1", "http://jarvis/events/2"]
+
+def test_limit_generator_stops_pulling_batches():
+    pulled = []
+
+    def results_generator():
+        for batch in [[1, 2], [3, 4], [5, 6]]:
+            pulled.append(batch)
+            yield batch
+
+    assert list(cc.limit_generator(results_generator(), 3)) == [[1, 2], [3]]
+    assert len(pulled) == 2
+    assert list(cc.limit_generator(results_generator(), None)) == [[1, 2],
+            [3, 4], [5, 6]]
+
+def test_prefetch_generator_reads_ahead():
+    pulled = []
+
+    def results_generator():
+        for batch in [[1], [2], [3]]:
+            pulled.append(batch)
+            yield batch
+
+    prefetched = cc.prefetch_generator(results_generator(), 1)
+    assert next(prefetched) == [1]
+
+    # The next batch gets pulled without the consumer asking for it
+    deadline = time.time() + 5
+    while len(pulled) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(pulled) >= 2
+
+    assert list(prefetched) == [[2], [3]]
+    assert pulled == [[1], [2], [3]]
+
+def test_prefetch_generator_reraises_errors():
+    def results_generator():
+        yield [1]
+        raise ValueError("boom")
+
+    prefetched = cc.prefetch_generator(results_generator(), 2)
+    assert next(prefetched) == [1]
+
+    with pytest.raises(ValueError, match="boom"):
+        next(prefetched)
+
+def test_get_revalidates_cached_resource(tmpdir):
+    url = "http://jarvis/tags/a"
+    session = FakeSession({ url: FakeResponse(200, { "name": "a",
+        "modified": "2016-01-02T03:04:05.123" }, { "ETag": "v1" }) })
+    cache = ResourceCache(str(tmpdir), ttl=300)
+    conn = FakeConnection("http://jarvis", "joe", "secret", session, 5, cache)
+
+    assert cc.get_tag(conn, "a")["name"] == "a"
+    # Fresh so served from the cache
+    assert cc.get_tag(conn, "a")["name"] == "a"
+    assert len(session.requests) == 1
+
+    session.responses[url] = FakeResponse(304, None)
+    assert cc.get_tag(conn, "a", revalidate=True)["name"] == "a"
+    assert len(session.requests) == 2
+
+    _, _, kwargs = session.requests[-1]
+    assert kwargs["headers"] == { "If-None-Match": "v1",
+            "If-Modified-Since": "Sat, 02 Jan 2016 03:04:05 GMT" }
+
+def test_cache_evicts_least_recently_used(tmpdir):
+    cache = ResourceCache(str(tmpdir), max_size=300)
+
+    cache.put("tags", "a", { "body": "a" * 50 })
+    cache.put("tags", "b", { "body": "b" * 50 })
+    os.utime(cache._path("tags", "a"), (0, 0))
+    cache.put("tags", "c", { "body": "c" * 50 })
+
+    assert cache.get("tags", "a") is None
+    assert cache.get("tags", "b").resource == { "body": "b" * 50 }
+    assert cache.get("tags", "c").resource == { "body": "c" * 50 }
+
+def test_find_missing_tags_checks_each_tag_once():
+    from jarvis_cli import file_helper as fh
+    session = FakeSession({
+        "http://jarvis/tags/a": FakeResponse(200, { "name": "a" }),
+        "http://jarvis/tags/b": FakeResponse(404, None) })
+    conn = FakeConnection("http://jarvis", "joe", "secret", session, 5, None,
+            existing_tag_names=set())
+
+    assert fh.find_missing_tags(conn, ["A", "b", "a", "b"]) == ["b"]
+    assert len(session.requests) == 2
+
+    # "a" is now known to exist so only "b" gets checked again
+    assert fh.find_missing_tags(conn, ["a", "b"]) == ["b"]
+    assert len(session.requests) == 3
+
+    # Another connection doesn't know about "a"
+    conn = conn._replace(existing_tag_names=set())
+    assert fh.find_missing_tags(conn, ["a"]) == []
+    assert len(session.requests) == 4
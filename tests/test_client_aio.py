@@ -0,0 +1,168 @@
+import asyncio
+from collections import namedtuple
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from jarvis_cli.client import aio
+
+FakeConnection = namedtuple("FakeConnection", ["url", "user", "password",
+    "session", "timeout", "cache", "replica"])
+
+
+class FakeReplica(object):
+
+    def __init__(self):
+        self.written = []
+
+    def upsert_written(self, endpoint, resource):
+        self.written.append((endpoint, resource))
+
+
+def _run_against(app, func, replica=None):
+    """Run `func(aconn)` against an aiohttp app served on a local port"""
+    async def run():
+        async with TestServer(app) as server:
+            url = str(server.make_url("")).strip("/")
+            conn = FakeConnection(url, "joe", "secret", None, 5, None, replica)
+
+            async with aio.open_connection(conn, max_concurrency=4,
+                    backoff=0) as aconn:
+                return await func(aconn)
+
+    return asyncio.run(run())
+
+
+def test_get_events_concurrently_within_limit():
+    in_flight = []
+    peak = []
+
+    async def get_event(request):
+        assert request.headers["Authorization"] == "Basic am9lOnNlY3JldA=="
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        event_id = request.match_info["id"]
+
+        if event_id == "missing":
+            return web.json_response({}, status=404)
+
+        return web.json_response({ "eventId": event_id })
+
+    app = web.Application()
+    app.router.add_get("/events/{id}", get_event)
+    ids = [ str(i) for i in range(20) ] + ["missing", None, "1"]
+
+    events = _run_against(app, lambda aconn: aio.get_events(aconn, ids))
+
+    assert events["missing"] is None
+    assert events["3"] == { "eventId": "3" }
+    assert len(events) == 21
+    assert max(peak) <= 4
+
+def test_query_follows_next_links():
+    async def get_tags(request):
+        if request.query.get("page") == "2":
+            return web.json_response({ "items": [{ "name": "b",
+                "tagLinks": [{ "title": "a" }] }], "links": [] })
+
+        next_link = str(request.url.with_query({ "page": "2" }))
+        return web.json_response({ "items": [{ "name": "a", "tagLinks": [] }],
+            "links": [{ "rel": "next", "href": next_link }] })
+
+    app = web.Application()
+    app.router.add_get("/tags", get_tags)
+
+    tags = _run_against(app, lambda aconn: aio.query("tags", aconn,
+        [("name", "a")]))
+
+    assert tags == [{ "name": "a", "tags": [] }, { "name": "b", "tags": ["a"] }]
+
+def test_query_generator_reads_ahead_prefetch_pages():
+    requested = []
+
+    async def get_tags(request):
+        page = int(request.query.get("page", "1"))
+        requested.append(page)
+        links = [{ "rel": "next", "href": str(request.url.with_query(
+            { "page": str(page + 1) })) }] if page < 4 else []
+        return web.json_response({ "items": [{ "name": str(page),
+            "tagLinks": [] }], "links": links })
+
+    def first_batch(prefetch):
+        app = web.Application()
+        app.router.add_get("/tags", get_tags)
+
+        async def func(aconn):
+            del requested[:]
+            pages = aio.query_generator("tags", aconn, [], prefetch)
+            batch = await pages.__anext__()
+            await asyncio.sleep(0.2)
+            await pages.aclose()
+            return batch
+
+        return _run_against(app, func)
+
+    assert first_batch(0) == [{ "name": "1", "tags": [] }]
+    assert requested == [1]
+
+    assert first_batch(2) == [{ "name": "1", "tags": [] }]
+    # The queue holds two batches and the producer waits on the third
+    assert requested == [1, 2, 3, 4]
+
+def test_get_retries_unavailable():
+    attempts = []
+
+    async def get_tag(request):
+        attempts.append(1)
+
+        if len(attempts) < 3:
+            return web.json_response({}, status=503)
+
+        return web.json_response({ "name": "a", "tagLinks": [] })
+
+    async def post_tag(request):
+        attempts.append(1)
+        return web.json_response({}, status=503)
+
+    def create_app():
+        app = web.Application()
+        app.router.add_get("/tags/a", get_tag)
+        app.router.add_post("/tags", post_tag)
+        return app
+
+    assert _run_against(create_app(), lambda aconn: aio.get_tag(aconn, "a")) == {
+            "name": "a", "tags": [] }
+    assert len(attempts) == 3
+
+    # Posts are not idempotent so not retried
+    del attempts[:]
+    assert _run_against(create_app(), lambda aconn: aio.post_tag(aconn, { "name": "b" },
+        quiet=True)) is None
+    assert len(attempts) == 1
+
+def test_writes_go_through_to_the_replica():
+    async def post_tag(request):
+        return web.json_response(dict(await request.json(), tagLinks=[]),
+                status=201)
+
+    async def put_tag(request):
+        return web.json_response(dict(await request.json(),
+            name=request.match_info["name"], tagLinks=[]))
+
+    def create_app():
+        app = web.Application()
+        app.router.add_post("/tags", post_tag)
+        app.router.add_put("/tags/{name}", put_tag)
+        return app
+
+    replica = FakeReplica()
+    assert _run_against(create_app(), lambda aconn: aio.post_tag(aconn,
+        { "name": "b" }), replica)
+    assert _run_against(create_app(), lambda aconn: aio.put_tag(aconn, "b",
+        { "body": "edited" }), replica)
+
+    assert replica.written == [("tags", { "name": "b", "tagLinks": [] }),
+            ("tags", { "name": "b", "body": "edited", "tagLinks": [] })]
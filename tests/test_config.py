@@ -9,8 +9,8 @@ def test_config_use(tmpdir):
     snapshots_dir = str(home_dir.join("snapshots_directory"))
 
     ConfigFixture = namedtuple("ConfigFixture", ["set_func", "get_func", "expected_value"])
-    fixtures = [ ConfigFixture(jc.set_host, jc.get_host, "someurl.com"),
-            ConfigFixture(jc.set_port, jc.get_port, 8080),
+    fixtures = [ ConfigFixture(jc.set_api_url, jc.get_api_url, "http://someurl.com"),
+            ConfigFixture(jc.set_api_pool_size, jc.get_api_pool_size, 20),
             ConfigFixture(jc.set_jarvis_data_directory,
                 jc.get_jarvis_data_directory, data_dir),
             ConfigFixture(jc.set_jarvis_snapshots_directory,
@@ -24,9 +24,29 @@ def test_config_use(tmpdir):
             fixture.set_func(config_map, fixture.expected_value)
 
         with pytest.raises(TypeError):
-            jc.set_port(config_map, "should be an integer")
+            jc.set_api_pool_size(config_map, "should be an integer")
 
     config_map = jc.get_config_map(env, config_path)
 
     for fixture in fixtures:
         assert fixture.expected_value == fixture.get_func(config_map)
+
+def test_client_connection(tmpdir):
+    config_path = str(tmpdir.join("cli_config.ini"))
+
+    with jc.create_config("test", config_path) as config_map:
+        jc.set_api_url(config_map, "http://someurl.com/")
+        jc.set_api_user(config_map, "joe")
+        jc.set_api_password(config_map, "secret")
+        jc.set_api_pool_size(config_map, 4)
+
+    conn = jc.get_client_connection(jc.get_config_map("test", config_path))
+
+    assert conn.url == "http://someurl.com"
+    assert conn.session.auth == ("joe", "secret")
+    # Not set so expect the default
+    assert conn.timeout == 30
+
+    adapter = conn.session.get_adapter(conn.url)
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 3
@@ -0,0 +1,24 @@
+import os
+from jarvis_cli import file_helper as fh
+from jarvis_cli.admin import _find_resource_files
+
+# Ported from the old test/test_jarvis.py which imported a module that no
+# longer exists
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "test", "fixtures")
+
+
+def test_convert_file_to_json():
+    j = fh.convert_file_to_json(os.path.join(FIXTURES_DIR, "test_log.md"))
+    # Version 0.2.0
+    expected_keys = sorted(['version', 'created', 'body', 'tags', 'occurred',
+        'author', 'parent', 'todo', 'setting'])
+    assert expected_keys == sorted(j.keys())
+
+def test_convert_file_to_json_for_no_tags_case():
+    j = fh.convert_file_to_json(os.path.join(FIXTURES_DIR, "tags", "TestA.md"))
+    assert j['tags'] == []
+
+def test_find_tag_files():
+    filepaths = _find_resource_files(os.path.join(FIXTURES_DIR, "tags"))
+    assert [ os.path.basename(fp) for fp in filepaths ] == ["TestA.md",
+            "TestB&C.md"]
@@ -0,0 +1,99 @@
+from jarvis_cli import local_store as ls
+
+
+def create_log_entry(log_entry_id, body, tags, modified):
+    return { "id": log_entry_id, "event": "e{0}".format(log_entry_id),
+            "created": modified, "modified": modified, "body": body,
+            "tags": tags }
+
+def test_to_fts_query():
+    assert ls.to_fts_query('war "and peace" AND') == '"and peace" "war" "AND"'
+
+def test_search_log_entries(tmpdir):
+    store = ls.LocalStore(str(tmpdir.join("test.sqlite")))
+    store.upsert_log_entries([
+        create_log_entry(1, "Read War and Peace by Tolstoy", ["Books"],
+            "2016-01-01T00:00:00"),
+        create_log_entry(2, "Sunny, no war today", ["Weather"],
+            "2016-01-02T00:00:00"),
+        create_log_entry(3, "War war war", ["Books", "History"],
+            "2016-01-03T00:00:00") ])
+
+    def ids(results):
+        return [ log_entry["id"] for log_entry, _ in results ]
+
+    assert ids(store.search_log_entries()) == [3, 2, 1]
+    assert ids(store.search_log_entries(tag_name="books")) == [3, 1]
+    # Ranked by relevance
+    found = ids(store.search_log_entries(search_term="war"))
+    assert found[0] == 3 and sorted(found) == [1, 2, 3]
+    assert ids(store.search_log_entries(search_term='"war and peace"')) == [1]
+    assert ids(store.search_log_entries(tag_name="weather",
+        search_term="war")) == [2]
+
+    # Nothing to match on so the same as not searching
+    assert ids(store.search_log_entries(search_term='""')) == [3, 2, 1]
+    assert ids(store.search_log_entries(search_term=' " ')) == [3, 2, 1]
+
+    _, snippets = store.search_log_entries(search_term="tolstoy")[0]
+    assert snippets == ["Read War and Peace by Tolstoy"]
+
+    # Updating replaces the indexed body and tags
+    store.upsert_log_entries([ create_log_entry(1, "Nothing", [],
+        "2016-01-04T00:00:00") ])
+    assert ids(store.search_log_entries(search_term="tolstoy")) == []
+    assert ids(store.search_log_entries(tag_name="books")) == [3]
+
+def test_update_log_entries(tmpdir, monkeypatch):
+    store = ls.LocalStore(str(tmpdir.join("test.sqlite")))
+    pages = [[ create_log_entry(1, "a", [], "2016-01-01T00:00:00") ],
+            [ create_log_entry(2, "b", [], "2016-01-02T00:00:00") ]]
+
+    monkeypatch.setattr(ls.client, "query_log_entries_generator",
+            lambda conn, query_params, prefetch=0: iter(pages))
+    monkeypatch.setattr(ls.client, "get_events", lambda conn, event_ids:
+            dict((eid, { "eventId": eid }) for eid in event_ids))
+
+    assert not store.has_synced("logentries")
+    assert store.update_log_entries(None) == 2
+    assert store.get_watermark("logentries") == "2016-01-02T00:00:00"
+    assert store.get_event("e1") == { "eventId": "e1" }
+
+    pages[0].append(create_log_entry(3, "c", [], "2016-01-03T00:00:00"))
+    assert store.update_log_entries(None) == 1
+
+def test_sync_from_mock_api(tmpdir):
+    from jarvis_cli import config
+    from jarvis_cli.client import common as cc
+    from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+
+    api = populate(MockJarvisApi(), 5, 10, 30)
+    store = ls.LocalStore(str(tmpdir.join("test.sqlite")))
+
+    with MockJarvisApiServer(api) as server:
+        conn = config.ClientConnection(server.url, "joe", "secret",
+                cc.create_session("joe", "secret"), 5, None)
+
+        assert store.sync(conn) == [("tags", 5), ("events", 10),
+                ("logentries", 30)]
+
+        status, log_entry = api.update_log_entry(api.log_entries[7]["event"],
+                "7", { "body": "changed" })
+        assert store.sync(conn) == [("tags", 0), ("events", 0),
+                ("logentries", 1)]
+
+    assert store.get_log_entry(log_entry["event"], 7)["body"] == "changed"
+    assert store.get_tag("tag1")["name"] == "Tag1"
+    assert [ t["name"] for t in store.search_tags("tag", limit=2) ] == ["Tag0",
+            "Tag1"]
+    events = store.search_events()
+    assert len(events) == 10 and events[0]["occurred"] >= events[-1]["occurred"]
+    assert [ s["count"] for s in store.data_summary() ] == [5, 10, 30]
+
+def test_summary_of_log_entry_without_its_event():
+    from jarvis_cli.commands.action_list import _create_summary_of_log_entry
+    log_entry = create_log_entry(1, "Read a book", ["Books"], "2016-01-01T00:00:00")
+
+    summary = _create_summary_of_log_entry({ "e1": None }, log_entry)
+    assert "Occurred: unknown, Created: 2016-01-01T00:00:00" in summary
+    assert "Occurred: unknown" in _create_summary_of_log_entry({}, log_entry)
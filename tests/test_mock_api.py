@@ -0,0 +1,179 @@
+from click.testing import CliRunner
+from jarvis_cli import admin
+from jarvis_cli.client import common as cc
+from jarvis_cli.commands import cli
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+
+
+def test_populate_is_repeatable():
+    api_a = populate(MockJarvisApi(), 5, 10, 30, seed=3)
+    api_b = populate(MockJarvisApi(), 5, 10, 30, seed=3)
+
+    assert api_a.log_entries == api_b.log_entries
+    assert len(api_a.tags) == 5 and len(api_a.events) == 10
+
+def test_client_against_mock_api(mock_connection):
+    api = populate(MockJarvisApi(page_size=7), 5, 10, 30)
+
+    with MockJarvisApiServer(api) as server:
+        conn = mock_connection(server)
+
+        log_entries = cc.query("search/logentries", conn, [("tags", "Tag1")])
+        assert log_entries and all("Tag1" in le["tags"] for le in log_entries)
+        assert len(cc.query("logentries", conn, [])) == 30
+        assert cc.get_data_summary("events", conn)["count"] == 10
+        assert cc.get_tag(conn, "Tag0")["name"] == "Tag0"
+        assert cc.get_tag(conn, "missing") is None
+        # Tags must exist unless the check is skipped
+        assert cc.post_tag(conn, { "name": "New", "tags": ["missing"] },
+                quiet=True) is None
+        assert cc.post_tag(conn, { "name": "New", "tags": ["missing"] },
+                skip_tags_check=True)["tags"] == ["missing"]
+        # Event ids given get kept and can't be reused
+        assert cc.post_event(conn, { "eventId": "abc", "category": "consumed" }
+                )["eventId"] == "abc"
+        assert cc.post_event(conn, { "eventId": "abc", "category": "consumed" },
+                quiet=True) is None
+
+def test_migrate_between_mock_apis(tmpdir, mock_connection):
+    api_source = populate(MockJarvisApi(), 5, 10, 30)
+    api_target = MockJarvisApi()
+
+    with MockJarvisApiServer(api_source) as source, \
+            MockJarvisApiServer(api_target) as target:
+        assert admin.migrate(mock_connection(source), mock_connection(target),
+                str(tmpdir.join("checkpoint.jsonl")))
+
+    assert sorted(api_target.tags) == sorted(api_source.tags)
+    assert sorted(api_target.events) == sorted(api_source.events)
+    # Each log entry stays with the event it was migrated from
+    assert sorted((le["event"], le["setting"], le["body"])
+            for le in api_target.log_entries.values()) \
+            == sorted((le["event"], le["setting"], le["body"])
+                    for le in api_source.log_entries.values())
+
+def test_list_logs_command(write_config):
+    api = populate(MockJarvisApi(), 5, 10, 30)
+
+    with MockJarvisApiServer(api) as server:
+        result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+            write_config(server.url), "--no-cache", "list", "logs",
+            "-n", "12"])
+
+    assert result.exit_code == 0, result.output
+    assert "Log entries found: 12" in result.output
+
+def test_retag_command(write_config):
+    api = MockJarvisApi(page_size=3)
+    api.create_tag({ "name": "Old" })
+    api.create_tag({ "name": "Other", "tags": ["Old"] })
+    _, event = api.create_event({ "category": "consumed" })
+
+    for i in range(8):
+        api.create_log_entry(event["eventId"], { "tags": ["Old", "Other"]
+            if i % 2 else ["Other"], "body": "entry {0}".format(i) })
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+        args = ["-e", "mock", "--config-path", config_path, "--no-cache",
+                "admin", "retag", "--from", "old", "--to", "New"]
+
+        result = CliRunner().invoke(cli, args + ["--dry-run"])
+        assert result.exit_code == 0, result.output
+        assert "Log entries tagged old: 4" in result.output
+        assert "Would create tag: New" in result.output
+        assert "new" not in api.tags
+
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        assert "#updated: 5, #conflicts: 0, #failed: 0" in result.output
+
+    assert "new" in api.tags
+    assert [ link["title"] for link in api.tags["other"]["tagLinks"] ] == ["New"]
+    assert sorted(tuple(link["title"] for link in log_entry["tagLinks"])
+            for log_entry in api.log_entries.values()) \
+                    == [("New", "Other")]*4 + [("Other",)]*4
+
+def test_retag_skips_conflicts(monkeypatch, mock_connection):
+    api = MockJarvisApi()
+    api.create_tag({ "name": "Old" })
+    api.create_tag({ "name": "Linked", "tags": ["Old"] })
+
+    with MockJarvisApiServer(api) as server:
+        conn = mock_connection(server)
+        find_tagged = admin.find_tagged
+
+        def find_then_edit(conn, tag_name):
+            found = find_tagged(conn, tag_name)
+            # Someone else edits the tag after it was found
+            api.update_tag("Linked", { "body": "edited" })
+            return found
+
+        monkeypatch.setattr(admin, "find_tagged", find_then_edit)
+        assert admin.retag(conn, "joe", "Old", "New") == (0, 1, 0)
+
+    assert api.tags["linked"]["body"] == "edited"
+    assert [ link["title"] for link in api.tags["linked"]["tagLinks"] ] == ["Old"]
+
+def test_get_data_summaries_conditionally(mock_connection):
+    api = populate(MockJarvisApi(), 3, 2, 5)
+
+    with MockJarvisApiServer(api) as server:
+        conn = mock_connection(server)
+        summaries = cc.get_data_summaries(conn)
+        assert dict((rt, s["count"]) for rt, (s, _) in summaries.items()) \
+                == { "tags": 3, "events": 2, "logentries": 5 }
+
+        api.create_tag({ "name": "New" })
+        updated = cc.get_data_summaries(conn, summaries)
+
+    assert updated["tags"][0]["count"] == 4
+    # Not modified so the previous summary got reused
+    assert updated["events"][0] is summaries["events"][0]
+    assert api.num_requests[("GET", "datasummary")] == 6
+
+def test_watch_status_command(write_config):
+    api = populate(MockJarvisApi(), 3, 2, 5)
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+        result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+            config_path, "admin", "status", "--watch", "--interval", "0",
+            "--count", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "#requests: 3, #not modified: 0" in result.output
+    assert "#requests: 3, #not modified: 3" in result.output
+
+def test_watch_status_survives_unreachable_api(write_config, monkeypatch):
+    import requests
+    from jarvis_cli import client
+
+    unavailable = requests.Response()
+    unavailable.status_code = 503
+    # Summaries of an api with other columns than the mock's
+    results = [requests.ConnectionError("down"),
+            { "tags": ({ "resourceType": "tags", "count": 3 }, '"a"') },
+            requests.ConnectionError("down again"),
+            requests.HTTPError("503 Server Error", response=unavailable),
+            { "tags": ({ "resourceType": "tags", "count": 5 }, '"b"') }]
+
+    def get_data_summaries(conn, previous=None):
+        result = results.pop(0)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    monkeypatch.setattr(client, "get_data_summaries", get_data_summaries)
+    result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+        write_config("http://127.0.0.1:1"), "admin", "status", "--watch",
+        "--interval", "0", "--count", "5"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.count("Jarvis-api unreachable") == 2
+    assert result.output.count("Jarvis-api unavailable") == 1
+    # The delta is since the last refresh that got through
+    assert [ line.split()[:3] for line in result.output.splitlines()
+            if line.startswith("tags") ] == [["tags", "3"], ["tags", "5", "2"]]
@@ -0,0 +1,166 @@
+import json, os
+import pytest
+from jarvis_cli import config
+from jarvis_cli.client import common as cc
+from jarvis_cli.client.cache import ResourceCache
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+from jarvis_cli.outbox import Outbox
+
+
+def _connection(url, tmpdir):
+    return config.ClientConnection(url, "joe", "secret",
+            cc.create_session("joe", "secret", retries=0), 5,
+            ResourceCache(str(tmpdir.join("cache"))),
+            Outbox(str(tmpdir.join("outbox", "test.jsonl"))))
+
+
+def test_queue_writes_while_unreachable_then_flush(tmpdir):
+    api = populate(MockJarvisApi(), 3, 1, 0)
+    server = MockJarvisApiServer(api).start()
+    port = server.server_address[1]
+    conn = _connection(server.url, tmpdir)
+    # Read before editing so that the put has a base version
+    assert cc.get_tag(conn, "Tag0")
+    assert cc.get_tag(conn, "Tag1")
+    server.stop()
+    # Drop the kept alive connection which the stopped server still serves
+    conn.session.close()
+
+    assert cc.post_tag(conn, { "name": "New", "tags": [] }) is None
+    assert cc.put_tag(conn, "Tag0", { "body": "edited offline" }) is None
+    assert cc.put_tag(conn, "Tag1", { "body": "edited offline" }) is None
+    assert [ r["method"] for r in conn.outbox.pending() ] == ["POST", "PUT",
+            "PUT"]
+
+    # Still unreachable so nothing gets sent
+    assert conn.outbox.flush(conn) == (0, 0, 3)
+
+    # Someone else edits Tag1 in the meantime
+    api.update_tag("Tag1", { "body": "edited online" })
+
+    with MockJarvisApiServer(api, port=port):
+        assert conn.outbox.flush(conn) == (2, 1, 0)
+
+    assert api.tags["new"]["name"] == "New"
+    assert api.tags["tag0"]["body"] == "edited offline"
+    assert api.tags["tag1"]["body"] == "edited online"
+    assert not conn.outbox.has_pending()
+
+    with open(conn.outbox.rejected_filepath) as f:
+        rejected = [ json.loads(line) for line in f ]
+
+    assert [ (r["resourceId"], r["request"]) for r in rejected ] == [("Tag1",
+        { "body": "edited offline" })]
+    assert rejected[0]["reason"].startswith("Conflict")
+
+def test_pending_skips_done_and_partial_records(tmpdir):
+    outbox = Outbox(str(tmpdir.join("test.jsonl")))
+    key_a = outbox.enqueue("POST", "tags", { "name": "a" })
+    outbox.enqueue("POST", "tags", { "name": "b" })
+    outbox._done({ "key": key_a }, "sent")
+
+    with open(outbox.filepath, 'a') as f:
+        f.write('{"op": "queued", "key"')
+
+    assert [ r["request"]["name"] for r in outbox.pending() ] == ["b"]
+
+def test_api_errors_are_printed_and_not_queued(tmpdir, capsys):
+    api = populate(MockJarvisApi(), 1, 0, 0)
+
+    with MockJarvisApiServer(api) as server:
+        conn = _connection(server.url, tmpdir)
+
+        assert cc.put_tag(conn, "nope", { "body": "x" }) is None
+        assert "Jarvis-api not found: nope" in capsys.readouterr().out
+
+        assert cc.post_tag(conn, { "name": "Tag0", "tags": [] }) is None
+        assert "Jarvis-api error: 409" in capsys.readouterr().out
+
+        # Quiet posts still don't print
+        assert cc.post_tag(conn, { "name": "Tag0", "tags": [] }, quiet=True) \
+                is None
+        assert capsys.readouterr().out == ""
+
+    assert not conn.outbox.has_pending()
+
+def test_queued_post_keeps_the_idempotency_key_first_sent(tmpdir):
+    import requests
+
+    class TimingOutSession(object):
+        def __init__(self):
+            self.headers = []
+
+        def request(self, method, url, **kwargs):
+            self.headers.append(kwargs.get("headers"))
+            raise requests.Timeout()
+
+    session = TimingOutSession()
+    conn = config.ClientConnection("http://jarvis", "joe", "secret", session, 5,
+            None, Outbox(str(tmpdir.join("test.jsonl"))))
+
+    # The post may have been created before timing out
+    assert cc.post_event(conn, { "category": "consumed" }) is None
+
+    key = conn.outbox.pending()[0]["key"]
+    assert session.headers == [{ "Idempotency-Key": key }]
+
+    with pytest.raises(requests.Timeout):
+        conn.outbox._send(conn._replace(outbox=None), conn.outbox.pending()[0])
+
+    assert session.headers[-1] == { "Idempotency-Key": key }
+
+def test_flush_ahead_of_the_next_write_only(tmpdir, write_config, capsys):
+    from click.testing import CliRunner
+    from jarvis_cli.commands import cli
+
+    api = populate(MockJarvisApi(), 1, 0, 0)
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+        outbox = Outbox(os.path.join(config.JARVIS_CLI_OUTBOX_DIR, "mock.jsonl"))
+        outbox.enqueue("POST", "tags", { "name": "Queued", "tags": [] })
+
+        # Reads don't touch the outbox
+        for args in [["list", "tags"], ["new", "--help"], ["graph", "orphans"]]:
+            result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+                config_path] + args)
+            assert result.exit_code == 0, result.output
+
+        assert "queued" not in api.tags
+
+        conn = _connection(server.url, tmpdir)._replace(outbox=outbox)
+        assert cc.post_tag(conn, { "name": "New", "tags": [] })
+
+    assert "#sent: 1, #rejected: 0, #still queued: 0" in capsys.readouterr().out
+    # The queued write went first
+    assert list(api.tags) == ["tag0", "queued", "new"]
+
+def test_new_with_tags_gets_queued_while_unreachable(tmpdir, write_config,
+        monkeypatch):
+    from click.testing import CliRunner
+    from jarvis_cli.commands import cli
+
+    server = MockJarvisApiServer(MockJarvisApi()).start()
+    config_path = write_config(server.url)
+    server.stop()
+
+    with open(config_path, 'a') as f:
+        f.write("api_retries = 0\n")
+
+    # The editor sets the tags of whatever gets created
+    editor_path = tmpdir.join("editor.sh")
+    editor_path.write("#!/bin/sh\nsed -i 's/^Tags:.*/Tags: Weather/' \"$1\"\n")
+    editor_path.chmod(0o755)
+    monkeypatch.setenv("EDITOR", str(editor_path))
+
+    for args in [["new", "log", "-e", "1"], ["new", "tag", "Foo"]]:
+        result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+            config_path, "--no-cache"] + args)
+        assert result.exit_code == 0, result.output
+        assert "queued in the outbox" in result.output
+
+    outbox = Outbox(os.path.join(config.JARVIS_CLI_OUTBOX_DIR, "mock.jsonl"))
+    queued = outbox.pending()
+    assert [ (r["endpoint"], r["request"]["tags"], r["skipTagsCheck"])
+            for r in queued ] == [("events/1/logentries", ["Weather"], True),
+                    ("tags", ["Weather"], True)]
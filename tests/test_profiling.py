@@ -0,0 +1,24 @@
+from click.testing import CliRunner
+from jarvis_cli.commands import cli
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+
+
+def test_profile_command(tmpdir, write_config):
+    api = populate(MockJarvisApi(), 3, 5, 10)
+    report_path = str(tmpdir.join("profile.txt"))
+
+    with MockJarvisApiServer(api) as server:
+        result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+            write_config(server.url), "--no-cache", "--profile",
+            report_path, "list", "logs"])
+
+    assert result.exit_code == 0, result.output
+    assert "Profile report: {0}".format(report_path) in result.output
+
+    with open(report_path) as f:
+        report = f.read()
+
+    assert report.startswith("Profile of: cli list logs\nWall: ")
+    assert "Imports: " in report
+    assert "Top functions by cumulative time:" in report
+    assert "list_log_entries" in report
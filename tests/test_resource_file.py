@@ -0,0 +1,41 @@
+import io, os
+import pytest
+from jarvis_cli import resource_file as rf
+from jarvis_cli.exceptions import JarvisParseError
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "test", "fixtures")
+
+
+def test_parse_file():
+    j = rf.parse_file(os.path.join(FIXTURES_DIR, "test_log.md"))
+
+    expected_keys = sorted(['version', 'created', 'body', 'tags', 'occurred',
+        'author', 'parent', 'todo', 'setting'])
+    assert expected_keys == sorted(j.keys())
+    assert j["tags"] == ["Weather", "HelloWorld"]
+    assert j["body"].startswith("The cat was such")
+
+def test_parse_file_for_no_tags_case():
+    j = rf.parse_file(os.path.join(FIXTURES_DIR, "tags", "TestA.md"))
+    assert j["tags"] == []
+    assert j["body"].startswith("# TestA\n\nThis tag")
+
+def test_parse_without_body():
+    # Editors may strip the trailing whitespace after the colon
+    assert rf.parse(io.StringIO("Name: a\nTags:\nTodo:")) == { "name": "a",
+            "tags": [], "todo": "" }
+
+def test_parse_malformed_metadata():
+    with pytest.raises(JarvisParseError) as e:
+        rf.parse(io.StringIO("Name: a\nnot metadata\n\nbody"), "some.md")
+
+    assert "some.md:2" in str(e.value)
+
+def test_serialize_round_trip():
+    keys = ["name", "author", "tags", "parent"]
+    tag = { "name": "a", "author": "Joe", "tags": ["b", "c"], "parent": None,
+            "body": "# a\n\nSome *markdown*\n\n\nMore\n" }
+
+    content = rf.serialize(keys, tag)
+    assert content.startswith("Name: a\nAuthor: Joe\nTags: b, c\nParent: \n\n")
+    assert rf.parse(io.StringIO(content)) == dict(tag, parent="")
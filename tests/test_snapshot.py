@@ -0,0 +1,129 @@
+import os, hashlib, tarfile, gzip
+from jarvis_cli import snapshot
+
+
+def create_data_dir(tmpdir):
+    data_dir = tmpdir.mkdir("jarvis")
+    data_dir.mkdir("tags").join("Books.md").write("# Books\n" * 1000)
+    data_dir.mkdir("logentries").join("1.md").write("Read a book\n" * 5000)
+    data_dir.mkdir("empty")
+    return data_dir
+
+def test_write_snapshot(tmpdir):
+    data_dir = create_data_dir(tmpdir)
+    snapshot_filepath = str(tmpdir.join("snapshot.tar.gz"))
+
+    # Small chunks to get many gzip members
+    manifest = snapshot.write_snapshot(snapshot_filepath, str(data_dir),
+            chunk_size=4096, max_workers=3)
+
+    with open(snapshot_filepath, 'rb') as f:
+        content = f.read()
+
+    assert manifest == snapshot.read_manifest(snapshot_filepath)
+    assert manifest["archiveSha256"] == hashlib.sha256(content).hexdigest()
+    assert len(manifest["members"]) > 1
+    assert sum(length for _, length in manifest["members"]) == len(content)
+    assert sorted(manifest["files"].keys()) == ["logentries/1.md", "tags/Books.md"]
+    assert manifest["files"]["tags/Books.md"]["sha256"] == hashlib.sha256(
+            b"# Books\n" * 1000).hexdigest()
+
+    # Concatenated members are a regular tar.gz
+    with tarfile.open(snapshot_filepath, "r:gz") as tar:
+        assert sorted(tar.getnames()) == ["jarvis/empty", "jarvis/logentries",
+                "jarvis/logentries/1.md", "jarvis/tags", "jarvis/tags/Books.md"]
+        assert tar.extractfile("jarvis/logentries/1.md").read() == \
+                b"Read a book\n" * 5000
+
+def read_tree(top_dir):
+    tree = {}
+
+    for dirpath, _, filenames in os.walk(top_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path) as f:
+                tree[os.path.relpath(path, top_dir)] = f.read()
+
+    return tree
+
+def test_incremental_snapshot_chain(tmpdir):
+    from datetime import datetime
+    data_dir = create_data_dir(tmpdir)
+    snapshots_dir = tmpdir.mkdir("snapshots")
+
+    def write(timestamp, incremental):
+        parent = snapshot.find_latest_snapshot(str(snapshots_dir), "test") \
+                if incremental else None
+        filepath = str(snapshots_dir.join(snapshot.create_snapshot_filename(
+            "test", timestamp, incremental)))
+        return filepath, snapshot.write_snapshot(filepath, str(data_dir), parent)
+
+    full, _ = write(datetime(2016, 1, 1), False)
+
+    data_dir.join("tags").join("Books.md").write("# Books\nUpdated\n")
+    data_dir.join("tags").join("Weather.md").write("# Weather\n")
+    data_dir.join("logentries").join("1.md").remove()
+    # Touched but same content
+    os.utime(str(data_dir.join("tags").join("Books.md")))
+    first, manifest = write(datetime(2016, 1, 2), True)
+
+    assert manifest["parent"] == os.path.basename(full)
+    assert sorted(manifest["archived"]) == ["tags/Books.md", "tags/Weather.md"]
+    assert manifest["deleted"] == ["logentries/1.md"]
+
+    os.utime(str(data_dir.join("tags").join("Weather.md")), (0, 0))
+    second, manifest = write(datetime(2016, 1, 3), True)
+
+    assert manifest["archived"] == []
+    assert sorted(manifest["files"]) == ["tags/Books.md", "tags/Weather.md"]
+    assert snapshot.get_snapshot_chain(second) == [full, first, second]
+
+    restored_dir = tmpdir.mkdir("restored")
+    snapshot.extract_snapshot_chain(second, str(restored_dir))
+    assert read_tree(str(restored_dir.join("jarvis"))) == read_tree(str(data_dir))
+
+def test_restore_snapshot(tmpdir):
+    from jarvis_cli import admin
+    data_dir = create_data_dir(tmpdir)
+    expected = read_tree(str(data_dir))
+    snapshot_filepath = str(tmpdir.join("snapshot.tar.gz"))
+    snapshot.write_snapshot(snapshot_filepath, str(data_dir), chunk_size=4096)
+    config_map = { "data_directory": str(data_dir) }
+
+    data_dir.join("tags").join("Books.md").write("Overwritten")
+    assert admin.restore_snapshot(config_map, snapshot_filepath)
+    assert read_tree(str(data_dir)) == expected
+    # Nothing left behind from staging
+    assert sorted(os.listdir(str(tmpdir))) == ["jarvis", "snapshot.tar.gz",
+            "snapshot.tar.gz.manifest.json"]
+
+    # Corrupt archive doesn't touch the data directory
+    with open(snapshot_filepath, 'r+b') as f:
+        f.seek(100)
+        f.write(b"corrupt")
+
+    data_dir.join("tags").join("Books.md").write("Kept")
+    assert not admin.restore_snapshot(config_map, snapshot_filepath)
+    assert data_dir.join("tags").join("Books.md").read() == "Kept"
+
+def test_restore_snapshot_puts_the_data_back_when_the_swap_fails(tmpdir,
+        monkeypatch):
+    from jarvis_cli import admin
+    data_dir = create_data_dir(tmpdir)
+    snapshot_filepath = str(tmpdir.join("snapshot.tar.gz"))
+    snapshot.write_snapshot(snapshot_filepath, str(data_dir), chunk_size=4096)
+    data_dir.join("tags").join("Books.md").write("Kept")
+    rename = os.rename
+
+    def failing_rename(src, dst):
+        # Fail swapping the staged data directory in
+        if os.path.basename(os.path.dirname(src)).startswith(".jarvis_restore"):
+            raise OSError("No space left on device")
+        rename(src, dst)
+
+    monkeypatch.setattr(admin.os, "rename", failing_rename)
+    assert not admin.restore_snapshot({ "data_directory": str(data_dir) },
+            snapshot_filepath)
+    assert data_dir.join("tags").join("Books.md").read() == "Kept"
+    assert sorted(os.listdir(str(tmpdir))) == ["jarvis", "snapshot.tar.gz",
+            "snapshot.tar.gz.manifest.json"]
@@ -0,0 +1,27 @@
+from jarvis_cli import snippets
+
+
+def test_split_search_term():
+    assert snippets.split_search_term('war "and  peace" tolstoy') == [
+            "and  peace", "war", "tolstoy"]
+    assert snippets.split_search_term('  ') == []
+
+def test_extract_snippets():
+    text = ("The quick brown fox jumps over the lazy dog. " * 3).strip()
+
+    assert snippets.extract_snippets("fox", text, context=10) == [
+            "ick brown fox jumps ove", "ick brown fox jumps ove",
+            "ick brown fox jumps ove"]
+    # Whole words around the match
+    assert snippets.extract_snippets("mp", "a jumps b", context=0) == ["jumps"]
+
+def test_extract_snippets_terms_and_phrases():
+    text = "alpha beta\ngamma   delta epsilon"
+
+    assert snippets.extract_snippets('"GAMMA delta" alpha', text, context=3) == [
+            "alpha be", "gamma   delta ep"]
+
+def test_extract_snippets_escapes_search_term():
+    assert snippets.extract_snippets("c++ (x", "use c++ (x) now",
+            context=0) == ["c++", "(x)"]
+    assert snippets.extract_snippets(".*", "nothing here") == []
@@ -0,0 +1,37 @@
+import os, sys, json, subprocess
+from jarvis_cli.commands import cli
+
+HEAVY_MODULES = ["dateparser", "tabulate", "validators", "requests",
+        "webbrowser", "sqlite3"]
+
+# Run in a fresh interpreter since the tests have imported everything already.
+# Resolving a subcommand is what `jarvis show ...` does before running it.
+_STARTUP_SCRIPT = """
+import sys, json
+from jarvis_cli.commands import cli
+loaded = [ m for m in {0!r} if m in sys.modules ]
+{1}
+print(json.dumps({{ "loaded": loaded,
+    "loaded_command": [ m for m in {0!r} if m in sys.modules ] }}))
+"""
+
+def _run_fresh_interpreter(command_name="show"):
+    script = _STARTUP_SCRIPT.format(HEAVY_MODULES,
+            "cli.get_command(None, {0!r})".format(command_name))
+    p = subprocess.run([sys.executable, "-c", script], stdout=subprocess.PIPE,
+            check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+    return json.loads(p.stdout.decode().splitlines()[-1])
+
+
+def test_startup_is_lazy():
+    result = _run_fresh_interpreter()
+    assert result["loaded"] == []
+    # The api client is needed to show but none of the rest
+    assert result["loaded_command"] == ["requests"]
+
+def test_lazy_commands_resolve():
+    assert cli.list_commands(None) == ["admin", "edit", "graph", "list", "new",
+            "show", "sync"]
+
+    for name in cli.list_commands(None):
+        assert cli.get_command(None, name).name == name
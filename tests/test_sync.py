@@ -0,0 +1,70 @@
+from click.testing import CliRunner
+from jarvis_cli import client, config
+from jarvis_cli.client import log_entry as cle
+from jarvis_cli.commands import cli
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+
+
+def test_sync_then_read_locally(write_config):
+    # write_config keeps the replica in tmpdir
+    api = populate(MockJarvisApi(), 5, 10, 30)
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+
+        def invoke(*args):
+            result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+                config_path, "--no-cache"] + list(args))
+            assert result.exit_code == 0, result.output
+            return result.output
+
+        assert "Reading the local replica" not in invoke("list", "logs")
+
+        output = invoke("sync")
+        assert "#logentries updated: 30" in output
+
+        num_requests = sum(api.num_requests.values())
+        output = invoke("list", "logs", "-t", "Tag1")
+        assert "Reading the local replica" in output
+        assert sum(api.num_requests.values()) == num_requests
+
+        assert "Log entries found" in invoke("--remote", "list", "logs")
+        assert sum(api.num_requests.values()) > num_requests
+
+        # The api status unless asked for the replica's
+        output = invoke("admin", "status")
+        assert "latestModified" in output and "synced" not in output
+
+        output = invoke("admin", "status", "--local")
+        assert "logentries" in output and "30" in output and "synced" in output
+
+def test_writes_go_through_to_the_replica(write_config):
+    api = populate(MockJarvisApi(), 5, 2, 5)
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+        config_map = config.get_config_map("mock", config_path)
+        assert config.get_client_connection(config_map).replica is None
+
+        def invoke(*args):
+            result = CliRunner().invoke(cli, ["-e", "mock", "--config-path",
+                config_path, "--no-cache"] + list(args))
+            assert result.exit_code == 0, result.output
+            return result.output
+
+        invoke("sync")
+        conn = config.get_client_connection(config_map, use_cache=False)
+        log_entry = next(iter(api.log_entries.values()))
+        event_id = log_entry["event"]
+
+        assert cle.put_log_entry(event_id, conn, str(log_entry["id"]),
+                { "body": "edited without syncing", "tags": ["Tag0"] })
+        assert cle.post_log_entry(event_id, conn, { "body": "new without syncing",
+            "tags": ["Tag1"] })
+        assert client.post_tag(conn, { "name": "NewTag", "tags": [] })
+        num_requests = sum(api.num_requests.values())
+
+        assert "edited without syncing" in invoke("list", "logs", "-t", "Tag0")
+        assert "new without syncing" in invoke("list", "logs", "-t", "Tag1")
+        assert "NewTag" in invoke("list", "tags")
+        assert sum(api.num_requests.values()) == num_requests
@@ -0,0 +1,60 @@
+from click.testing import CliRunner
+from jarvis_cli.commands import cli
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer
+from jarvis_cli.tag_graph import TagGraph
+
+
+def _tag(name, *tags):
+    return { "name": name, "tags": list(tags) }
+
+def _graph():
+    return TagGraph([_tag("Animal"), _tag("Mammal", "Animal"),
+        _tag("Cat", "Mammal", "Pet"), _tag("Pet", "animal"), _tag("Lonely"),
+        _tag("Chicken", "Egg"), _tag("Egg", "chicken"), _tag("Self", "Self"),
+        _tag("Thing", "Unknown")])
+
+def test_traversals():
+    graph = _graph()
+
+    assert graph.ancestors("cat") == [("Mammal", 1), ("Pet", 1), ("Animal", 2)]
+    assert graph.descendants("Animal") == [("Mammal", 1), ("Pet", 1),
+            ("Cat", 2)]
+    # The starting tag is left out even when it is in a cycle
+    assert graph.ancestors("Chicken") == [("Egg", 1)]
+    assert graph.ancestors("Nope") is None
+
+def test_cycles_orphans_and_missing():
+    graph = _graph()
+
+    assert graph.cycles() == [["Chicken", "Egg"], ["Self"]]
+    assert graph.orphans() == ["Lonely"]
+    assert graph.missing() == { "Unknown": ["Thing"] }
+
+def test_cycles_of_a_deep_graph():
+    # Deeper than the recursion limit
+    tags = [ _tag("t{0}".format(i), "t{0}".format(i+1)) for i in range(5000) ]
+    tags.append(_tag("t5000", "t0"))
+
+    assert [ len(c) for c in TagGraph(tags).cycles() ] == [5001]
+
+def test_graph_command(write_config):
+    api = MockJarvisApi(page_size=2)
+
+    for name, tags in [("Animal", []), ("Mammal", ["Animal"]), ("Cat", ["Mammal"]),
+            ("Lonely", [])]:
+        api.create_tag({ "name": name, "tags": tags })
+
+    with MockJarvisApiServer(api) as server:
+        config_path = write_config(server.url)
+        args = ["-e", "mock", "--config-path", config_path, "--no-cache",
+                "--remote", "graph"]
+
+        result = CliRunner().invoke(cli, args + ["ancestors", "cat"])
+        assert result.exit_code == 0, result.output
+        assert result.output.split()[-4:] == ["Mammal", "1", "Animal", "2"]
+
+        result = CliRunner().invoke(cli, args + ["orphans"])
+        assert "Orphans found: 1 of 4 tags" in result.output
+
+    # The tags got read in one paginated query and not a get per tag
+    assert api.num_requests[("GET", "tags")] == 4
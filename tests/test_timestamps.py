@@ -0,0 +1,23 @@
+from datetime import datetime
+from jarvis_cli import timestamps
+
+
+def test_parse_iso_datetime():
+    expected = datetime(2015, 12, 12, 16, 22, 41)
+
+    assert timestamps.parse_iso_datetime("2015-12-12T16:22:41") == expected
+    assert timestamps.parse_iso_datetime("2015-12-12T16:22:41Z") == expected
+    assert timestamps.parse_iso_datetime("2015-12-12T18:22:41+02:00") == expected
+    assert timestamps.parse_iso_datetime("2015-12-12T16:22:41.1234567") == \
+            expected.replace(microsecond=123456)
+    assert timestamps.parse_iso_datetime("2015-12-12T16:22:41.12Z") == \
+            expected.replace(microsecond=120000)
+    assert timestamps.parse_iso_datetime("2015-12-12") == datetime(2015, 12, 12)
+    assert timestamps.parse_iso_datetime("yesterday") is None
+    assert timestamps.parse_iso_datetime("2015-13-12T16:22:41") is None
+
+def test_parse_datetime_falls_back_to_dateparser():
+    assert timestamps.parse_datetime("2015-12-12T16:22") == \
+            datetime(2015, 12, 12, 16, 22)
+    assert timestamps.parse_datetime("December 12, 2015 4:22pm") == \
+            datetime(2015, 12, 12, 16, 22)
@@ -0,0 +1,45 @@
+import json
+from jarvis_cli import config
+from jarvis_cli.client import common as cc
+from jarvis_cli.client import log_entry as cle
+from jarvis_cli.mock_api import MockJarvisApi, MockJarvisApiServer, populate
+from jarvis_cli.tracing import RequestTrace, percentile
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) == 0
+
+def test_trace_records_requests(tmpdir):
+    api = populate(MockJarvisApi(page_size=10), 3, 5, 15)
+    jsonl_path = str(tmpdir.join("trace.jsonl"))
+
+    with MockJarvisApiServer(api) as server:
+        conn = config.ClientConnection(server.url, "joe", "secret",
+                cc.create_session("joe", "secret"), 5, None)
+        trace = RequestTrace(jsonl_path).start()
+
+        log_entries = cle.query_log_entries(conn, [])
+        cle.get_log_entry(log_entries[0]["event"], conn,
+                str(log_entries[0]["id"]))
+        cc.get_tag(conn, "missing")
+        trace.stop()
+        # Stopped traces no longer record
+        cc.get_tag(conn, "Tag0")
+
+    assert [ (r.method, r.endpoint, r.status) for r in trace.records ] == [
+            ("GET", "search/logentries", 200), ("GET", "search/logentries", 200),
+            ("GET", "events/:id/logentries/:id", 200),
+            ("GET", "tags/:id", 404)]
+    assert all(r.latency > 0 and r.retries == 0 for r in trace.records)
+
+    with open(jsonl_path) as f:
+        assert [ json.loads(line)["endpoint"] for line in f ] == [ r.endpoint
+                for r in trace.records ]
+
+    summary = trace.summary()
+    assert "#requests: 4" in summary and "#errors: 1" in summary
+    assert "GET search/logentries: #requests: 2" in summary